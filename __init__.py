@@ -9,6 +9,18 @@ from __future__ import absolute_import;
 
 import os.path;
 import sys;
+import time;
+import errno;
+import mmap;
+import struct;
+import pickle;
+import tempfile;
+import threading;
+try:
+    import fcntl;
+except ImportError:
+    fcntl = None;
+from stat import S_ISREG;
 if sys.version_info[0] >= 3:
     from urllib.parse import urlparse;
 else:
@@ -18,11 +30,17 @@ from pymfony.component.system import Object;
 from pymfony.component.system.oop import interface;
 from pymfony.component.system.types import String;
 from pymfony.component.system.types import Array;
+from pymfony.component.system.types import OrderedDict;
 from pymfony.component.system.exception import InvalidArgumentException;
 from pymfony.component.system.exception import RuntimeException;
 from pymfony.component.system.serializer import unserialize;
 from pymfony.component.system.serializer import serialize;
 
+from pymfony.component.config.resource import FreshnessChecker;
+from pymfony.component.config.resource import FileResource;
+from pymfony.component.config.resource import BinaryMetadata;
+from pymfony.component.config.watcher import ResourceWatcherInterface;
+
 """
 """
 
@@ -49,17 +67,132 @@ class FileLocatorInterface(Object):
 
 
 
+class DirectoryIndex(Object):
+    """DirectoryIndex answers whether files exist from in-memory listings
+    of their directories.
+
+    Each directory is listed once, then its mtime is checked at most once
+    per interval and it is only listed again when the mtime changed, or
+    when it was within one mtime granularity step of the time of the last
+    listing, since the directory may have changed during that step after
+    being listed. Files created during the interval may go unnoticed.
+
+    The names that are not plain entries of the directory, e.g. "." or
+    "..", are checked with os.path.exists(). The listings of the least
+    recently checked directories are dropped once more than maxSize
+    directories are kept.
+
+    """
+    def __init__(self, interval = 1.0, granularity = 2.0, maxSize = 1024):
+        """Constructor.
+
+        @param interval: float The number of seconds between two checks of
+            the mtime of a directory
+        @param granularity: float The number of seconds between two
+            distinct mtimes on the file system
+        @param maxSize: int The number of directory listings to keep
+
+        """
+        self.__interval = float(interval);
+        self.__granularity = float(granularity);
+        self.__maxSize = int(maxSize);
+        self.__directories = OrderedDict();
+        self.__lock = threading.Lock();
+
+    def contains(self, directory, name):
+        """Returns whether a directory contains an entry.
+
+        @param directory: string The directory
+        @param name: string The name of the entry
+
+        @return: Boolean
+
+        """
+        if not self.__isPlain(name):
+            return os.path.exists(os.path.join(directory, name));
+
+        now = time.time();
+
+        with self.__lock:
+            entry = self.__directories.pop(directory, None);
+            if entry is not None:
+                self.__directories[directory] = entry;
+        if entry is None or now - entry[0] >= self.__interval:
+            entry = self.__refresh(directory, entry, now);
+
+        return name in entry[2];
+
+    def clear(self):
+        """Forgets all listings.
+        """
+        with self.__lock:
+            self.__directories.clear();
+
+    def __isPlain(self, name):
+        if not name or name in (os.curdir, os.pardir):
+            return False;
+
+        for separator in (os.sep, os.altsep):
+            if separator and separator in name:
+                return False;
+
+        return True;
+
+    def __refresh(self, directory, entry, now):
+        try:
+            mtime = os.stat(directory).st_mtime;
+        except OSError:
+            mtime = None;
+
+        if entry is not None and entry[1] == mtime \
+            and (mtime is None or mtime < entry[3] - self.__granularity):
+            entry = (now, mtime, entry[2], entry[3]);
+        elif mtime is None:
+            entry = (now, mtime, frozenset(), now);
+        else:
+            listed = time.time();
+            entry = (now, mtime, self.__list(directory), listed);
+
+        with self.__lock:
+            self.__directories.pop(directory, None);
+            while self.__directories \
+                and len(self.__directories) >= self.__maxSize:
+                del self.__directories[next(iter(self.__directories))];
+            if self.__maxSize > 0:
+                self.__directories[directory] = entry;
+
+        return entry;
+
+    def __list(self, directory):
+        try:
+            if not hasattr(os, 'scandir'):
+                return frozenset(os.listdir(directory));
+
+            # os.path.exists() is False for dangling symbolic links
+            return frozenset(
+                entry.name for entry in os.scandir(directory)
+                if not entry.is_symlink() or os.path.exists(entry.path)
+            );
+        except OSError:
+            return frozenset();
+
+
 class FileLocator(FileLocatorInterface):
     """FileLocator uses an array of pre-defined paths to find files.
 
+    With a DirectoryIndex, the search paths are listed once instead of
+    probing every candidate file.
+
     @author Fabien Potencier <fabien@symfony.com>
 
     """
-    def __init__(self, paths = None):
+    def __init__(self, paths = None, index = None):
         """Constructor.
 
         @param paths: string|list A path or an array of paths where to look
             for resources
+        @param index: DirectoryIndex|Boolean|None An index of the search
+            paths, True for a new one
 
         """
         if paths is None:
@@ -69,6 +202,14 @@ class FileLocator(FileLocatorInterface):
         else:
             self._paths = list(paths);
 
+        if index is True:
+            index = DirectoryIndex();
+        elif index is False:
+            index = None;
+        if index is not None:
+            assert isinstance(index, DirectoryIndex);
+        self._index = index;
+
     def locate(self, name, currentPath = None, first = True):
         """Returns a full path for a given file name.
 
@@ -98,7 +239,7 @@ class FileLocator(FileLocatorInterface):
 
         for path in paths:
             filename = os.path.join(path, name);
-            if os.path.exists(filename):
+            if self._exists(filename):
                 if first:
                     return filename;
                 filepaths.append(filename);
@@ -112,6 +253,102 @@ class FileLocator(FileLocatorInterface):
         return Array.uniq(filepaths);
 
 
+    def locateMany(self, names, currentPath = None, first = True):
+        """Returns the full paths of several file names.
+
+        The names are deduplicated and, for all of them, every search path
+        is listed only once.
+
+        @param names: list The file names to locate
+        @param currentPath: string The current path
+        @param first: boolean Whether to return the first occurrence
+                      or an array of filenames
+
+        @return: tuple An (OrderedDict, OrderedDict) pair, the first maps
+            the located names to what locate() returns, the second maps
+            the other names to the InvalidArgumentException it raises
+
+        """
+        index = self._index;
+        if index is None:
+            # only list the search paths once during this call
+            index = DirectoryIndex(float('inf'));
+
+        paths = [];
+        if currentPath:
+            paths.append(currentPath);
+        paths.extend(self._paths);
+
+        # the relative names, with the paths where they were found
+        found = OrderedDict();
+        results = (OrderedDict(), OrderedDict());
+        for name in names:
+            if name in found or name in results[0] or name in results[1]:
+                continue;
+
+            if not self.__isAbsolutePath(name):
+                found[name] = list();
+                continue;
+
+            try:
+                results[0][name] = FileLocator.locate(
+                    self, name, currentPath, first
+                );
+            except InvalidArgumentException as e:
+                results[1][name] = e;
+
+        for path in paths:
+            for name, filepaths in found.items():
+                if first and filepaths:
+                    continue;
+
+                filename = os.path.join(path, name);
+                if self._exists(filename, index):
+                    filepaths.append(filename);
+
+        for name, filepaths in found.items():
+            if not filepaths:
+                results[1][name] = InvalidArgumentException(
+                    'The file "{0}" does not exist (in: {1}).'
+                    ''.format(name, ", ".join(paths))
+                );
+            elif first:
+                results[0][name] = filepaths[0];
+            else:
+                results[0][name] = Array.uniq(filepaths);
+
+        # keep the order of the names
+        order = OrderedDict.fromkeys(names);
+        return tuple(
+            OrderedDict((name, r[name]) for name in order if name in r)
+            for r in results
+        );
+
+
+    def _exists(self, filename, index = None):
+        """Returns whether a file exists, through an index when there is
+        one.
+
+        @param filename: string A file path
+        @param index: DirectoryIndex|None The index to use instead of the
+            one of the locator
+
+        @return Boolean
+
+        """
+        if index is None:
+            index = self._index;
+
+        if index is None:
+            return os.path.exists(filename);
+
+        directory, name = os.path.split(filename);
+        if not name:
+            return os.path.exists(filename);
+
+        return index.contains(directory, name);
+
+
     def __isAbsolutePath(self, path):
         """Returns whether the file path is an absolute path.
 
@@ -132,27 +369,299 @@ class FileLocator(FileLocatorInterface):
         return False;
 
 
+class CachedFileLocator(FileLocator):
+    """CachedFileLocator memoizes the located files, the files not found
+    included.
+
+    An entry expires after a time to live, or once a resource watcher
+    reports that one of its candidate files may have been created, changed
+    or removed. Without any of them, entries never expire. Expired entries
+    are dropped when they are looked up, and the least recently used ones
+    once more than maxSize entries are kept. The candidate files of the
+    dropped entries are no longer watched.
+
+    """
+    def __init__(self, paths = None, ttl = None, watcher = None,
+        index = None, maxSize = 1024):
+        """Constructor.
+
+        @param paths: string|list A path or an array of paths where to look
+            for resources
+        @param ttl: float|None The number of seconds an entry is valid
+        @param watcher: ResourceWatcherInterface|None A watcher of the
+            candidate files
+        @param index: DirectoryIndex|Boolean|None An index of the search
+            paths, True for a new one
+        @param maxSize: int The number of entries to keep
+
+        """
+        if watcher is not None:
+            assert isinstance(watcher, ResourceWatcherInterface);
+
+        FileLocator.__init__(self, paths, index);
+
+        self.__ttl = None if ttl is None else float(ttl);
+        self.__watcher = watcher;
+        self.__maxSize = int(maxSize);
+        self.__entries = OrderedDict();
+        self.__hits = 0;
+        self.__misses = 0;
+        self.__lock = threading.Lock();
+
+    def locate(self, name, currentPath = None, first = True):
+        """Returns a full path for a given file name.
+
+        @param name: mixed The file name to locate
+        @param currentPath: string The current path
+        @param first: boolean Whether to return the first occurrence
+                      or an array of filenames
+
+        @return: string|list The full path to the file|A list of file paths
+
+        @raise InvalidArgumentException: When file is not found
+
+        """
+        key = (name, currentPath, bool(first));
+
+        entry = self.__get(key);
+        if entry is None:
+            entry = self.__locate(key);
+
+        found, result = entry[1:];
+        if not found:
+            raise InvalidArgumentException(result);
+
+        return list(result) if isinstance(result, list) else result;
+
+    def locateMany(self, names, currentPath = None, first = True):
+        """Returns the full paths of several file names.
+
+        The names missing from the cache are located together.
+
+        @param names: list The file names to locate
+        @param currentPath: string The current path
+        @param first: boolean Whether to return the first occurrence
+                      or an array of filenames
+
+        @return: tuple An (OrderedDict, OrderedDict) pair, the first maps
+            the located names to what locate() returns, the second maps
+            the other names to the InvalidArgumentException it raises
+
+        """
+        entries = OrderedDict();
+        misses = list();
+        for name in names:
+            if name in entries:
+                continue;
+
+            key = (name, currentPath, bool(first));
+            entry = self.__get(key);
+            if entry is None:
+                misses.append(name);
+                self.__watch(key);
+            entries[name] = entry;
+
+        if misses:
+            located, errors = FileLocator.locateMany(
+                self, misses, currentPath, first
+            );
+            for name in misses:
+                if name in located:
+                    entry = (time.time(), True, located[name]);
+                else:
+                    entry = (time.time(), False, str(errors[name]));
+                self.__set((name, currentPath, bool(first)), entry);
+                entries[name] = entry;
+
+        results = (OrderedDict(), OrderedDict());
+        for name, (created, found, result) in entries.items():
+            if found:
+                results[0][name] = \
+                    list(result) if isinstance(result, list) else result;
+            else:
+                results[1][name] = InvalidArgumentException(result);
+
+        return results;
+
+    def getStats(self):
+        """Gets the cache statistics.
+
+        @return: dict With the "hits", "misses", "size" and "maxSize" keys
+
+        """
+        with self.__lock:
+            return {
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'size': len(self.__entries),
+                'maxSize': self.__maxSize,
+            };
+
+    def clear(self):
+        """Forgets all located files.
+        """
+        with self.__lock:
+            keys = list(self.__entries.keys());
+            self.__entries.clear();
+
+        self.__unwatch(keys);
+
+    def __get(self, key):
+        """Gets the valid entry of a key as the most recently used one,
+        dropping an expired one.
+
+        @return: tuple|None The (created, found, result) entry
+
+        """
+        with self.__lock:
+            entry = self.__entries.pop(key, None);
+            if entry is not None:
+                self.__entries[key] = entry;
+
+        if entry is not None and self.__isValid(key, entry[0]):
+            with self.__lock:
+                self.__hits += 1;
+
+            return entry;
+
+        with self.__lock:
+            self.__misses += 1;
+            if entry is not None and self.__entries.get(key) is entry:
+                # it is watched again once located again
+                del self.__entries[key];
+
+        return None;
+
+    def __set(self, key, entry):
+        """Stores an entry as the most recently used one, dropping the
+        least recently used ones.
+
+        """
+        evicted = list();
+        with self.__lock:
+            self.__entries.pop(key, None);
+            while self.__entries and len(self.__entries) >= self.__maxSize:
+                evicted.append(next(iter(self.__entries)));
+                del self.__entries[evicted[-1]];
+            if self.__maxSize > 0:
+                self.__entries[key] = entry;
+            else:
+                evicted.append(key);
+
+        self.__unwatch(evicted);
+
+    def __unwatch(self, keys):
+        if self.__watcher is not None:
+            for key in keys:
+                self.__watcher.unwatch(self.__getWatchKey(key));
+
+    def __locate(self, key):
+        name, currentPath, first = key;
+
+        self.__watch(key);
+
+        try:
+            entry = (time.time(), True,
+                FileLocator.locate(self, name, currentPath, first));
+        except InvalidArgumentException as e:
+            entry = (time.time(), False, str(e));
+
+        self.__set(key, entry);
+
+        return entry;
+
+    def __watch(self, key):
+        if self.__watcher is not None:
+            # watch before locating, so that no change goes unnoticed
+            self.__watcher.watch(
+                self.__getWatchKey(key),
+                [FileResource(path) for path in self.__getCandidates(key)]
+            );
+
+    def __isValid(self, key, created):
+        if self.__ttl is not None and time.time() - created >= self.__ttl:
+            return False;
+
+        if self.__watcher is not None:
+            watchKey = self.__getWatchKey(key);
+            if not self.__watcher.isWatched(watchKey) \
+                or self.__watcher.isDirty(watchKey):
+                return False;
+
+        return True;
+
+    def __getCandidates(self, key):
+        name, currentPath, first = key;
+
+        paths = list();
+        if currentPath:
+            paths.append(currentPath);
+        paths.extend(self._paths);
+
+        return [os.path.join(path, name) for path in paths];
+
+    def __getWatchKey(self, key):
+        return ('CachedFileLocator', id(self)) + key;
+
+
 class ConfigCache(Object):
     """ConfigCache manages PHP cache files.
 
     When debug is enabled, it knows when to flush the cache
     thanks to an array of ResourceInterface instances.
 
+    With a resource watcher, the resources are only checked again once
+    the watcher reports that they may have changed. With an executor, e.g.
+    a concurrent.futures.ThreadPoolExecutor, they are checked concurrently.
+
+    Metadata made only of FileResource and DirectoryResource instances is
+    written in the compact BinaryMetadata format, and checked straight from
+    its records. The parsed metadata is kept in a
+    ConfigCacheRegistry shared by the whole process, and checks can be
+    limited to one per interval.
+
     @author Fabien Potencier <fabien@symfony.com>
 
     """
 
 
-    def __init__(self, path, debug):
+    def __init__(self, path, debug, watcher = None, executor = None,
+        fsync = False, registry = None, interval = 0):
         """Constructor.
 
-        @param string  path  The absolute cache path
-        @param Boolean debug Whether debugging is enabled or not
+        @param string                   path     The absolute cache path
+        @param Boolean                  debug    Whether debugging is enabled or not
+        @param ResourceWatcherInterface watcher  A resource watcher shared
+            between the checks
+        @param Executor                 executor An executor running the
+            resource checks
+        @param Boolean                  fsync    Whether written files are
+            flushed to disk before being renamed
+        @param ConfigCacheRegistry      registry The registry keeping the
+            parsed metadata, the process-wide one by default
+        @param float                    interval The number of seconds
+            during which a fresh cache is not checked again
 
         """
+        if watcher is not None:
+            assert isinstance(watcher, ResourceWatcherInterface);
+        if registry is None:
+            registry = ConfigCacheRegistry.getDefault();
+        assert isinstance(registry, ConfigCacheRegistry);
 
         self.__file = path;
         self.__debug = bool(debug);
+        self.__watcher = watcher;
+        self.__executor = executor;
+        self.__fsync = bool(fsync);
+        self.__registry = registry;
+        self.__interval = float(interval);
+        self.__freshnessStats = None;
+
+        # os.umask() can only be read by setting it, which would affect the
+        # files created meanwhile by other threads, so it is read only once
+        self.__umask = os.umask(0o022);
+        os.umask(self.__umask);
 
 
     def __str__(self):
@@ -174,8 +683,41 @@ class ConfigCache(Object):
         @return Boolean True if the cache is fresh, False otherwise:
 
         """
+        if self.__interval > 0 and self.__registry.isRecentlyFresh(
+            self.__file, self.__debug, self.__interval):
+            return True;
+
+        checker = FreshnessChecker(self.__executor);
+        try:
+            fresh = self.__isFresh(checker);
+        finally:
+            self.__freshnessStats = checker.getStats();
+
+        if fresh:
+            self.__registry.setFresh(self.__file, self.__debug);
+
+        return fresh;
+
+
+    def getFreshnessStats(self):
+        """Gets the number of system calls done by the last isFresh() call.
+
+        @return dict|None With the "stat", "listdir" and "paths" keys
+
+        """
+
+        return self.__freshnessStats;
+
 
-        if not os.path.isfile(self.__file) :
+    def __isFresh(self, checker):
+
+        if self.__debug and self.__watcher is not None \
+            and self.__watcher.isWatched(self.__file) \
+            and not self.__watcher.isDirty(self.__file):
+            return True;
+
+        status = checker.stat(self.__file);
+        if status is None or not S_ISREG(status.st_mode) :
             return False;
 
 
@@ -184,18 +726,51 @@ class ConfigCache(Object):
 
 
         metadata = self.__file+'.meta';
-        if not os.path.isfile(metadata) :
+        metaStatus = checker.stat(metadata);
+        if metaStatus is None or not S_ISREG(metaStatus.st_mode) :
             return False;
 
 
-        time = os.path.getmtime(self.__file);
-        f = open(metadata);
-        content = f.read();
-        f.close();
-        meta = unserialize(content);
-        for resource in meta :
-            if not resource.isFresh(time) :
-                return False;
+        time = status.st_mtime;
+        try:
+            meta = self.__registry.getMetadata(metadata, metaStatus);
+        except (EnvironmentError, InvalidArgumentException):
+            # a removed, truncated or corrupted metadata file
+            return False;
+
+        if isinstance(meta, BinaryMetadata):
+            return self.__isBinaryFresh(meta, checker, time);
+        if not isinstance(meta, list):
+            return False;
+
+        if self.__watcher is None:
+            return checker.isFresh(meta, time);
+
+        # watch before checking, so that no change goes unnoticed
+        self.__watcher.watch(
+            self.__file,
+            [FileResource(self.__file), FileResource(metadata)] + list(meta)
+        );
+        if not checker.isFresh(meta, time):
+            self.__watcher.unwatch(self.__file);
+            return False;
+
+        return True;
+
+
+    def __isBinaryFresh(self, binary, checker, time):
+
+        if self.__watcher is None:
+            return checker.isBinaryFresh(binary, time);
+
+        self.__watcher.watch(
+            self.__file,
+            [FileResource(self.__file), FileResource(self.__file+'.meta')]
+            + binary.getResources()
+        );
+        if not checker.isBinaryFresh(binary, time):
+            self.__watcher.unwatch(self.__file);
+            return False;
 
         return True;
 
@@ -211,6 +786,10 @@ class ConfigCache(Object):
         """
         assert isinstance(metadata, list) or metadata is None;
 
+        if self.__watcher is not None:
+            self.__watcher.unwatch(self.__file);
+        self.__registry.remove(self.__file);
+
         dirname = os.path.dirname(self.__file);
         if not os.path.isdir(dirname) :
             try:
@@ -221,69 +800,617 @@ class ConfigCache(Object):
         elif not os.access(dirname, os.W_OK) :
             raise RuntimeException('Unable to write in the {0} directory'.format(dirname));
 
+        writeMeta = None is not metadata and True is self.__debug;
+        filename = self.__file+'.meta';
+        if writeMeta:
+            # Until the new metadata is written, the cache is not fresh:
+            # neither content is ever paired with the metadata of the other.
+            try:
+                os.remove(filename);
+            except OSError:
+                pass;
+
         try:
-            suffix = 0;
-            while os.path.exists(self.__file+str(suffix)):
-                suffix += 1;
-            tmpFile = self.__file+str(suffix);
-            f = open(tmpFile, 'w');
-            f.write(content);
-            f.close();
-            if os.path.exists(self.__file):
-                os.remove(self.__file);
-            os.rename(tmpFile, self.__file);
-            if hasattr(os, 'chmod'):
-                umask = os.umask(0o220);
-                os.umask(umask);
-                os.chmod(self.__file, 0o666 & ~umask);
+            self.__writeFile(self.__file, content,
+                'wb' if isinstance(content, bytes) else 'w', self.__umask);
         except Exception:
             raise RuntimeException('Failed to write cache file "{0}".'.format(self.__file));
-        else:
+
+        # The metadata goes last, once the content it describes is in place.
+        if writeMeta:
+            meta = BinaryMetadata.dump(metadata);
+            mode = 'wb';
+            if meta is None:
+                meta = serialize(metadata);
+                mode = 'w';
+
             try:
-                if hasattr(os, 'chmod'):
-                    umask = os.umask(0o220);
-                    os.umask(umask);
-                    os.chmod(self.__file, 0o666 & ~umask);
+                self.__writeFile(filename, meta, mode, self.__umask);
             except Exception:
+                # the cache is not fresh until it is written again
                 pass;
+
+        if self.__fsync:
+            self.__syncDirectory(dirname);
+
+
+    def map(self):
+        """Maps the cache file in memory, read-only.
+
+        The processes mapping the same file share its pages instead of
+        holding private copies of the content.
+
+        @return mmap The mapped content, to close once done
+
+        @raise RuntimeException When the cache file can't be mapped
+
+        """
+
+        try:
+            f = open(self.__file, 'rb');
+        except EnvironmentError:
+            raise RuntimeException('Unable to read the cache file "{0}".'.format(self.__file));
+
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ);
+        except (ValueError, EnvironmentError):
+            # e.g. an empty file
+            raise RuntimeException('Unable to map the cache file "{0}".'.format(self.__file));
         finally:
+            f.close();
+
+
+    def writeConfig(self, config, metadata = None):
+        """Writes a configuration dictionary in the MappedConfig format.
+
+        @param dict                config   The configuration to write
+        @param ResourceInterface[] metadata An array of ResourceInterface instances
+
+        @raise RuntimeException When cache file can't be wrote
+
+        """
+
+        self.write(MappedConfig.dump(config), metadata);
+
+
+    def loadConfig(self):
+        """Lazily loads a configuration dictionary written by writeConfig().
+
+        The returned configuration maps the cache file, close it once done,
+        e.g. through a with statement.
+
+        @return MappedConfig
+
+        @raise RuntimeException When the cache file can't be mapped
+        @raise InvalidArgumentException When the cache file is not in the
+            MappedConfig format
+
+        """
+        data = self.map();
+        try:
+            return MappedConfig(data);
+        except Exception:
+            data.close();
+            raise;
+
+
+    def __writeFile(self, filename, content, mode, umask):
+        """Atomically replaces a file through a temporary file created in
+        the same directory.
+        """
+        fd, tmpFile = tempfile.mkstemp(
+            prefix=os.path.basename(filename)+'.',
+            suffix='.tmp',
+            dir=os.path.dirname(filename)
+        );
+        try:
             try:
-                f.close();
+                f = os.fdopen(fd, mode);
             except Exception:
-                pass;
-            if os.path.exists(tmpFile):
+                os.close(fd);
+                raise;
+            try:
+                f.write(content);
+                f.flush();
+                if self.__fsync:
+                    os.fsync(f.fileno());
+            finally:
+                f.close();
+
+            if hasattr(os, 'chmod'):
+                os.chmod(tmpFile, 0o666 & ~umask);
+            self.__replace(tmpFile, filename);
+        except Exception:
+            try:
                 os.remove(tmpFile);
+            except OSError:
+                pass;
+            raise;
+
+
+    def __replace(self, source, destination):
+
+        if hasattr(os, 'replace'):
+            os.replace(source, destination);
+            return;
+
+        try:
+            os.rename(source, destination);
+        except OSError:
+            # Windows does not rename over an existing file before Python 3.3
+            if not os.path.exists(destination):
+                raise;
+            os.remove(destination);
+            os.rename(source, destination);
+
+
+    def __syncDirectory(self, dirname):
+
+        try:
+            fd = os.open(dirname, os.O_RDONLY);
+        except OSError:
+            # e.g. directories can not be opened on Windows
+            return;
+        try:
+            os.fsync(fd);
+        except OSError:
+            pass;
+        finally:
+            os.close(fd);
+
+
+
+class ConfigCacheRegistry(Object):
+    """ConfigCacheRegistry remembers the state of ConfigCache files
+    between checks.
+
+    The parsed metadata is kept along with the (mtime, size, inode) of its
+    file and only parsed again when they change. The registry also records
+    when each cache was last found fresh.
+
+    The metadata of the least recently checked caches is dropped once more
+    than maxSize files are kept. A dropped mapping is not closed, since
+    another thread may still be reading it: it is released once no check
+    refers to it anymore.
+
+    """
+
+    __default = None;
+    __defaultLock = threading.Lock();
+
+    def __init__(self, maxSize = 256):
+        """Constructor.
+
+        @param int maxSize The number of metadata files to keep
+
+        """
+
+        self.__maxSize = int(maxSize);
+        self.__metadata = OrderedDict();
+        self.__fresh = dict();
+        self.__lock = threading.Lock();
+
+
+    @classmethod
+    def getDefault(cls):
+        """Gets the registry shared by the whole process.
+
+        @return ConfigCacheRegistry
 
+        """
+
+        with cls.__defaultLock:
+            if cls.__default is None:
+                cls.__default = cls();
+
+            return cls.__default;
+
+
+    def getMetadata(self, filename, status):
+        """Gets the parsed metadata of a file.
+
+        @param string       filename The metadata file
+        @param stat_result  status   The current status of the file
+
+        @return BinaryMetadata|ResourceInterface[]
 
-        if None is not metadata and True is self.__debug :
-            filename = self.__file+'.meta';
-            content = serialize(metadata);
+        @raise EnvironmentError         When the file can not be read
+        @raise InvalidArgumentException When the file is corrupted
 
+        """
+        signature = (status.st_mtime, status.st_size, status.st_ino);
+
+        with self.__lock:
+            entry = self.__metadata.get(filename);
+            if entry is not None and entry[0] == signature:
+                del self.__metadata[filename];
+                self.__metadata[filename] = entry;
+
+                return entry[1];
+
+        metadata = BinaryMetadata.open(filename);
+        if metadata is None:
+            f = open(filename);
             try:
-                suffix = 0;
-                while os.path.exists(filename+str(suffix)):
-                    suffix += 1;
-                tmpFile = filename+str(suffix);
-                f = open(tmpFile, 'w');
-                f.write(content);
+                content = f.read();
+            finally:
                 f.close();
-                if os.path.exists(filename):
-                    os.remove(filename);
-                os.rename(tmpFile, filename);
+
+            try:
+                metadata = unserialize(content);
+            except Exception as e:
+                # e.g. a truncated file
+                raise InvalidArgumentException(
+                    'The metadata "{0}" is corrupted.'.format(filename),
+                    previous=e
+                );
+
+        with self.__lock:
+            self.__metadata.pop(filename, None);
+            while self.__metadata and len(self.__metadata) >= self.__maxSize:
+                del self.__metadata[next(iter(self.__metadata))];
+            if self.__maxSize > 0:
+                self.__metadata[filename] = (signature, metadata);
+
+        return metadata;
+
+
+    def setFresh(self, path, debug):
+        """Records that a cache was found fresh.
+
+        @param string  path  The cache path
+        @param Boolean debug Whether the resources of the cache were checked
+
+        """
+
+        with self.__lock:
+            self.__fresh[(path, bool(debug))] = time.time();
+
+
+    def isRecentlyFresh(self, path, debug, interval):
+        """Returns whether a cache was found fresh during the last interval.
+
+        @param string  path     The cache path
+        @param Boolean debug    Whether the resources of the cache must
+            have been checked
+        @param float   interval A number of seconds
+
+        @return Boolean
+
+        """
+
+        with self.__lock:
+            checked = self.__fresh.get((path, bool(debug)));
+
+        return checked is not None and time.time() - checked < interval;
+
+
+    def remove(self, path):
+        """Forgets everything about a cache.
+
+        @param string path The cache path
+
+        """
+
+        with self.__lock:
+            self.__fresh.pop((path, True), None);
+            self.__fresh.pop((path, False), None);
+            self.__metadata.pop(path+'.meta', None);
+
+
+    def clear(self):
+        """Forgets everything about all caches.
+        """
+
+        with self.__lock:
+            self.__fresh.clear();
+            self.__metadata.clear();
+
+
+
+class MappedConfig(Object):
+    """MappedConfig lazily reads a configuration dictionary dumped in a
+    compact format, e.g. from a memory-mapped ConfigCache.
+
+    The format is a header, a table of fixed-width entries giving the
+    offset and the length of every pickled key and value, then the pickled
+    data. Only the keys are unpickled up front, each top-level value is
+    unpickled on its first access.
+
+    """
+    MAGIC = b'PYMFCONF';
+    VERSION = 1;
+
+    HEADER = struct.Struct('<8sHI');
+    ENTRY = struct.Struct('<QQQQ');
+
+    def __init__(self, data):
+        """Constructor.
+
+        @param bytes|mmap data The dumped configuration
+
+        @raise InvalidArgumentException When the data is not valid
+
+        """
+        if len(data) < self.HEADER.size \
+            or data[:len(self.MAGIC)] != self.MAGIC:
+            raise InvalidArgumentException('The data is not a dumped configuration.');
+
+        magic, version, count = self.HEADER.unpack_from(data, 0);
+        if version != self.VERSION:
+            raise InvalidArgumentException(
+                'Unsupported configuration format version {0}.'.format(version)
+            );
+        if self.HEADER.size + count * self.ENTRY.size > len(data):
+            raise InvalidArgumentException('The dumped configuration is truncated.');
+
+        self.__data = data;
+        self.__entries = OrderedDict();
+        self.__values = dict();
+
+        offset = self.HEADER.size;
+        start = offset + count * self.ENTRY.size;
+        for i in range(count):
+            keyOffset, keyLength, valueOffset, valueLength = \
+                self.ENTRY.unpack_from(data, offset);
+            offset += self.ENTRY.size;
+            if keyOffset < start or keyOffset + keyLength > len(data) \
+                or valueOffset < start or valueOffset + valueLength > len(data):
+                raise InvalidArgumentException('The dumped configuration is corrupted.');
+
+            try:
+                key = pickle.loads(data[keyOffset:keyOffset + keyLength]);
             except Exception:
-                pass;
-            else:
-                try:
-                    if hasattr(os, 'chmod'):
-                        umask = os.umask(0o220);
-                        os.umask(umask);
-                        os.chmod(filename, 0o666 & ~umask);
-                except Exception:
-                    pass;
-            finally:
-                try:
-                    f.close();
-                except Exception:
-                    pass;
-                if os.path.exists(tmpFile):
-                    os.remove(tmpFile);
+                raise InvalidArgumentException('The dumped configuration is corrupted.');
+            self.__entries[key] = (valueOffset, valueLength);
+
+
+    @classmethod
+    def dump(cls, config):
+        """Dumps a configuration dictionary.
+
+        @param dict config The configuration
+
+        @return bytes
+
+        """
+        assert isinstance(config, dict);
+
+        keys = list();
+        values = list();
+        for key, value in config.items():
+            keys.append(pickle.dumps(key, pickle.HIGHEST_PROTOCOL));
+            values.append(pickle.dumps(value, pickle.HIGHEST_PROTOCOL));
+
+        parts = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(keys))];
+        offset = cls.HEADER.size + len(keys) * cls.ENTRY.size;
+        for key, value in zip(keys, values):
+            parts.append(cls.ENTRY.pack(
+                offset, len(key), offset + len(key), len(value)
+            ));
+            offset += len(key) + len(value);
+        for key, value in zip(keys, values):
+            parts.append(key);
+            parts.append(value);
+
+        return b''.join(parts);
+
+
+    def __getitem__(self, key):
+
+        if key not in self.__values:
+            offset, length = self.__entries[key];
+            self.__values[key] = pickle.loads(
+                self.__data[offset:offset + length]
+            );
+
+        return self.__values[key];
+
+
+    def __contains__(self, key):
+
+        return key in self.__entries;
+
+
+    def __len__(self):
+
+        return len(self.__entries);
+
+
+    def __iter__(self):
+
+        return iter(self.__entries);
+
+
+    def keys(self):
+
+        return list(self.__entries.keys());
+
+
+    def get(self, key, default = None):
+
+        if key not in self.__entries:
+            return default;
+
+        return self[key];
+
+
+    def toDict(self):
+        """Unpickles all values.
+
+        @return dict
+
+        """
+
+        return dict((key, self[key]) for key in self.__entries);
+
+
+    def close(self):
+        """Releases the mapped data, the values already read remain
+        available.
+        """
+
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close();
+
+
+    def __enter__(self):
+
+        return self;
+
+
+    def __exit__(self, excType, excValue, traceback):
+
+        self.close();
+
+
+
+class ConfigCacheCoordinator(Object):
+    """ConfigCacheCoordinator makes concurrent processes rebuild a stale
+    ConfigCache only once.
+
+    The first process finding the cache stale takes an exclusive lock on a
+    file next to the cache and rebuilds it. Meanwhile, the others either
+    serve the stale copy (stale-while-revalidate) or wait for the rebuild
+    until a timeout, after which they rebuild it themselves.
+
+    Without fcntl, e.g. on Windows, the lock only coordinates the threads
+    of the current process.
+
+    """
+    FRESH = 'fresh';
+    BUILT = 'built';
+    STALE = 'stale';
+
+    __threadLocks = dict();
+    __threadLocksLock = threading.Lock();
+
+    def __init__(self, cache, timeout = 30.0, serveStale = True,
+        interval = 0.05):
+        """Constructor.
+
+        @param ConfigCache cache      The coordinated cache
+        @param float       timeout    The number of seconds to wait for
+            another rebuild
+        @param Boolean     serveStale Whether the stale copy is served
+            while another process rebuilds the cache
+        @param float       interval   The number of seconds between two
+            attempts to take the lock
+
+        """
+        assert isinstance(cache, ConfigCache);
+
+        self.__cache = cache;
+        self.__lockFile = str(cache)+'.lock';
+        self.__timeout = float(timeout);
+        self.__serveStale = bool(serveStale);
+        self.__interval = float(interval);
+
+
+    def getCache(self):
+        """Gets the coordinated cache.
+
+        @return ConfigCache
+
+        """
+
+        return self.__cache;
+
+
+    def warmup(self, build):
+        """Rebuilds the cache when it is stale, unless another process is
+        already rebuilding it.
+
+        @param callable build Returns the content and the metadata to write
+            in the cache, see ConfigCache.write()
+
+        @return string FRESH when the cache is fresh, BUILT when it was
+            rebuilt by this call or STALE when a stale copy is served
+
+        """
+
+        if self.__cache.isFresh():
+            return self.FRESH;
+
+        lock = self.__acquire(0);
+        if lock is None:
+            if self.__serveStale and os.path.isfile(str(self.__cache)):
+                return self.STALE;
+
+            lock = self.__acquire(self.__timeout);
+
+        try:
+            # another process may have rebuilt it while we were waiting,
+            # even when it still holds the lock after the timeout
+            if self.__cache.isFresh():
+                return self.FRESH;
+
+            content, metadata = build();
+            self.__cache.write(content, metadata);
+
+            return self.BUILT;
+        finally:
+            if lock is not None:
+                self.__release(lock);
+
+
+    def __acquire(self, timeout):
+        """Takes the lock.
+
+        @return mixed The lock or None when the timeout is reached
+
+        """
+        deadline = time.time() + timeout;
+
+        if fcntl is None:
+            lock = self.__getThreadLock();
+            while not lock.acquire(False):
+                if time.time() >= deadline:
+                    return None;
+                time.sleep(self.__interval);
+
+            return lock;
+
+        dirname = os.path.dirname(self.__lockFile);
+        if dirname and not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname, 0o777);
+            except OSError:
+                if not os.path.isdir(dirname):
+                    raise RuntimeException('Unable to create the {0} directory'.format(dirname));
+
+        fd = os.open(self.__lockFile, os.O_RDWR | os.O_CREAT, 0o666);
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB);
+                return fd;
+            except (IOError, OSError) as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    os.close(fd);
+                    raise;
+
+            if time.time() >= deadline:
+                os.close(fd);
+                return None;
+            time.sleep(self.__interval);
+
+
+    def __release(self, lock):
+
+        if fcntl is None:
+            lock.release();
+            return;
+
+        try:
+            fcntl.flock(lock, fcntl.LOCK_UN);
+        finally:
+            os.close(lock);
+
+
+    def __getThreadLock(self):
+
+        with self.__threadLocksLock:
+            if self.__lockFile not in self.__threadLocks:
+                self.__threadLocks[self.__lockFile] = threading.Lock();
+
+            return self.__threadLocks[self.__lockFile];
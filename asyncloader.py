@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+from __future__ import absolute_import;
+
+import asyncio;
+import contextvars;
+
+from pymfony.component.system.oop import interface;
+from pymfony.component.system.oop import abstract;
+
+from pymfony.component.config import FileLocatorInterface;
+from pymfony.component.config.exception import FileLoaderImportCircularReferenceException;
+from pymfony.component.config.exception import FileLoaderLoadException;
+from pymfony.component.config.loader import LoaderInterface;
+from pymfony.component.config.loader import LoaderResolverInterface;
+from pymfony.component.config.loader import LoaderCapabilitiesInterface;
+from pymfony.component.config.loader import LoaderResolver;
+from pymfony.component.config.loader import FileLoader;
+
+"""
+"""
+
+@interface
+class AsyncLoaderInterface(LoaderInterface):
+    """AsyncLoaderInterface is the interface implemented by the loaders
+    whose load() method is a coroutine, for asyncio applications (Python
+    3.7+).
+
+    """
+    async def load(self, resource, resourceType = None):
+        """Loads a resource.
+
+        @param resource: mixed
+        @param resourceType: string The resource type
+        """
+        pass;
+
+
+class ExecutorLoaderAdapter(AsyncLoaderInterface):
+    """ExecutorLoaderAdapter runs a synchronous loader in an executor, so
+    that it does not block the event loop.
+
+    The adapted loader resolves its own imports among the synchronous
+    loaders of the resolver of the adapter, and a file loader continues
+    the import chain of the task. The current directories set by the
+    adapted loaders are kept for each call, so that sibling tasks may run
+    the same loader at once.
+
+    """
+    def __init__(self, loader, executor = None):
+        """Constructor.
+
+        @param loader: LoaderInterface The synchronous loader
+        @param executor: Executor The executor, the default one of the
+            event loop when None
+
+        """
+        assert isinstance(loader, LoaderInterface);
+
+        self.__loader = loader;
+        self.__executor = executor;
+        self.__resolver = None;
+
+    @classmethod
+    def create(cls, loader, executor = None):
+        """Adapts a synchronous loader, keeping its declared capabilities.
+
+        @param loader: LoaderInterface The synchronous loader
+        @param executor: Executor The executor
+
+        @return: ExecutorLoaderAdapter
+
+        """
+        if isinstance(loader, LoaderCapabilitiesInterface):
+            return CapableExecutorLoaderAdapter(loader, executor);
+
+        return cls(loader, executor);
+
+    def getLoader(self):
+        return self.__loader;
+
+    async def load(self, resource, resourceType = None):
+        # the import chain of the task is not visible from the executor, and
+        # the current directories of the adapted loader are kept per call
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__executor, FileLoader._runWithImportChain,
+            AsyncFileLoader._getImportChain(), self.__loader.load,
+            resource, resourceType
+        );
+
+    def supports(self, resource, resourceType = None):
+        return self.__loader.supports(resource, resourceType);
+
+    def getResolver(self):
+        return self.__resolver;
+
+    def setResolver(self, resolver):
+        self.__resolver = resolver;
+
+        if isinstance(resolver, AsyncLoaderResolver):
+            resolver = SyncLoaderResolver(resolver);
+        self.__loader.setResolver(resolver);
+
+
+class CapableExecutorLoaderAdapter(ExecutorLoaderAdapter,
+    LoaderCapabilitiesInterface):
+    """Adapts a synchronous loader declaring its capabilities.
+    """
+
+    def getSupportedExtensions(self):
+        return self.getLoader().getSupportedExtensions();
+
+    def getSupportedTypes(self):
+        return self.getLoader().getSupportedTypes();
+
+
+class SyncLoaderResolver(LoaderResolverInterface):
+    """SyncLoaderResolver resolves the imports of the synchronous loaders
+    adapted by an AsyncLoaderResolver, among its synchronous loaders only.
+
+    """
+    def __init__(self, resolver):
+        """Constructor.
+
+        @param resolver: AsyncLoaderResolver An AsyncLoaderResolver instance
+
+        """
+        assert isinstance(resolver, AsyncLoaderResolver);
+        self.__resolver = resolver;
+
+    def resolve(self, resource, resourceType = None):
+        loader = self.__resolver.resolve(resource, resourceType);
+        if isinstance(loader, ExecutorLoaderAdapter):
+            return loader.getLoader();
+        if isinstance(loader, AsyncLoaderInterface):
+            return False;
+
+        return loader;
+
+
+class AsyncLoaderResolver(LoaderResolver):
+    """AsyncLoaderResolver selects an asynchronous loader for a given
+    resource.
+
+    Synchronous loaders are adapted to run in an executor.
+
+    """
+    def __init__(self, loaders = None, executor = None):
+        """Constructor.
+
+        @param loaders: LoaderInterface[] An array of loaders
+        @param executor: Executor The executor running the synchronous
+            loaders, the default one of the event loop when None
+
+        """
+        self.__executor = executor;
+
+        LoaderResolver.__init__(self, loaders);
+
+    def addLoader(self, loader):
+        """Adds a loader, adapting synchronous ones.
+
+        @param loader: LoaderInterface A LoaderInterface instance
+
+        """
+        if not isinstance(loader, AsyncLoaderInterface):
+            loader = ExecutorLoaderAdapter.create(loader, self.__executor);
+
+        LoaderResolver.addLoader(self, loader);
+
+
+@abstract
+class AsyncLoader(AsyncLoaderInterface):
+    """AsyncLoader is the abstract class used by asynchronous loaders.
+    """
+    def __init__(self):
+        self._resolver = None;
+
+    def getResolver(self):
+        return self._resolver;
+
+    def setResolver(self, resolver):
+        assert isinstance(resolver, AsyncLoaderResolver);
+        self._resolver = resolver;
+
+    async def imports(self, resource, resourceType = None):
+        """Imports a resource.
+
+        @param resource: mixed
+        @param resourceType: string The resource type
+
+        @return: mixed
+
+        """
+        return await self.resolve(resource).load(resource, resourceType);
+
+    def resolve(self, resource, resourceType = None):
+        """Finds a loader able to load an imported resource.
+
+        @param resource: mixed
+        @param resourceType: string The resource type
+
+        @return: AsyncLoaderInterface An AsyncLoaderInterface instance
+
+        @raise FileLoaderLoadException: if no loader is found
+
+        """
+        if self.supports(resource, resourceType):
+            return self;
+
+        if self._resolver is None:
+            loader = False;
+        else:
+            loader = self._resolver.resolve(resource, resourceType);
+
+        if loader is False:
+            raise FileLoaderLoadException(resource);
+
+        return loader;
+
+
+class AsyncDelegatingLoader(AsyncLoader):
+    """AsyncDelegatingLoader delegates loading to other loaders using an
+    asynchronous loader resolver.
+
+    """
+    def __init__(self, resolver):
+        """Constructor.
+
+        @param resolver: AsyncLoaderResolver An AsyncLoaderResolver instance
+
+        """
+        assert isinstance(resolver, AsyncLoaderResolver);
+        self._resolver = resolver;
+
+    async def load(self, resource, resourceType = None):
+        """Loads a resource.
+
+        @param resource: mixed
+        @param resourceType: string The resource type
+
+        @return: mixed
+
+        @raise FileLoaderLoadException: if no loader is found.
+
+        """
+        loader = self._resolver.resolve(resource, resourceType);
+        if loader is False:
+            raise FileLoaderLoadException(resource);
+
+        return await loader.load(resource, resourceType);
+
+    def supports(self, resource, resourceType = None):
+        return False if False is self._resolver.resolve(resource, resourceType) else True;
+
+    def resolve(self, resource, resourceType = None):
+        """Finds a loader able to load an imported resource.
+
+        The loader is resolved once, rather than by supports() then
+        by load().
+
+        @param resource: mixed
+        @param resourceType: string The resource type
+
+        @return: AsyncLoaderInterface An AsyncLoaderInterface instance
+
+        @raise FileLoaderLoadException: if no loader is found
+
+        """
+        loader = self._resolver.resolve(resource, resourceType);
+        if loader is False:
+            raise FileLoaderLoadException(resource);
+
+        return loader;
+
+
+@abstract
+class AsyncFileLoader(AsyncLoader):
+    """AsyncFileLoader is the abstract class used by asynchronous loaders
+    that are file based.
+
+    importMany() loads sibling resources in concurrent tasks. The import
+    chain is kept in a context variable, so that each task continues the
+    one of its caller. Each task also starts from the current directory of
+    its caller, and the current directories set by the task are kept for
+    this task only.
+
+    """
+    __chain = contextvars.ContextVar('AsyncFileLoader.chain', default=());
+    # the current directories of the loaders in a task, by loader id
+    __currentDirs = contextvars.ContextVar(
+        'AsyncFileLoader.currentDirs', default=None
+    );
+
+    def __init__(self, locator):
+        """Constructor.
+
+        @param locator: FileLocatorInterface A FileLocatorInterface instance
+
+        """
+        assert isinstance(locator, FileLocatorInterface);
+        AsyncLoader.__init__(self);
+
+        self.__currentDir = None;
+        self._locator = locator;
+
+    def setCurrentDir(self, directory):
+        currentDirs = self.__currentDirs.get();
+        if currentDirs is None:
+            self.__currentDir = directory;
+        else:
+            currentDirs[id(self)] = directory;
+
+    def getLocator(self):
+        return self._locator;
+
+    async def imports(self, resource, resourceType = None,
+                ignoreErrors = False, sourceResource = None):
+        """Imports a resource.
+
+        @param resource: mixed
+        @param resourceType: string The resource type
+        @param ignoreErrors: Boolean Whether to ignore import errors or not
+        @param sourceResource: string The original resource
+            importing the new resource
+
+        @return: mixed
+
+        @raise FileLoaderLoadException:
+        @raise FileLoaderImportCircularReferenceException:
+
+        """
+        try:
+            loader = self.resolve(resource, resourceType);
+            currentDir = self.__getCurrentDir();
+            if self.__isFileLoader(loader) and not currentDir is None:
+                resource = self._locator.locate(resource, currentDir);
+
+            chain = self.__chain.get();
+            if resource in chain:
+                raise FileLoaderImportCircularReferenceException(
+                    list(chain)
+                );
+
+            token = self.__chain.set(chain + (resource,));
+            try:
+                return await loader.load(resource, resourceType);
+            finally:
+                self.__chain.reset(token);
+        except FileLoaderImportCircularReferenceException as e:
+            raise e;
+        except Exception as e:
+            if not ignoreErrors:
+                # prevent embedded imports from nesting multiple exceptions
+                if isinstance(e, FileLoaderLoadException):
+                    raise e;
+                raise FileLoaderLoadException(resource, sourceResource, 0, e);
+
+    async def importMany(self, resources, resourceType = None,
+                ignoreErrors = False, sourceResource = None):
+        """Imports resources which do not depend on each other, in
+        concurrent tasks.
+
+        @param resources: list
+        @param resourceType: string The resource type
+        @param ignoreErrors: Boolean Whether to ignore import errors or not
+        @param sourceResource: string The original resource
+            importing the new resources
+
+        @return: list The results, in the order of the resources
+
+        @raise FileLoaderLoadException: The first error in the order of
+            the resources
+        @raise FileLoaderImportCircularReferenceException:
+
+        """
+        currentDir = self.__getCurrentDir();
+        results = await asyncio.gather(*[
+            self.__importConcurrently(currentDir, resource, resourceType,
+                ignoreErrors, sourceResource)
+            for resource in resources
+        ], return_exceptions=True);
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result;
+
+        return list(results);
+
+    @classmethod
+    def _getImportChain(cls):
+        """Gets the resources being imported by the current import chain.
+
+        @return: tuple The resources, from the first imported one
+
+        """
+        return cls.__chain.get();
+
+    def __getCurrentDir(self):
+        currentDirs = self.__currentDirs.get();
+        if currentDirs is not None and id(self) in currentDirs:
+            return currentDirs[id(self)];
+
+        return self.__currentDir;
+
+    async def __importConcurrently(self, currentDir, *args):
+        # gather() runs each coroutine in a task with a copy of the context
+        self.__currentDirs.set({id(self): currentDir});
+
+        return await self.imports(*args);
+
+    def __isFileLoader(self, loader):
+        if isinstance(loader, ExecutorLoaderAdapter):
+            loader = loader.getLoader();
+
+        return isinstance(loader, (AsyncFileLoader, FileLoader));
@@ -8,6 +8,14 @@
 from __future__ import absolute_import;
 
 import json;
+import copy;
+import hashlib;
+import marshal;
+import threading;
+try:
+    from collections.abc import Mapping;
+except ImportError:
+    from collections import Mapping;
 
 from pymfony.component.system import Object;
 from pymfony.component.system import Tool;
@@ -140,9 +148,52 @@ class Processor(Object):
     """This class is the entry point for config
     normalization/merging/finalization.
 
+    The node trees are compiled into execution plans, see NodeCompiler.
+    The plans of the last processed trees are kept, and compiled again
+    once their tree has been modified.
+
     @author Johannes M. Schmitt <schmittjoh@gmail.com>
 
     """
+    def __init__(self, maxPlans=32):
+        """Constructor.
+
+        @param maxPlans: int The number of compiled node trees to keep
+
+        """
+        self.__compiler = NodeCompiler();
+        self.__plans = OrderedDict();
+        self.__maxPlans = int(maxPlans);
+        self.__lock = threading.Lock();
+
+    def compile(self, configTree):
+        """Compiles a node tree into an execution plan.
+
+        @param configTree: NodeInterface The node tree describing
+            the configuration
+
+        @return: NodePlan The execution plan of the node tree
+
+        """
+        assert isinstance(configTree, NodeInterface);
+
+        # the plan holds a reference to the tree, so its id stays unique
+        key = id(configTree);
+        with self.__lock:
+            plan = self.__plans.pop(key, None);
+
+        if plan is None or not plan.isFresh():
+            plan = self.__compiler.compile(configTree);
+
+        with self.__lock:
+            self.__plans.pop(key, None);
+            while self.__plans and len(self.__plans) >= self.__maxPlans:
+                del self.__plans[next(iter(self.__plans))];
+            if self.__maxPlans > 0:
+                self.__plans[key] = plan;
+
+        return plan;
+
     def process(self, configTree, configs):
         """Processes an array of configurations.
 
@@ -156,12 +207,14 @@ class Processor(Object):
         assert isinstance(configTree, NodeInterface);
         assert isinstance(configs, list);
 
+        plan = self.compile(configTree);
+
         currentConfig = dict();
         for config in configs:
-            config = configTree.normalize(config);
-            currentConfig = configTree.merge(currentConfig, config);
+            config = plan.normalize(config);
+            currentConfig = plan.merge(currentConfig, config);
 
-        return configTree.finalize(currentConfig);
+        return plan.finalize(currentConfig);
 
     def processConfiguration(self, configuration, configs):
         """Processes an array of configurations.
@@ -225,6 +278,442 @@ class Processor(Object):
         return list(values);
 
 
+class CachingProcessor(Processor):
+    """Processor that memoizes the processed configurations.
+
+    Results are keyed by the plan of the node tree, compiled again once
+    the tree is modified, and a structural hash of the raw
+    configurations, and the least recently used entries
+    are evicted once the cache is full. Configurations holding values
+    that cannot be hashed structurally are always processed.
+
+    The cache may be shared by several threads, the configurations are
+    processed outside of its lock.
+
+    """
+    def __init__(self, maxSize=128):
+        """Constructor.
+
+        @param maxSize: int The number of processed configurations to keep
+
+        """
+        Processor.__init__(self);
+
+        self.__maxSize = int(maxSize);
+        self.__results = OrderedDict();
+        self.__trees = OrderedDict();
+        self.__hits = 0;
+        self.__misses = 0;
+        self.__lock = threading.Lock();
+
+    def process(self, configTree, configs):
+        """Processes an array of configurations.
+
+        @param configTree: NodeInterface The node tree describing
+            the configuration
+        @param configs: list An array of configuration items to process
+
+        @return dict The processed configuration
+
+        """
+        assert isinstance(configTree, NodeInterface);
+        assert isinstance(configs, list);
+
+        digest = self.hashConfigs(configs);
+        if digest is None:
+            with self.__lock:
+                self.__misses += 1;
+            return Processor.process(self, configTree, configs);
+
+        # each entry holds the plan, so that its id can not be reused by
+        # another plan while the entry is cached
+        plan = self.compile(configTree);
+        key = (id(plan), digest);
+        with self.__lock:
+            entry = self.__results.pop(key, None);
+            if entry is not None and entry[0] is plan:
+                self.__hits += 1;
+                self.__results[key] = entry;
+            else:
+                entry = None;
+                self.__misses += 1;
+
+        if entry is not None:
+            # the cached results are never altered
+            return copy.deepcopy(entry[1]);
+
+        result = Processor.process(self, configTree, configs);
+        entry = (plan, copy.deepcopy(result));
+
+        with self.__lock:
+            self.__results.pop(key, None);
+            self._remember(self.__results, key, entry);
+
+        return result;
+
+    def processConfiguration(self, configuration, configs):
+        """Processes an array of configurations.
+
+        The node tree is built once per configuration instance.
+
+        @param configuration: ConfigurationInterface The configuration class
+        @param configs: list An array of configuration items to process
+
+        @return dict The processed configuration
+
+        """
+        assert isinstance(configuration, ConfigurationInterface);
+        assert isinstance(configs, list);
+
+        key = id(configuration);
+        with self.__lock:
+            entry = self.__trees.pop(key, None);
+            if entry is not None:
+                self.__trees[key] = entry;
+
+        if entry is None:
+            entry = (configuration, configuration.getConfigTreeBuilder().buildTree());
+            with self.__lock:
+                self.__trees.pop(key, None);
+                self._remember(self.__trees, key, entry);
+
+        return self.process(entry[1], configs);
+
+    def getStats(self):
+        """Returns the cache statistics.
+
+        @return: dict With the "hits", "misses", "size" and "maxSize" keys
+        """
+        with self.__lock:
+            return {
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'size': len(self.__results),
+                'maxSize': self.__maxSize,
+            };
+
+    def clear(self):
+        """Clears the cached results and statistics.
+        """
+        with self.__lock:
+            self.__results.clear();
+            self.__trees.clear();
+            self.__hits = 0;
+            self.__misses = 0;
+
+    def _remember(self, entries, key, value):
+        """Stores a value as the most recently used one, the lock of the
+        cache being held.
+
+        @param entries: OrderedDict The cache entries
+        @param key:     mixed       The entry key
+        @param value:   mixed       The entry value
+        """
+        while entries and len(entries) >= self.__maxSize:
+            del entries[next(iter(entries))];
+        if self.__maxSize > 0:
+            entries[key] = value;
+
+    @classmethod
+    def hashConfigs(cls, configs):
+        """Computes a stable structural hash of raw configurations.
+
+        Two configurations have the same hash when they hold the same
+        values with the same types, in the same order. The items of the
+        sets are hashed in their iteration order, so two equal sets may
+        have different hashes, which only makes the cache miss.
+
+        @param configs: list An array of configuration items
+
+        @return: string|None The hexadecimal digest, or None when a value
+            is neither of a type supported by marshal (scalars, lists,
+            tuples, dicts, sets and frozensets) nor serializable to JSON,
+            as the subclasses of the dicts, lists and scalars and the
+            read-only mappings of the frozen documents are
+        """
+        try:
+            # the version 2 does not depend on the references between values
+            data = b'm' + marshal.dumps(configs, 2);
+        except ValueError:
+            # e.g. subclasses of the built-in types
+            try:
+                json.dumps(configs, default=cls.__serializeMapping);
+            except (TypeError, ValueError):
+                return None;
+
+            # the representation keeps the types and the order of the keys
+            data = b'r' + repr(configs).encode('utf-8');
+
+        return hashlib.sha1(data).hexdigest();
+
+    @classmethod
+    def __serializeMapping(cls, value):
+        """Lets JSON serialize the read-only mappings, e.g. the ones of a
+        document frozen by a DocumentCache, whose representation is as
+        stable as the one of a dict.
+
+        @raise TypeError: When the value is not a mapping
+        """
+        if isinstance(value, Mapping):
+            return dict(value);
+
+        raise TypeError('{0!r} is not JSON serializable'.format(value));
+
+
+class IncrementalProcessor(Object):
+    """Processes layered configurations against a single node tree,
+    re-processing only what changed since the previous run.
+
+    The normalized value of each source is kept, along with the merged
+    value of the sources up to each of them, so when a source changes only
+    this source is normalized again and the merge resumes from the merged
+    value of the sources before it.
+
+    When dirty tracking is enabled, the paths found in the changed sources
+    are marked as dirty and the other subtrees reuse their previously
+    finalized value. The finalized value is kept apart, each run returns
+    a copy of it.
+
+    Once the node tree has been modified, process() starts over with the
+    new plan of the tree.
+
+    """
+    def __init__(self, configTree, processor=None, trackDirty=False):
+        """Constructor.
+
+        @param configTree: NodeInterface The node tree describing
+            the configuration
+        @param processor: Processor The processor used to compile the tree
+        @param trackDirty: Boolean Whether to only finalize dirty subtrees
+
+        """
+        assert isinstance(configTree, NodeInterface);
+        if processor is None:
+            processor = Processor();
+        assert isinstance(processor, Processor);
+
+        self.__configTree = configTree;
+        self.__processor = processor;
+        self.__plan = processor.compile(configTree);
+        self.__trackDirty = bool(trackDirty);
+        self.__digests = list();
+        self.__normalized = list();
+        # merged values of the sources up to each index
+        self.__prefixes = list();
+        self.__finalized = None;
+
+    def process(self, configs):
+        """Processes an array of configurations.
+
+        Sources are compared with the previous run through their
+        structural hash, see CachingProcessor.hashConfigs(). update() skips
+        the hashing when the changed source is known.
+
+        @param configs: list An array of configuration items to process
+
+        @return dict The processed configuration
+
+        """
+        assert isinstance(configs, list);
+
+        plan = self.__processor.compile(self.__configTree);
+        if plan is not self.__plan:
+            # the kept values have been processed with the previous settings
+            self.reset();
+            self.__plan = plan;
+
+        digests = list();
+        normalized = list();
+        dirty = None;
+        start = len(configs);
+        for i in range(len(configs)):
+            digest = CachingProcessor.hashConfigs([configs[i]]);
+            digests.append(digest);
+
+            if i < len(self.__digests) and digest is not None \
+                and digest == self.__digests[i]:
+                normalized.append(self.__normalized[i]);
+                continue;
+
+            normalized.append(self.__normalize(configs[i]));
+            start = min(start, i);
+
+            if self.__trackDirty:
+                dirty = self.__plan.touch(normalized[i], dirty);
+                if i < len(self.__normalized):
+                    dirty = self.__plan.touch(self.__normalized[i], dirty);
+
+        # removed sources
+        if self.__trackDirty:
+            for value in self.__normalized[len(configs):]:
+                dirty = self.__plan.touch(value, dirty);
+
+        return self.__rebuild(start, digests, normalized, dirty);
+
+    def update(self, index, config):
+        """Replaces one configuration of the previous run.
+
+        @param index:  int   The position of the configuration
+        @param config: mixed The new configuration item
+
+        @return dict The processed configuration
+
+        @raise InvalidArgumentException: When the index is out of range
+        @raise RuntimeException: When the node tree has been modified since
+            the previous run
+
+        """
+        if not self.__plan.isFresh():
+            raise RuntimeException(
+                'The node tree has been modified since the previous run, '
+                'process() all the configurations again.'
+            );
+
+        index = int(index);
+        if index < 0 or index >= len(self.__digests):
+            raise InvalidArgumentException(
+                'There is no configuration at index {0}.'.format(index)
+            );
+
+        digests = list(self.__digests);
+        normalized = list(self.__normalized);
+        digests[index] = CachingProcessor.hashConfigs([config]);
+        normalized[index] = self.__normalize(config);
+
+        dirty = None;
+        if self.__trackDirty:
+            dirty = self.__plan.touch(normalized[index]);
+            dirty = self.__plan.touch(self.__normalized[index], dirty);
+
+        return self.__rebuild(index, digests, normalized, dirty);
+
+    def reset(self):
+        """Forgets the previous run.
+        """
+        self.__digests = list();
+        self.__normalized = list();
+        self.__prefixes = list();
+        self.__finalized = None;
+
+    def __normalize(self, config):
+        # normalization alters the given value, keep the caller's intact
+        return self.__plan.normalize(self.__copy(config));
+
+    def __copy(self, value):
+        """Copies a configuration value, faster than copy.deepcopy() for
+        dicts, lists and scalars.
+
+        """
+        try:
+            return marshal.loads(marshal.dumps(value));
+        except ValueError:
+            # values that can not be marshalled
+            return self.__copyValue(value);
+
+    def __copyValue(self, value):
+        # the read-only mappings of a frozen document can not be deep
+        # copied, they are thawed as the array nodes do
+        if type(value) is dict or (
+            isinstance(value, Mapping) and not isinstance(value, dict)):
+            copied = dict();
+            for k, v in value.items():
+                copied[k] = self.__copyValue(v);
+            return copied;
+        if type(value) is list:
+            return [self.__copyValue(v) for v in value];
+        if type(value) is tuple:
+            return tuple(self.__copyValue(v) for v in value);
+        if value is None or type(value) in (bool, int, float, str):
+            return value;
+
+        return copy.deepcopy(value);
+
+    def __isolate(self, leftSide, rightSide):
+        """Copies the dicts of a merged value that merging another value
+        into it alters.
+
+        The built-in nodes only alter the left side along the keys of the
+        right side, and insert the values of the right side as they are.
+
+        """
+        if type(leftSide) is not dict or type(rightSide) is not dict:
+            return leftSide;
+
+        copied = leftSide.copy();
+        for k, v in rightSide.items():
+            if k in copied:
+                copied[k] = self.__isolate(copied[k], v);
+
+        return copied;
+
+    def __resume(self, prefixes, normalized):
+        """Merges the sources following the last kept merged value,
+        appending the merged value of each source to the kept ones.
+
+        @return: dict A copy of the merged value of all the sources
+        """
+        if prefixes:
+            currentConfig = prefixes[-1];
+        else:
+            currentConfig = dict();
+
+        last = len(normalized) - 1;
+        for i in range(len(prefixes), len(normalized)):
+            currentConfig = self.__plan.merge(
+                self.__isolate(currentConfig, normalized[i]),
+                normalized[i]
+            );
+
+            # the merged value of all the sources is only finalized
+            if i < last:
+                prefixes.append(currentConfig);
+
+        return self.__copy(currentConfig);
+
+    def __rebuild(self, start, digests, normalized, dirty):
+        """Merges the sources from the given position and finalizes
+        the result.
+
+        merge() and finalize() alter their arguments, so the kept values are
+        only merged into through isolated copies, see __isolate(), and only
+        a copy of the merged value is finalized. When the first source
+        changed, nothing can be reused: copies of the sources are merged and
+        no merged value is kept.
+
+        """
+        if start == 0:
+            prefixes = list();
+            currentConfig = dict();
+            for value in normalized:
+                currentConfig = self.__plan.merge(
+                    currentConfig,
+                    self.__copy(value)
+                );
+        else:
+            # the merged values including a changed source are stale
+            prefixes = self.__prefixes[:start];
+            currentConfig = self.__resume(prefixes, normalized);
+
+        if not self.__trackDirty:
+            result = self.__plan.finalize(currentConfig);
+        else:
+            if self.__finalized is None:
+                self.__finalized = self.__plan.finalize(currentConfig);
+            else:
+                self.__finalized = self.__plan.refinalize(
+                    currentConfig, dirty, self.__finalized
+                );
+
+            # the caller may alter the result, the reused subtrees must not
+            result = self.__copy(self.__finalized);
+
+        self.__digests = digests;
+        self.__normalized = normalized;
+        self.__prefixes = prefixes;
+
+        return result;
+
+
 @abstract
 class BaseNode(NodeInterface):
     """The base node class
@@ -244,6 +733,8 @@ class BaseNode(NodeInterface):
         if parent is not None:
             assert isinstance(parent, NodeInterface);
 
+        # bumped by the setters, see NodePlan.isFresh()
+        self._revision = 0;
         self._attributes = OrderedDict();
 
         self._name = name;
@@ -313,6 +804,7 @@ class BaseNode(NodeInterface):
         @param equivalentValue: mixed
         """
         self._equivalentValues.append([originalValue, equivalentValue]);
+        self._revision += 1;
 
     def setRequired(self, boolean):
         """Set this node as required.
@@ -320,6 +812,7 @@ class BaseNode(NodeInterface):
         @param boolean: Boolean Required node
         """
         self._required = bool(boolean);
+        self._revision += 1;
 
     def setAllowOverwrite(self, allow):
         """Sets if this node can be overridden.
@@ -327,6 +820,7 @@ class BaseNode(NodeInterface):
         @param allow: Boolean
         """
         self._allowOverwrite = bool(allow);
+        self._revision += 1;
 
     def setNormalizationClosures(self, closures):
         """Sets the closures used for normalization.
@@ -335,6 +829,7 @@ class BaseNode(NodeInterface):
         """
         assert isinstance(closures, list);
         self._normalizationClosures = closures;
+        self._revision += 1;
 
     def setFinalValidationClosures(self, closures):
         """Sets the closures used for final validation.
@@ -344,6 +839,7 @@ class BaseNode(NodeInterface):
         """
         assert isinstance(closures, list);
         self._finalValidationClosures = closures;
+        self._revision += 1;
 
     def isRequired(self):
         """Checks if this node is required.
@@ -433,6 +929,51 @@ class BaseNode(NodeInterface):
         """
         return value;
 
+    def _thaw(self, value, deep=False):
+        """Turns a read-only mapping into a dict, a tuple into a list and
+        a frozenset into a set, i.e. undoes DocumentCache.freeze().
+
+        @param value: mixed
+        @param deep:  Boolean Whether the nested values are thawed too,
+                      the dicts and lists are only copied when one of
+                      their values changed.
+
+        @return: mixed
+
+        """
+        if isinstance(value, tuple):
+            value = list(value);
+        elif isinstance(value, frozenset):
+            return set(value);
+        elif isinstance(value, Mapping) and not isinstance(value, dict):
+            value = dict(value);
+        elif not deep or not isinstance(value, (dict, list)):
+            return value;
+        elif isinstance(value, dict):
+            thawed = None;
+            for k, v in value.items():
+                t = self._thaw(v, True);
+                if t is not v:
+                    if thawed is None:
+                        thawed = dict(value);
+                    thawed[k] = t;
+            return value if thawed is None else thawed;
+        else:
+            thawed = [self._thaw(v, True) for v in value];
+            for t, v in zip(thawed, value):
+                if t is not v:
+                    return thawed;
+            return value;
+
+        if deep:
+            if isinstance(value, dict):
+                for k, v in value.items():
+                    value[k] = self._thaw(v, True);
+            else:
+                value[:] = [self._thaw(v, True) for v in value];
+
+        return value;
+
     @final
     def finalize(self, value):
         """Finalizes a value, applying all finalization closures.
@@ -522,6 +1063,7 @@ class VariableNode(BaseNode, PrototypeNodeInterface):
     def setDefaultValue(self, value):
         self._defaultValueSet = True;
         self._defaultValue = value;
+        self._revision += 1;
 
     def hasDefaultValue(self):
         return self._defaultValueSet;
@@ -538,6 +1080,7 @@ class VariableNode(BaseNode, PrototypeNodeInterface):
         @param boolean: Boolean
         """
         self._allowEmptyValue = bool(boolean);
+        self._revision += 1;
 
     def setName(self, name):
         self._name = name;
@@ -556,7 +1099,8 @@ class VariableNode(BaseNode, PrototypeNodeInterface):
         return value;
 
     def _normalizeValue(self, value):
-        return value;
+        # the values of a frozen document come out as dicts and lists
+        return self._thaw(value, True);
 
     def _mergeValues(self, leftSide, rightSide):
         return rightSide;
@@ -626,6 +1170,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
 
     def setNormalizeKeys(self, normalizeKeys):
         self._normalizeKeys = bool(normalizeKeys);
+        self._revision += 1;
 
     def _preNormalize(self, value):
         """Normalizes keys between the different configuration formats.
@@ -636,15 +1181,22 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         If you have a mixed key like foo-bar_moo, it will not be altered.
         The key will also not be altered if the target key already exists.
 
+        Read-only mappings and tuples, e.g. the documents frozen by a
+        DocumentCache, are also turned into dicts and lists, one level at
+        a time.
+
         @param value: mixed
 
         @return dict The value with normalized keys
 
         """
+        if type(value) is not dict and type(value) is not list:
+            value = self._thaw(value);
+
         if not self._normalizeKeys or not isinstance(value, dict):
             return value;
 
-        for k, v in value.items():
+        for k, v in list(value.items()):
             if '-' in str(k):
                 if not '_' in str(k):
                     normalizedKey = str(k).replace('-', '_');
@@ -667,6 +1219,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @param xmlRemappings: an list of the form list(list(string, string))
         """
         self._xmlRemappings = list(xmlRemappings);
+        self._revision += 1;
 
     def setAddIfNotSet(self, boolean):
         """Sets whether to add default values for this array if it has not
@@ -675,6 +1228,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @param boolean: Boolean
         """
         self._addIfNotSet = bool(boolean);
+        self._revision += 1;
 
     def setAllowFalse(self, allow):
         """Sets whether false is allowed as value indicating that
@@ -683,6 +1237,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @param allow: Boolean
         """
         self._allowFalse = bool(allow);
+        self._revision += 1;
 
     def setAllowNewKeys(self, allow):
         """Sets whether new keys can be defined in subsequent configurations.
@@ -690,6 +1245,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @param allow: Boolean
         """
         self._allowNewKeys = bool(allow);
+        self._revision += 1;
 
     def setPerformDeepMerging(self, boolean):
         """Sets if deep merging should occur.
@@ -697,6 +1253,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @param boolean: Boolean
         """
         self._performDeepMerging = bool(boolean);
+        self._revision += 1;
 
     def setIgnoreExtraKeys(self, boolean):
         """Whether extra keys should just be ignore without an exception.
@@ -704,6 +1261,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @param boolean: Boolean To allow extra keys
         """
         self._ignoreExtraKeys = bool(boolean);
+        self._revision += 1;
 
     def setName(self, name):
         """Sets the node Name.
@@ -764,6 +1322,7 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
             );
 
         self._children[name] = node;
+        self._revision += 1;
 
 
     def _finalizeValue(self, value):
@@ -776,6 +1335,25 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @raise UnsetKeyException:
         @raise InvalidConfigurationException: if the node doesn't have enough children
 
+        """
+        return self._finalizeChildren(value, (
+            (name, child, child.finalize)
+            for name, child in self._children.items()
+        ));
+
+    def _finalizeChildren(self, value, finalizers):
+        """Finalizes the value of this node, the values of the children
+        being finalized by the given callables, e.g. the ones of a NodePlan.
+
+        @param value:      mixed
+        @param finalizers: iterable The (name, child, finalize) triples of
+            the children, see _finalizeChild()
+
+        @return: mixed The finalised value
+
+        @raise UnsetKeyException:
+        @raise InvalidConfigurationException: if a required child is missing
+
         """
         if value is False:
             raise UnsetKeyException(
@@ -783,28 +1361,41 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
                 ''.format(self.getPath(), json.dumps(value))
             );
 
-        for name, child in self._children.items():
+        for name, child, finalize in finalizers:
             assert isinstance(child, NodeInterface);
-            if not name in value:
-                if child.isRequired():
-                    ex = InvalidConfigurationException(
-                        'The child node "{0}" at path "{1}" must be '
-                        'configured.'.format(name, self.getPath())
-                    );
-                    ex.setPath(self.getPath());
-                    raise ex;
+            self._finalizeChild(name, child, value, finalize);
 
-                if child.hasDefaultValue():
-                    value[name] = child.getDefaultValue();
+        return value;
 
-                continue;
+    def _finalizeChild(self, name, child, value, finalize):
+        """Finalizes the value of a child in the value of this node.
 
-            try:
-                value[name] = child.finalize(value[name]);
-            except UnsetKeyException:
-                value.pop(name);
+        @param name:     string        The name of the child
+        @param child:    NodeInterface The child node
+        @param value:    dict          The value of this node
+        @param finalize: callable      Finalizes the value of the child
 
-        return value;
+        @raise InvalidConfigurationException: if a required child is missing
+
+        """
+        if not name in value:
+            if child.isRequired():
+                ex = InvalidConfigurationException(
+                    'The child node "{0}" at path "{1}" must be '
+                    'configured.'.format(name, self.getPath())
+                );
+                ex.setPath(self.getPath());
+                raise ex;
+
+            if child.hasDefaultValue():
+                value[name] = child.getDefaultValue();
+
+            return;
+
+        try:
+            value[name] = finalize(value[name]);
+        except UnsetKeyException:
+            value.pop(name);
 
     def _validateType(self, value):
         """Validates the type of the value.
@@ -832,6 +1423,24 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
 
         @raise InvalidConfigurationException:
 
+        """
+        return self._normalizeChildren(value, (
+            (name, child.normalize)
+            for name, child in self._children.items()
+        ));
+
+    def _normalizeChildren(self, value, normalizers):
+        """Normalizes the value, the values of the children being
+        normalized by the given callables, e.g. the ones of a NodePlan.
+
+        @param value:       mixed    The value to normalize
+        @param normalizers: iterable The (name, normalize) pairs of the
+            children
+
+        @return: mixed The normalized value
+
+        @raise InvalidConfigurationException:
+
         """
         if value is False:
             return value;
@@ -844,16 +1453,12 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         value = self._remapXml(value);
         normalized = dict();
 
-        valueCopy = value.copy();
-
-        for name, child in self._children.items():
-            assert isinstance(child, NodeInterface)
-            if name in valueCopy:
-                normalized[name] = child.normalize(value[name]);
-                valueCopy.pop(name);
+        for name, normalize in normalizers:
+            if name in value:
+                normalized[name] = normalize(value[name]);
 
         # if extra fields are present, throw exception
-        if valueCopy and not self._ignoreExtraKeys:
+        if len(normalized) < len(value) and not self._ignoreExtraKeys:
             ex = InvalidConfigurationException(
                 'Unrecognized options "{0}" under "{1}"'
                 ''.format(", ".join(value.keys()), self.getPath())
@@ -893,6 +1498,24 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
         @rasie InvalidConfigurationException:
         @rasie RuntimeException:
 
+        """
+        return self._mergeChildren(leftSide, rightSide, dict(
+            (name, child.merge) for name, child in self._children.items()
+        ));
+
+    def _mergeChildren(self, leftSide, rightSide, mergers):
+        """Merges values together, the values of the children being merged
+        by the given callables, e.g. the ones of a NodePlan.
+
+        @param leftSide:  mixed The left side to merge.
+        @param rightSide: mixed The right side to merge.
+        @param mergers:   dict  The merge callables, by child name
+
+        @return: mixed The merged values
+
+        @raise InvalidConfigurationException:
+        @raise RuntimeException:
+
         """
         if rightSide is False:
             # if this is still false after the last config has been merged the
@@ -922,12 +1545,12 @@ class ArrayNode(BaseNode, PrototypeNodeInterface):
                 leftSide[k] = v;
                 continue;
 
-            if k not in self._children:
+            if k not in mergers:
                 raise RuntimeException(
                     'merge() expects a normalized config array.'
                 );
 
-            leftSide[k] = self._children[k].merge(leftSide[k], v);
+            leftSide[k] = mergers[k](leftSide[k], v);
 
         return leftSide;
 
@@ -961,6 +1584,7 @@ class PrototypedArrayNode(ArrayNode):
 
         """
         self._minNumberOfElements = int(numder);
+        self._revision += 1;
 
     def setKeyAttribute(self, attribute, remove=True):
         """Sets the attribute which value is to be used as key.
@@ -990,6 +1614,7 @@ class PrototypedArrayNode(ArrayNode):
         """
         self._keyAttribute = str(attribute);
         self._removeKeyAttribute = bool(remove);
+        self._revision += 1;
 
     def getKeyAttribute(self):
         """Retrieves the name of the attribute which value should be used as
@@ -1015,6 +1640,7 @@ class PrototypedArrayNode(ArrayNode):
             );
 
         self._defaultValue = value;
+        self._revision += 1;
 
     def hasDefaultValue(self):
         """Checks if the node has a default value.
@@ -1042,6 +1668,7 @@ class PrototypedArrayNode(ArrayNode):
 
         assert isinstance(children, dict);
         self._defaultChildren = children;
+        self._revision += 1;
 
     def getDefaultValue(self):
         """Retrieves the default value.
@@ -1078,6 +1705,7 @@ class PrototypedArrayNode(ArrayNode):
         """
         assert isinstance(node, PrototypeNodeInterface);
         self._prototype = node;
+        self._revision += 1;
 
     def getPrototype(self):
         """Retrieves the prototype
@@ -1106,6 +1734,25 @@ class PrototypedArrayNode(ArrayNode):
 
         @return mixed The finalized value
 
+        @raise UnsetKeyException:
+        @raise InvalidConfigurationException: if the node doesn't have enough
+            children
+
+        """
+        finalize = self._prototype.finalize;
+
+        return self._finalizeElements(value, lambda k, v: finalize(v));
+
+    def _finalizeElements(self, value, finalize):
+        """Finalizes the value of this node, the elements being finalized
+        by the given callable, e.g. the one of a NodePlan.
+
+        @param value:    mixed
+        @param finalize: callable Finalizes an element given its key and
+            its value, raises an UnsetKeyException to unset it
+
+        @return mixed The finalized value
+
         @raise UnsetKeyException:
         @raise InvalidConfigurationException: if the node doesn't have enough
             children
@@ -1113,20 +1760,36 @@ class PrototypedArrayNode(ArrayNode):
         """
         if value is False:
             raise UnsetKeyException(
-                'Unsetting key for path "%s", value: %s'
+                'Unsetting key for path "{0}", value: {1}'
                 ''.format(self.getPath(), json.dumps(value))
             )
 
         assert isinstance(value, dict);
 
+        unset = list();
         for k, v in value.items():
             self._prototype.setName(k);
             try:
-                value[k] = self._prototype.finalize(v);
+                value[k] = finalize(k, v);
             except UnsetKeyException:
-                value.pop(k);
+                unset.append(k);
+        for k in unset:
+            value.pop(k);
+
+        self._checkNumberOfElements(len(value));
+
+        return value;
+
+    def _checkNumberOfElements(self, count):
+        """Checks the number of finalized elements.
 
-        if len(value) < self._minNumberOfElements:
+        @param count: int The number of elements
+
+        @raise InvalidConfigurationException: if the node doesn't have enough
+            children
+
+        """
+        if count < self._minNumberOfElements:
             ex = InvalidConfigurationException(
                 'The path "{0}" should have at least {1} element(s) defined.'
                 ''.format(self.getPath(), self._minNumberOfElements)
@@ -1134,8 +1797,6 @@ class PrototypedArrayNode(ArrayNode):
             ex.setPath(self.getPath());
             raise ex;
 
-        return value;
-
     def _normalizeValue(self, value):
         """Normalizes the value.
 
@@ -1146,6 +1807,21 @@ class PrototypedArrayNode(ArrayNode):
         @raise InvalidConfigurationException:
         @raise DuplicateKeyException:
 
+        """
+        return self._normalizeElements(value, self._prototype.normalize);
+
+    def _normalizeElements(self, value, normalize):
+        """Normalizes the value, the elements being normalized by the given
+        callable, e.g. the one of a NodePlan.
+
+        @param value:     mixed    The value to normalize
+        @param normalize: callable Normalizes the value of an element
+
+        @return mixed The normalized value
+
+        @raise InvalidConfigurationException:
+        @raise DuplicateKeyException:
+
         """
         if value is False:
             return value;
@@ -1157,13 +1833,161 @@ class PrototypedArrayNode(ArrayNode):
 
         value = self._remapXml(value);
 
-        isAssoc = list(value.keys()) != list(range(len(value)));
         normalized = dict();
+        for k, v in self.__normalizeItems(
+            value.items(), self.__isAssoc(value), normalized, normalize
+        ):
+            normalized[k] = v;
+
+        return normalized;
+
+    def normalizeItems(self, items, assoc=False):
+        """Normalizes and finalizes a collection one item at a time.
+
+        Unlike normalize(), the collection is never materialized: each item
+        is normalized then finalized by the prototype as it is read, so
+        that the memory used does not grow with the size of the collection,
+        apart from the keys kept to detect duplicates when a key attribute
+        is set or when the keys of an associative array are normalized. The
+        items are not merged with other configurations.
+
+        The normalization closures, final validation closures and XML
+        remappings of this node need the whole collection, they are not
+        supported. Its equivalent values only replace the whole collection,
+        so they do not apply to the items.
+
+        The keys of an associative array are normalized as by normalize(),
+        except that a dashed key followed by its underscored twin, e.g.
+        "foo-bar" then "foo_bar", raises a DuplicateKeyException: the
+        dashed key has already been yielded as "foo_bar", while normalize()
+        keeps both keys. The dashed key is kept when its twin comes first.
+
+        @param items: iterable The values of a list, or the (key, value)
+            pairs of an associative array when assoc is True
+        @param assoc: Boolean Whether the keys of the items are preserved
+
+        @return: generator The finalized (key, value) pairs
+
+        @raise RuntimeException: if the node needs the whole collection
+        @raise InvalidConfigurationException:
+        @raise DuplicateKeyException:
+
+        """
+        if self._normalizationClosures or self._finalValidationClosures \
+            or self._xmlRemappings:
+            raise RuntimeException(
+                'The path "{0}" can not be normalized one item at a time.'
+                ''.format(self.getPath())
+            );
+
+        if assoc:
+            items = self.__normalizeItemKeys(items);
+        else:
+            items = enumerate(items);
+
+        if self._keyAttribute is None:
+            items = self.__normalizeItems(
+                items, assoc, None, self._prototype.normalize
+            );
+        else:
+            items = self.__normalizeKeyedItems(items, assoc);
+
+        return self.__finalizeItems(items);
+
+    def normalizeItemsInto(self, items, sink, assoc=False):
+        """Normalizes and finalizes a collection one item at a time into
+        a sink.
+
+        @param items: iterable The values of a list, or the (key, value)
+            pairs of an associative array when assoc is True
+        @param sink: object Any object supporting item assignment
+        @param assoc: Boolean Whether the keys of the items are preserved
+
+        @return: object The sink
+
+        @raise RuntimeException: if the node needs the whole collection
+        @raise InvalidConfigurationException:
+        @raise DuplicateKeyException:
+
+        """
+        for k, v in self.normalizeItems(items, assoc):
+            sink[k] = v;
+
+        return sink;
+
+    def __normalizeItemKeys(self, items):
+        if not self._normalizeKeys:
+            for k, v in items:
+                yield k, v;
+            return;
+
+        # without the whole collection, a dashed key is only kept when its
+        # underscored twin has already been read, see normalizeItems()
+        keys = set();
+        for k, v in items:
+            if '-' in str(k) and not '_' in str(k):
+                normalizedKey = str(k).replace('-', '_');
+                if not normalizedKey in keys:
+                    k = normalizedKey;
+
+            if k in keys:
+                ex = DuplicateKeyException(
+                    'Duplicate key "{0}" for path "{1}".'
+                    ''.format(k, self.getPath())
+                );
+                ex.setPath(self.getPath());
+                raise ex;
 
+            keys.add(k);
+            yield k, v;
+
+    def __normalizeKeyedItems(self, items, assoc):
+        keys = set();
+        for k, v in self.__normalizeItems(
+            items, assoc, keys, self._prototype.normalize
+        ):
+            keys.add(k);
+            yield k, v;
+
+    def __finalizeItems(self, items):
+        count = 0;
+        for k, v in items:
+            self._prototype.setName(k);
+            try:
+                v = self._prototype.finalize(v);
+            except UnsetKeyException:
+                continue;
+
+            count += 1;
+            yield k, v;
+
+        self._checkNumberOfElements(count);
+
+    def __isAssoc(self, value):
+        for i, k in enumerate(value):
+            if k != i:
+                return True;
+
+        return False;
+
+    def __normalizeItems(self, items, isAssoc, keys, normalize):
+        """Normalizes (key, value) pairs as they are consumed.
+
+        @param items: iterable The (key, value) pairs
+        @param isAssoc: Boolean Whether the keys are preserved
+        @param keys: set|dict The keys already consumed, to detect duplicates
+        @param normalize: callable Normalizes the value of an element
+
+        @return: generator The normalized (key, value) pairs
+
+        """
         i = -1;
-        for k, v in value.items():
+        for k, v in items:
             i += 1;
 
+            if self._keyAttribute is not None:
+                v = self._thaw(v);
+
             if self._keyAttribute is not None and isinstance(v, (dict, list)):
                 if isinstance(v, list):
                     v = Array.toDict(v);
@@ -1188,7 +2012,7 @@ class PrototypedArrayNode(ArrayNode):
                     if 1 == len(v) and 'value' in v:
                         v = v['value'];
 
-                if k in normalized:
+                if k in keys:
                     ex = DuplicateKeyException(
                         'Duplicate key "{0}" for path "{1}".'
                         ''.format(k, self.getPath())
@@ -1198,11 +2022,9 @@ class PrototypedArrayNode(ArrayNode):
 
             self._prototype.setName(k);
             if not self._keyAttribute is None or isAssoc:
-                normalized[k] = self._prototype.normalize(v);
+                yield k, normalize(v);
             else:
-                normalized[i] = self._prototype.normalize(v);
-
-        return normalized;
+                yield i, normalize(v);
 
     def _mergeValues(self, leftSide, rightSide):
         """Merges values together.
@@ -1215,6 +2037,21 @@ class PrototypedArrayNode(ArrayNode):
         @raise InvalidConfigurationException:
         @raise RuntimeException:
 
+        """
+        return self._mergeElements(leftSide, rightSide, self._prototype.merge);
+
+    def _mergeElements(self, leftSide, rightSide, merge):
+        """Merges values together, the elements sharing a key being merged
+        by the given callable, e.g. the one of a NodePlan.
+
+        @param leftSide:  mixed    The left side to merge.
+        @param rightSide: mixed    The right side to merge.
+        @param merge:     callable Merges the values of an element
+
+        @return mixed The merged values
+
+        @raise InvalidConfigurationException:
+
         """
         if rightSide is False:
             # if this is still false after the last config has been merged the
@@ -1230,13 +2067,12 @@ class PrototypedArrayNode(ArrayNode):
         if isinstance(rightSide, list):
             rightSide = Array.toDict(rightSide);
 
-        i = -1;
+        # the first free index only moves forward while appending
+        index = 0;
         for k, v in rightSide.items():
-            i += 1;
             # prototype, and key is irrelevant, so simply append the element
             if self._keyAttribute is None:
                 # dict: append
-                index = 0;
                 while index in leftSide:
                     index += 1;
                 leftSide[index] = v;
@@ -1259,7 +2095,7 @@ class PrototypedArrayNode(ArrayNode):
                 continue;
 
             self._prototype.setName(k);
-            leftSide[k] = self._prototype.merge(leftSide[k], v);
+            leftSide[k] = merge(leftSide[k], v);
 
         return leftSide;
 
@@ -1409,6 +2245,478 @@ class FloatNode(NumericNode):
 
 
 
+class NodePlan(Object):
+    """A compiled execution plan of a node tree.
+
+    It follows the normalize/merge/finalize contract of the compiled node
+    but runs closures bound to the settings of the nodes instead of
+    walking the node methods. It also knows the plans of the children, so
+    that the values of unchanged children can be reused, see refinalize().
+
+    """
+    def __init__(self, node, normalize, merge, finalize, revisions=None,
+        getChildPlan=None, refinalize=None):
+        """Constructor.
+
+        @param node:         NodeInterface The compiled node
+        @param normalize:    callable      The normalization closure
+        @param merge:        callable      The merging closure
+        @param finalize:     callable      The finalization closure
+        @param revisions:    list|None     The (node, revision) pairs of the
+            nodes whose settings are bound by the plan, see isFresh()
+        @param getChildPlan: callable|None Returns the plan of a child key,
+            None when the child is not tracked separately
+        @param refinalize:   callable|None The finalization closure
+            reusing the values of clean children
+
+        """
+        assert isinstance(node, NodeInterface);
+
+        self._node = node;
+        self._normalize = normalize;
+        self._merge = merge;
+        self._finalize = finalize;
+        self._revisions = list() if revisions is None else revisions;
+        self._getChildPlan = getChildPlan;
+        self._refinalize = refinalize;
+
+    def getNode(self):
+        """Returns the compiled node.
+
+        @return: NodeInterface
+        """
+        return self._node;
+
+    def isFresh(self):
+        """Checks that the nodes have not been modified since the plan was
+        compiled.
+
+        @return: Boolean
+        """
+        for node, revision in self._revisions:
+            if getattr(node, '_revision', 0) != revision:
+                return False;
+
+        return True;
+
+    def normalize(self, value):
+        """Normalizes the supplied value.
+
+        @param value: mixed The value to normalize
+
+        @return: mixed The normalized value
+        """
+        return self._normalize(value);
+
+    def merge(self, leftSide, rightSide):
+        """Merges two values together.
+
+        @param leftSide: mixed
+        @param rightSide: mixed
+
+        @return: mixed The merged values
+        """
+        return self._merge(leftSide, rightSide);
+
+    def finalize(self, value):
+        """Finalizes a value.
+
+        @param value: mixed The value to finalize
+
+        @return: mixed The finalized value
+        """
+        return self._finalize(value);
+
+    def touch(self, value, dirty=None):
+        """Marks the paths of a normalized value as dirty.
+
+        Dirty paths are stored as nested dicts where True marks a whole
+        subtree, e.g. {'connections': {'default': True}}.
+
+        @param value: mixed     A normalized value of this node
+        @param dirty: dict|True The dirty paths already known
+
+        @return: dict|True The dirty paths
+        """
+        if dirty is True or self._getChildPlan is None \
+            or not isinstance(value, dict):
+            return True;
+
+        if dirty is None:
+            dirty = dict();
+
+        for k, v in value.items():
+            plan = self._getChildPlan(k);
+            if plan is None:
+                dirty[k] = True;
+            else:
+                dirty[k] = plan.touch(v, dirty.get(k));
+
+        return dirty;
+
+    def refinalize(self, value, dirty, previous):
+        """Finalizes a value, reusing the previously finalized value of
+        children whose path is not dirty.
+
+        Reused values are shared with the previous result.
+
+        @param value:    mixed          The merged value to finalize
+        @param dirty:    dict|True|None The dirty paths, see touch()
+        @param previous: mixed          The previously finalized value
+
+        @return: mixed The finalized value
+        """
+        if dirty is None:
+            dirty = dict();
+
+        if self._refinalize is None or dirty is True \
+            or not isinstance(value, dict) or not isinstance(previous, dict):
+            return self._finalize(value);
+
+        return self._refinalize(value, dirty, previous);
+
+
+class NodeCompiler(Object):
+    """Compiles a built node tree into a NodePlan.
+
+    The settings of the built-in nodes (children order, type checks,
+    closures, equivalent values and defaults) are bound once into
+    closures. The array nodes run the helpers their own methods use, e.g.
+    ArrayNode._normalizeChildren(), with the closures of their children.
+    Any other NodeInterface implementation, including subclasses of the
+    built-in nodes, keeps running its own methods.
+
+    The values of the children of the built-in array nodes are tracked
+    separately, as long as the node performs deep merging and has no final
+    validation closure.
+
+    """
+    def compile(self, node):
+        """Compiles a node tree.
+
+        @param node: NodeInterface The root of the node tree
+
+        @return: NodePlan
+        """
+        assert isinstance(node, NodeInterface);
+
+        return self._compileNode(node, list());
+
+    def _compileNode(self, node, revisions):
+        """Compiles a node.
+
+        @param node:      NodeInterface The node to compile
+        @param revisions: list          The (node, revision) pairs of the
+            compiled nodes, filled while compiling
+
+        @return: NodePlan
+        """
+        if isinstance(node, BaseNode):
+            revisions.append((node, getattr(node, '_revision', 0)));
+
+        nodeClass = type(node);
+        if nodeClass is PrototypedArrayNode:
+            return self._compilePrototypedArrayNode(node, revisions);
+        if nodeClass is ArrayNode:
+            return self._compileArrayNode(node, revisions);
+        if nodeClass in (VariableNode, ScalarNode, BooleanNode, EnumNode,
+            NumericNode, IntegerNode, FloatNode):
+            return self._compileLeafNode(node, revisions);
+
+        return NodePlan(
+            node, node.normalize, node.merge, node.finalize, revisions
+        );
+
+    def _getValidTypes(self, node):
+        """Returns the types of the values known to be valid for the node,
+        or None when every value is valid.
+
+        The values of any other type, including subclasses, go through the
+        node's own _validateType(), which raises the exception or accepts
+        them, e.g. False for an array node allowing it.
+
+        @return: frozenset|None
+        """
+        nodeClass = type(node);
+        if nodeClass is VariableNode:
+            return None;
+        if nodeClass is BooleanNode:
+            return frozenset([bool]);
+        if nodeClass is IntegerNode:
+            return frozenset([int]);
+        if nodeClass is FloatNode:
+            return frozenset([int, float]);
+        if nodeClass in (ArrayNode, PrototypedArrayNode):
+            return frozenset([dict, list]);
+
+        types = [type(None), int, float, bool];
+        if isinstance(String, tuple):
+            types.extend(String);
+        else:
+            types.append(String);
+        return frozenset(types);
+
+    def _compileNormalize(self, node, preNormalize, normalizeValue):
+        """Builds the normalization closure of a node, see
+        BaseNode.normalize().
+
+        @param node:           BaseNode      The node to compile
+        @param preNormalize:   callable|None The pre-normalization
+        @param normalizeValue: callable|None The value normalization
+
+        @return: callable
+        """
+        closures = tuple(node._normalizationClosures);
+        equivalents = tuple((data[0], data[1]) for data in node._equivalentValues);
+        validTypes = self._getValidTypes(node);
+        validateType = node._validateType;
+
+        def normalize(value):
+            if preNormalize is not None:
+                value = preNormalize(value);
+
+            for closure in closures:
+                value = closure(value);
+            for original, equivalent in equivalents:
+                if original == value:
+                    value = equivalent;
+
+            if validTypes is not None and type(value) not in validTypes:
+                validateType(value);
+
+            if normalizeValue is None:
+                return value;
+            return normalizeValue(value);
+
+        return normalize;
+
+    def _compileMerge(self, node, mergeValues):
+        """Builds the merging closure of a node, see BaseNode.merge().
+
+        @param node:        BaseNode The node to compile
+        @param mergeValues: callable The values merging
+
+        @return: callable
+        """
+        if not node._allowOverwrite:
+            # raises the ForbiddenOverwriteException
+            return node.merge;
+
+        validTypes = self._getValidTypes(node);
+        validateType = node._validateType;
+
+        def merge(leftSide, rightSide):
+            if validTypes is not None:
+                if type(leftSide) not in validTypes:
+                    validateType(leftSide);
+                if type(rightSide) not in validTypes:
+                    validateType(rightSide);
+
+            return mergeValues(leftSide, rightSide);
+
+        return merge;
+
+    def _compileFinalize(self, node, finalizeValue):
+        """Builds the finalization closure of a node, see
+        BaseNode.finalize().
+
+        @param node:          BaseNode      The node to compile
+        @param finalizeValue: callable|None The value finalization
+
+        @return: callable
+        """
+        closures = tuple(node._finalValidationClosures);
+        validTypes = self._getValidTypes(node);
+        validateType = node._validateType;
+        # only needed by the errors, and under a prototype it depends on
+        # the processed keys
+        getPath = node.getPath;
+
+        def finalize(value):
+            if validTypes is not None and type(value) not in validTypes:
+                validateType(value);
+
+            if finalizeValue is not None:
+                value = finalizeValue(value);
+
+            for closure in closures:
+                try:
+                    value = closure(value);
+                except DefinitionException as correctEx:
+                    raise correctEx;
+                except Exception as invalid:
+                    raise InvalidConfigurationException(
+                        'Invalid configuration for path "{0}": {1}'
+                        ''.format(getPath(), str(invalid)),
+                        previous=invalid
+                    );
+            return value;
+
+        return finalize;
+
+    def _compileLeafNode(self, node, revisions):
+        """Compiles a VariableNode and its built-in subclasses.
+
+        @return: NodePlan
+        """
+        finalizeValue = node._finalizeValue;
+        if type(node) in (VariableNode, ScalarNode, BooleanNode) and \
+            node._allowEmptyValue:
+            finalizeValue = None;
+
+        # only the variable nodes accept the values needing to be thawed
+        normalizeValue = None;
+        if type(node) is VariableNode:
+            normalizeValue = node._normalizeValue;
+
+        return NodePlan(
+            node,
+            self._compileNormalize(node, None, normalizeValue),
+            self._compileMerge(node, lambda leftSide, rightSide: rightSide),
+            self._compileFinalize(node, finalizeValue),
+            revisions
+        );
+
+    def _isTracked(self, node):
+        """Whether the children of an array node can be finalized
+        separately.
+
+        Final validation closures may rewrite the children, and without
+        deep merging a new value replaces the whole subtree.
+
+        @param node: ArrayNode
+
+        @return: Boolean
+        """
+        return node._performDeepMerging and not node._finalValidationClosures;
+
+    def _compileArrayNode(self, node, revisions):
+        """Compiles an ArrayNode and its children.
+
+        @return: NodePlan
+        """
+        plans = dict();
+        normalizers = list();
+        mergers = dict();
+        finalizers = list();
+        for name, child in node.getChildren().items():
+            plan = self._compileNode(child, revisions);
+            plans[name] = plan;
+            normalizers.append((name, plan._normalize));
+            mergers[name] = plan._merge;
+            finalizers.append((name, child, plan._finalize));
+        normalizers = tuple(normalizers);
+        finalizers = tuple(finalizers);
+
+        normalizeChildren = node._normalizeChildren;
+        mergeChildren = node._mergeChildren;
+        finalizeChildren = node._finalizeChildren;
+        finalizeChild = node._finalizeChild;
+
+        def normalizeValue(value):
+            return normalizeChildren(value, normalizers);
+
+        def mergeValues(leftSide, rightSide):
+            return mergeChildren(leftSide, rightSide, mergers);
+
+        def finalizeValue(value):
+            return finalizeChildren(value, finalizers);
+
+        def refinalize(value, dirty, previous):
+            for name, child, finalize in finalizers:
+                if name not in dirty:
+                    if name in previous:
+                        value[name] = previous[name];
+                    elif name in value:
+                        # it has been unset by the previous finalization
+                        value.pop(name);
+                    continue;
+
+                plan = plans[name];
+                finalizeChild(name, child, value, lambda v: plan.refinalize(
+                    v, dirty[name], previous.get(name)
+                ));
+
+            return value;
+
+        if self._isTracked(node):
+            getChildPlan = plans.get;
+        else:
+            getChildPlan = None;
+            refinalize = None;
+
+        return NodePlan(
+            node,
+            self._compileNormalize(node, node._preNormalize, normalizeValue),
+            self._compileMerge(node, mergeValues),
+            self._compileFinalize(node, finalizeValue),
+            revisions,
+            getChildPlan,
+            refinalize
+        );
+
+    def _compilePrototypedArrayNode(self, node, revisions):
+        """Compiles a PrototypedArrayNode and its prototype.
+
+        The prototype name is still updated for each key, so that the
+        paths reported by the errors stay accurate.
+
+        @return: NodePlan
+        """
+        getPath = node.getPath;
+
+        plan = self._compileNode(node.getPrototype(), revisions);
+        normalizePrototype = plan._normalize;
+        mergePrototype = plan._merge;
+        finalizePrototype = plan._finalize;
+
+        normalizeElements = node._normalizeElements;
+        mergeElements = node._mergeElements;
+        finalizeElements = node._finalizeElements;
+
+        def normalizeValue(value):
+            return normalizeElements(value, normalizePrototype);
+
+        def mergeValues(leftSide, rightSide):
+            return mergeElements(leftSide, rightSide, mergePrototype);
+
+        def finalizeValue(value):
+            return finalizeElements(value, lambda k, v: finalizePrototype(v));
+
+        def refinalize(value, dirty, previous):
+            def finalize(k, v):
+                if k in dirty:
+                    return plan.refinalize(v, dirty[k], previous.get(k));
+                if k in previous:
+                    return previous[k];
+
+                # it has been unset by the previous finalization
+                raise UnsetKeyException(
+                    'Unsetting key "{0}" for path "{1}"'
+                    ''.format(k, getPath())
+                );
+
+            return finalizeElements(value, finalize);
+
+        # appended elements are re-indexed on each merge, so only keyed
+        # elements can be tracked separately
+        if self._isTracked(node) and node._keyAttribute is not None:
+            getChildPlan = lambda k: plan;
+        else:
+            getChildPlan = None;
+            refinalize = None;
+
+        return NodePlan(
+            node,
+            self._compileNormalize(node, node._preNormalize, normalizeValue),
+            self._compileMerge(node, mergeValues),
+            self._compileFinalize(node, finalizeValue),
+            revisions,
+            getChildPlan,
+            refinalize
+        );
+
+
 class ReferenceDumper(Object):
     """Dumps a reference configuration for the given configuration/node instance.
 
@@ -7,11 +7,24 @@
 # file that was distributed with this source code.
 from __future__ import absolute_import;
 
+import os.path;
+import copy;
+import pickle;
+import threading;
+try:
+    from types import MappingProxyType;
+except ImportError:
+    MappingProxyType = None;
+
 from pymfony.component.system import Object;
 from pymfony.component.system.oop import interface;
 from pymfony.component.system.oop import abstract;
+from pymfony.component.system.types import String;
+from pymfony.component.system.types import OrderedDict;
 
 from pymfony.component.config import FileLocatorInterface;
+from pymfony.component.config import ConfigCache;
+from pymfony.component.config.resource import FileResource;
 from pymfony.component.config.exception import FileLoaderImportCircularReferenceException;
 from pymfony.component.config.exception import FileLoaderLoadException;
 
@@ -76,15 +89,47 @@ class LoaderInterface(Object):
         pass;
 
 
+@interface
+class LoaderCapabilitiesInterface(Object):
+    """LoaderCapabilitiesInterface is implemented by the loaders declaring
+    the resources they may support, so that resolvers can index them.
+
+    Such a loader must not support a resource whose extension and type
+    are both undeclared.
+
+    """
+    def getSupportedExtensions(self):
+        """Returns the extensions of the supported file resources.
+
+        @return: string[] The extensions, without the leading dot
+        """
+        pass;
+
+    def getSupportedTypes(self):
+        """Returns the supported resource types.
+
+        @return: string[] The resource types
+        """
+        pass;
+
+
 class LoaderResolver(LoaderResolverInterface):
     """LoaderResolver selects a loader for a given resource.
 
     A resource can be anything (e.g. a full path to a config file or a Closure).
     Each loader determines whether it can load a resource and how.
 
+    The loaders implementing LoaderCapabilitiesInterface are indexed by
+    their extensions and types: for a resource, supports() is only called
+    on the matching ones and on the other loaders, in their order. The
+    extensions are compared case-insensitively, and the candidates are
+    memoized per (resource type, extension).
+
     @author Fabien Potencier <fabien@symfony.com>
 
     """
+    MAX_CANDIDATES = 1024;
+
     def __init__(self, loaders = None):
         """Constructor.
 
@@ -94,6 +139,7 @@ class LoaderResolver(LoaderResolverInterface):
         if loaders is None:
             loaders = list();
         self.__loaders = list();
+        self.__candidates = dict();
         for loader in list(loaders):
             self.addLoader(loader);
 
@@ -106,7 +152,7 @@ class LoaderResolver(LoaderResolverInterface):
         @return LoaderInterface|False A LoaderInterface instance
 
         """
-        for loader in self.__loaders:
+        for loader in self.__getCandidates(resource, resourceType):
             if loader.supports(resource, resourceType):
                 return loader;
 
@@ -120,6 +166,7 @@ class LoaderResolver(LoaderResolverInterface):
         """
         assert isinstance(loader, LoaderInterface);
         self.__loaders.append(loader);
+        self.__candidates.clear();
         loader.setResolver(self); 
 
     def getLoaders(self):
@@ -130,6 +177,42 @@ class LoaderResolver(LoaderResolverInterface):
         """
         return self.__loaders;
 
+    def __getCandidates(self, resource, resourceType):
+        """Returns the loaders which may support a resource.
+
+        @return: LoaderInterface[]
+
+        """
+        extension = None;
+        if isinstance(resource, String):
+            extension = os.path.splitext(resource)[1][1:].lower();
+
+        key = (resourceType, extension);
+        try:
+            return self.__candidates[key];
+        except KeyError:
+            pass;
+        except TypeError:
+            # an unhashable resource type
+            return self.__loaders;
+
+        candidates = list();
+        for loader in self.__loaders:
+            if not isinstance(loader, LoaderCapabilitiesInterface) \
+                or resourceType in loader.getSupportedTypes():
+                candidates.append(loader);
+            elif extension is not None:
+                for supported in loader.getSupportedExtensions():
+                    if supported.lower() == extension:
+                        candidates.append(loader);
+                        break;
+
+        if len(self.__candidates) >= self.MAX_CANDIDATES:
+            self.__candidates.clear();
+        self.__candidates[key] = candidates;
+
+        return candidates;
+
 
 @abstract
 class Loader(LoaderInterface):
@@ -231,34 +314,516 @@ class DelegatingLoader(Loader):
     def supports(self, resource, resourceType=None):
         return False if False is self._resolver.resolve(resource, resourceType) else True;
 
+    def resolve(self, resource, resourceType=None):
+        """Finds a loader able to load an imported resource.
+
+        The loader is resolved once, rather than by supports() then
+        by load().
+
+        @param resource: mixed
+        @param resourceType: string The resource type
+
+        @return: LoaderInterface A LoaderInterface instance
+
+        @raise FileLoaderLoadException: if no loader is found
+
+        """
+        loader = self._resolver.resolve(resource, resourceType);
+        if loader is False:
+            raise FileLoaderLoadException(resource);
+
+        return loader;
+
+
+class ImportGraph(Object):
+    """ImportGraph records the files imported by file loaders, so that only
+    what changed is loaded again.
+
+    Each located file is recorded with the class of its loader, its mtime,
+    its size and the files it imports. A file is stale when it changed, or
+    when one of the files it imports, even indirectly, is stale. A root
+    file, loaded by load() rather than imported, is recorded on its first
+    import, from the source resource of the import.
+
+    When results are reused, the pickled result of each load is recorded
+    too, and importing a fresh file returns it instead of loading the file
+    again. This only suits loaders whose result is their only effect.
+
+    """
+
+    def __init__(self, reuseResults = False):
+        """Constructor.
+
+        @param reuseResults: Boolean Whether the imports of fresh files
+            return their recorded result
+
+        """
+        self.__reuseResults = bool(reuseResults);
+        self.__nodes = dict();
+        self.__stale = set();
+        self.__lock = threading.Lock();
+
+    @classmethod
+    def getFilename(cls, cache):
+        """Gets the file where the graph of a ConfigCache is saved.
+
+        @param cache: ConfigCache|string The cache or its path
+
+        @return: string
+
+        """
+        return str(cache)+'.imports';
+
+    @classmethod
+    def load(cls, filename, reuseResults = False):
+        """Loads a saved graph and finds its stale files.
+
+        @param filename: string The file where the graph was saved
+        @param reuseResults: Boolean Whether the imports of fresh files
+            return their recorded result
+
+        @return: ImportGraph An empty graph when the file can't be read
+
+        """
+        graph = cls(reuseResults);
+        try:
+            f = open(filename, 'rb');
+        except EnvironmentError:
+            return graph;
+
+        try:
+            graph.__nodes = pickle.load(f);
+        except Exception:
+            graph.__nodes = dict();
+        finally:
+            f.close();
+
+        graph.invalidate();
+
+        return graph;
+
+    def save(self, filename):
+        """Saves the graph.
+
+        @param filename: string The file
+
+        @raise RuntimeException: When the file can't be written
+
+        """
+        with self.__lock:
+            data = pickle.dumps(self.__nodes, pickle.HIGHEST_PROTOCOL);
+
+        ConfigCache(filename, False).write(data);
+
+    def invalidate(self):
+        """Finds the stale files from their current status.
+
+        @return: set The stale files
+
+        """
+        with self.__lock:
+            stale = set();
+            importers = dict();
+            for path, node in self.__nodes.items():
+                for child in node['children']:
+                    importers.setdefault(child, list()).append(path);
+                try:
+                    status = os.stat(path);
+                except OSError:
+                    stale.add(path);
+                    continue;
+                if (status.st_mtime, status.st_size) != \
+                    (node['mtime'], node['size']):
+                    stale.add(path);
+
+            # the importers of a stale file are stale too
+            pending = list(stale);
+            while pending:
+                for importer in importers.get(pending.pop(), ()):
+                    if importer not in stale:
+                        stale.add(importer);
+                        pending.append(importer);
+
+            self.__stale = stale;
+
+            return set(stale);
+
+    def isFresh(self):
+        """Returns whether none of the recorded files changed.
+
+        @return: Boolean
+
+        """
+        return not self.invalidate();
+
+    def isStale(self, path):
+        """Returns whether a file has to be loaded again.
+
+        @param path: string The located file
+
+        @return: Boolean
+
+        """
+        with self.__lock:
+            return path not in self.__nodes or path in self.__stale;
+
+    def getPaths(self):
+        """Gets the recorded files.
+
+        @return: list
+
+        """
+        with self.__lock:
+            return sorted(self.__nodes.keys());
+
+    def getChildren(self, path):
+        """Gets the files imported by a file.
+
+        @param path: string The located file
+
+        @return: list
+
+        """
+        with self.__lock:
+            return list(self.__nodes[path]['children']);
+
+    def getLoaderClass(self, path):
+        """Gets the class name of the loader of a file.
+
+        @param path: string The located file
+
+        @return: string
+
+        """
+        with self.__lock:
+            return self.__nodes[path]['loader'];
+
+    def getResources(self):
+        """Gets the recorded files as resources, e.g. for ConfigCache
+        metadata.
+
+        @return: FileResource[]
+
+        """
+        return [FileResource(path) for path in self.getPaths()];
+
+    def addImport(self, parent, path):
+        """Records that a file imports another one.
+
+        @param parent: string The importing file
+        @param path: string The imported file
+
+        """
+        with self.__lock:
+            node = self.__nodes.get(parent);
+            if node is not None and path not in node['children']:
+                node['children'].append(path);
+
+    def addRootImport(self, root, path, loader):
+        """Records that a file loaded outside of any import chain imports
+        another one.
+
+        The root is recorded, forgetting its imports, by the first of its
+        imports since it was last found stale.
+
+        @param root: string The importing file
+        @param path: string The imported file
+        @param loader: LoaderInterface The loader of the importing file
+
+        """
+        node = self.__createNode(root, loader);
+
+        with self.__lock:
+            if root not in self.__nodes or root in self.__stale:
+                self.__nodes[root] = node;
+                self.__stale.discard(root);
+
+            children = self.__nodes[root]['children'];
+            if path not in children:
+                children.append(path);
+
+    def hasResult(self, path):
+        """Returns whether the import of a file can return its recorded
+        result.
+
+        @param path: string The located file
+
+        @return: Boolean
+
+        """
+        with self.__lock:
+            return self.__reuseResults and path in self.__nodes \
+                and path not in self.__stale \
+                and 'result' in self.__nodes[path];
+
+    def getResult(self, path):
+        """Gets a copy of the recorded result of a file.
+
+        @param path: string The located file
+
+        @return: mixed
+
+        """
+        with self.__lock:
+            data = self.__nodes[path]['result'];
+
+        return pickle.loads(data);
+
+    def startLoading(self, path, loader):
+        """Records a file before it is loaded, forgetting its imports.
+
+        @param path: string The located file
+        @param loader: LoaderInterface The loader of the file
+
+        """
+        node = self.__createNode(path, loader);
+
+        with self.__lock:
+            self.__nodes[path] = node;
+            self.__stale.discard(path);
+
+    def setResult(self, path, result):
+        """Records the result of a loaded file.
+
+        Results which can't be pickled are not recorded.
+
+        @param path: string The located file
+        @param result: mixed
+
+        """
+        if not self.__reuseResults:
+            return;
+
+        try:
+            data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL);
+        except Exception:
+            return;
+
+        with self.__lock:
+            if path in self.__nodes:
+                self.__nodes[path]['result'] = data;
+
+
+    def __createNode(self, path, loader):
+        try:
+            status = os.stat(path);
+            mtime, size = status.st_mtime, status.st_size;
+        except OSError:
+            mtime, size = None, None;
+
+        return {
+            'loader': '.'.join([
+                type(loader).__module__, type(loader).__name__
+            ]),
+            'mtime': mtime,
+            'size': size,
+            'children': list(),
+        };
+
+
+class DocumentCache(Object):
+    """DocumentCache keeps the documents parsed by file loaders.
+
+    The documents are keyed by the real path, the mtime and the size of
+    their file, and by the class of their loader. The least recently used
+    ones are evicted.
+
+    Each access returns a deep copy of the cached document, unless the
+    documents are frozen: dicts, lists and sets are then turned into
+    read-only mappings, tuples and frozensets, shared without any copy.
+    Dicts stay mutable on Pythons without types.MappingProxyType. The nodes
+    of the definition layer accept the frozen documents as they are and
+    thaw them back into dicts, lists and sets, see BaseNode._thaw().
+
+    """
+
+    def __init__(self, maxSize = 256, immutable = False):
+        """Constructor.
+
+        @param maxSize: int The number of documents to keep
+        @param immutable: Boolean Whether the documents are frozen instead
+            of copied
+
+        """
+        self.__maxSize = int(maxSize);
+        self.__immutable = bool(immutable);
+        self.__documents = OrderedDict();
+        self.__hits = 0;
+        self.__misses = 0;
+        self.__lock = threading.Lock();
+
+    def get(self, path, parse, namespace = None):
+        """Gets the parsed document of a file.
+
+        @param path: string The file path
+        @param parse: callable Parses the file, given its path
+        @param namespace: mixed Tells apart the parsers of a same file,
+            e.g. the loader class
+
+        @return: mixed The document
+
+        @raise OSError: When the file does not exist
+
+        """
+        path = os.path.realpath(path);
+        status = os.stat(path);
+        key = (path, status.st_mtime, status.st_size, namespace);
+
+        with self.__lock:
+            found = key in self.__documents;
+            if found:
+                self.__hits += 1;
+                document = self.__documents.pop(key);
+                self.__documents[key] = document;
+            else:
+                self.__misses += 1;
+
+        if not found:
+            document = parse(path);
+            if self.__immutable:
+                document = self.freeze(document);
+            with self.__lock:
+                self.__documents.pop(key, None);
+                while self.__documents \
+                    and len(self.__documents) >= self.__maxSize:
+                    del self.__documents[next(iter(self.__documents))];
+                if self.__maxSize > 0:
+                    self.__documents[key] = document;
+
+        if self.__immutable:
+            return document;
+
+        return copy.deepcopy(document);
+
+    def getStats(self):
+        """Gets the cache statistics.
+
+        @return: dict With the "hits", "misses", "size" and "maxSize" keys
+
+        """
+        with self.__lock:
+            return {
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'size': len(self.__documents),
+                'maxSize': self.__maxSize,
+            };
+
+    def clear(self):
+        """Removes all documents.
+        """
+        with self.__lock:
+            self.__documents.clear();
+
+    @classmethod
+    def freeze(cls, value):
+        """Returns a read-only version of a document.
+
+        @param value: mixed The document
+
+        @return: mixed
+
+        """
+        if isinstance(value, dict):
+            items = [(k, cls.freeze(v)) for k, v in value.items()];
+            if isinstance(value, OrderedDict):
+                frozen = OrderedDict(items);
+            else:
+                frozen = dict(items);
+            if MappingProxyType is None:
+                return frozen;
+            return MappingProxyType(frozen);
+        if isinstance(value, (list, tuple)):
+            return tuple(cls.freeze(v) for v in value);
+        if isinstance(value, (set, frozenset)):
+            return frozenset(value);
+
+        return value;
+
 
 @abstract
 class FileLoader(Loader):
     """FileLoader is the abstract class used by all built-in loaders that
     are file based.
 
+    Circular imports are detected along each import chain. With an
+    executor, e.g. a concurrent.futures.ThreadPoolExecutor, importMany()
+    loads independent resources concurrently, each one continuing the
+    import chain and the current directory of the caller. The current
+    directories set during a concurrent import are kept for its thread.
+
+    With an ImportGraph, shared by the file loaders of a resolver, the
+    imported files are recorded along with their imports.
+
+    Concrete loaders parse their files through _getDocument(), which goes
+    through the DocumentCache of the loader when it has one, so that a
+    file imported several times is only parsed once.
+
     @author Fabien Potencier <fabien@symfony.com>
 
     """
-    _loading = dict();
+    __imports = threading.local();
 
-    def __init__(self, locator):
+    def __init__(self, locator, executor = None):
         """Constructor.
 
         @param locator: FileLocatorInterface A FileLocatorInterface instance
+        @param executor: Executor An executor loading the resources
+            imported together
 
         """
         assert isinstance(locator, FileLocatorInterface);
         self.__currentDir = None;
+        self.__executor = executor;
+        self.__graph = None;
+        self.__documents = None;
 
         self._locator = locator;
 
     def setCurrentDir(self, directory):
-        self.__currentDir = directory;
+        currentDirs = getattr(self.__imports, 'currentDirs', None);
+        if currentDirs is None:
+            self.__currentDir = directory;
+        else:
+            currentDirs[id(self)] = directory;
 
     def getLocator(self):
         return self._locator;
 
+    def setExecutor(self, executor):
+        self.__executor = executor;
+
+    def getExecutor(self):
+        return self.__executor;
+
+    def setImportGraph(self, graph):
+        assert graph is None or isinstance(graph, ImportGraph);
+        self.__graph = graph;
+
+    def getImportGraph(self):
+        return self.__graph;
+
+    def setDocumentCache(self, documents):
+        assert documents is None or isinstance(documents, DocumentCache);
+        self.__documents = documents;
+
+    def getDocumentCache(self):
+        return self.__documents;
+
+    def _getDocument(self, path, parse):
+        """Parses a file, through the document cache when there is one.
+
+        @param path: string The file path
+        @param parse: callable Parses the file, given its path
+
+        @return: mixed The document
+
+        """
+        if self.__documents is None:
+            return parse(path);
+
+        return self.__documents.get(path, parse, type(self));
+
     def imports(self, resource, resourceType=None, 
                 ignoreErrors=False, sourceResource=None):
         """Imports a resource.
@@ -277,17 +842,40 @@ class FileLoader(Loader):
         """
         try:
             loader = self.resolve(resource, resourceType);
+            currentDir = self.__getCurrentDir();
             if isinstance(loader, FileLoader) and \
-                not self.__currentDir is None:
-                resource = self._locator.locate(resource, self.__currentDir);
-            if resource in self._loading.keys():
+                not currentDir is None:
+                resource = self._locator.locate(resource, currentDir);
+
+            chain = self._getImportChain();
+            if resource in chain:
                 raise FileLoaderImportCircularReferenceException(
-                    list(self._loading.keys())
+                    list(chain)
                 );
 
-            self._loading[resource] = True;
-            ret = loader.load(resource, resourceType);
-            del self._loading[resource];
+            graph = self.__graph;
+            if graph is not None and \
+                isinstance(loader, FileLoader) and \
+                isinstance(resource, String):
+                if chain:
+                    graph.addImport(chain[-1], resource);
+                elif isinstance(sourceResource, String):
+                    # the root file, loaded by load()
+                    graph.addRootImport(sourceResource, resource, self);
+                if graph.hasResult(resource):
+                    return graph.getResult(resource);
+                graph.startLoading(resource, loader);
+            else:
+                graph = None;
+
+            self.__imports.chain = chain + (resource,);
+            try:
+                ret = loader.load(resource, resourceType);
+            finally:
+                self.__imports.chain = chain;
+
+            if graph is not None:
+                graph.setResult(resource, ret);
 
             return ret;
         except FileLoaderImportCircularReferenceException as e:
@@ -298,3 +886,121 @@ class FileLoader(Loader):
                 if isinstance(e, FileLoaderLoadException):
                     raise e;
                 raise FileLoaderLoadException(resource, sourceResource, 0, e);
+
+    def importMany(self, resources, resourceType=None,
+                ignoreErrors=False, sourceResource=None):
+        """Imports resources which do not depend on each other.
+
+        With an executor they are loaded concurrently, except from a
+        concurrent import where they are loaded sequentially so that the
+        executor can not run out of workers.
+
+        @param resources: list
+        @param resourceType: string The resource type
+        @param ignoreErrors: Boolean Whether to ignore import errors or not
+        @param sourceResource: string The original resource
+            importing the new resources
+
+        @return: list The results, in the order of the resources
+
+        @raise FileLoaderLoadException: The first error in the order of
+            the resources
+        @raise FileLoaderImportCircularReferenceException:
+
+        """
+        resources = list(resources);
+        if self.__executor is None or len(resources) < 2 \
+            or getattr(self.__imports, 'currentDirs', None) is not None:
+            return [
+                self.imports(resource, resourceType, ignoreErrors, sourceResource)
+                for resource in resources
+            ];
+
+        chain = self._getImportChain();
+        currentDir = self.__getCurrentDir();
+        futures = [
+            self.__executor.submit(self.__importConcurrently, chain,
+                currentDir, resource, resourceType, ignoreErrors,
+                sourceResource)
+            for resource in resources
+        ];
+        try:
+            return [future.result() for future in futures];
+        finally:
+            for future in futures:
+                future.cancel();
+
+    @property
+    def _loading(self):
+        """A read-only snapshot of the resources being imported by the
+        current import chain, see _getImportChain().
+
+        It used to be a dict that imports() filled and emptied. The chain is
+        now kept per thread, and writing to _loading is no longer supported.
+
+        @return: Mapping The resources, mapped to True, from the first
+            imported one, in a dict that stays mutable on Pythons without
+            types.MappingProxyType
+        """
+        loading = OrderedDict((resource, True)
+            for resource in self._getImportChain());
+        if MappingProxyType is None:
+            return loading;
+        return MappingProxyType(loading);
+
+    def _getImportChain(self):
+        """Gets the resources being imported by the current import chain.
+
+        @return: tuple The resources, from the first imported one
+
+        """
+        return getattr(self.__imports, 'chain', ());
+
+    @classmethod
+    def _runWithImportChain(cls, chain, function, *args):
+        """Runs a function in this thread, continuing an import chain
+        started by another one.
+
+        As for a concurrent import, the current directories set by the
+        function are kept for this call only, so that loaders shared by
+        several calls running at once do not see each other's ones.
+
+        @param chain: tuple The resources, from the first imported one
+        @param function: callable The function to run
+
+        @return: mixed The result of the function
+
+        """
+        previous = (
+            getattr(cls.__imports, 'chain', ()),
+            getattr(cls.__imports, 'currentDirs', None),
+        );
+
+        cls.__imports.chain = tuple(chain);
+        cls.__imports.currentDirs = dict();
+        try:
+            return function(*args);
+        finally:
+            cls.__imports.chain, cls.__imports.currentDirs = previous;
+
+    def __getCurrentDir(self):
+        currentDirs = getattr(self.__imports, 'currentDirs', None);
+        if currentDirs is not None and id(self) in currentDirs:
+            return currentDirs[id(self)];
+
+        return self.__currentDir;
+
+    def __importConcurrently(self, chain, currentDir, *args):
+        previous = (
+            getattr(self.__imports, 'chain', ()),
+            getattr(self.__imports, 'currentDirs', None),
+        );
+
+        # the loaders keep their current directory for this thread until
+        # the import is done, the other threads still see their own one
+        self.__imports.chain = chain;
+        self.__imports.currentDirs = {id(self): currentDir};
+        try:
+            return self.imports(*args);
+        finally:
+            self.__imports.chain, self.__imports.currentDirs = previous;
@@ -8,14 +8,27 @@
 
 from __future__ import absolute_import;
 
-import os.path;
+import os;
 import re;
+import sys;
+import fnmatch;
+import hashlib;
+import mmap;
+import struct;
+import threading;
+from stat import S_ISDIR;
+from stat import S_ISREG;
+try:
+    from concurrent.futures import as_completed;
+except ImportError:
+    as_completed = None;
 from pickle import dumps as serialize;
 from pickle import loads as unserialize;
 
 from pymfony.component.system import Object;
 from pymfony.component.system import SerializableInterface;
 from pymfony.component.system.oop import interface;
+from pymfony.component.system.exception import InvalidArgumentException;
 
 """
 """
@@ -61,19 +74,27 @@ class FileResource(ResourceInterface, SerializableInterface):
 
     The resource can be a file or a directory.
 
+    In digest mode, the mtime, the size and the content digest of the file
+    are recorded when the resource is serialized. The file is then fresh
+    as long as its content is unchanged, it is only hashed again when its
+    mtime changed but not its size.
+
     @author Fabien Potencier <fabien@symfony.com>
 
     """
-    def __init__(self, resource):
+    def __init__(self, resource, digest = False):
         """Constructor.
 
         @param string $resource The file path to the resource
+        @param Boolean digest Whether the freshness relies on the content
 
         """
         if resource:
             self.__resource = str(os.path.realpath(str(resource)));
         else:
             self.__resource = '';
+        self.__digest = bool(digest);
+        self.__record = None;
 
     def __str__(self):
         """Returns a string representation of the Resource.
@@ -99,37 +120,279 @@ class FileResource(ResourceInterface, SerializableInterface):
         @return Boolean true if the resource has not been updated, false otherwise
 
         """
+        if self.__record is not None:
+            return self.__matchesRecord(timestamp);
+
         if not os.path.exists(self.__resource):
             return False;
         return os.path.getmtime(self.__resource) < timestamp;
 
+    def usesDigest(self):
+        """Returns whether the freshness relies on the content.
+
+        @return Boolean
+
+        """
+        return self.__digest;
+
     def serialize(self):
-        return serialize(self.__resource);
+        if not self.__digest:
+            return serialize(self.__resource);
+
+        self.__record = None;
+        try:
+            status = os.stat(self.__resource);
+        except OSError:
+            pass;
+        else:
+            self.__record = (status.st_mtime, status.st_size,
+                ContentDigest.compute(self.__resource));
+
+        return serialize([self.__resource, self.__record]);
 
     def unserialize(self, serialized):
-        self.__resource = unserialize(serialized);
+        data = unserialize(serialized);
+        if isinstance(data, list):
+            self.__resource, self.__record = data;
+            self.__digest = True;
+        else:
+            self.__resource = data;
+            self.__record = None;
+            self.__digest = False;
+
+    def __matchesRecord(self, timestamp):
+        try:
+            status = os.stat(self.__resource);
+        except OSError:
+            return False;
+
+        mtime, size, digest = self.__record;
+        if status.st_mtime == mtime and status.st_size == size:
+            return True;
+
+        if digest is None:
+            # e.g. a directory
+            return status.st_mtime < timestamp;
+
+        if status.st_size != size \
+            or ContentDigest.compute(self.__resource) != digest:
+            return False;
+
+        # do not hash the unchanged content again
+        self.__record = (status.st_mtime, size, digest);
+
+        return True;
+
+
+class ContentDigest(Object):
+    """ContentDigest computes the digest of file contents through a memory
+    map, with BLAKE2 when available.
+    """
+
+    @classmethod
+    def compute(cls, path):
+        """Computes the digest of a file.
+
+        @param path: string The file path
+
+        @return: string|None The algorithm name and the hexadecimal digest,
+            None when the file can't be read
+
+        """
+        try:
+            f = open(path, 'rb');
+        except EnvironmentError:
+            return None;
+
+        try:
+            if hasattr(hashlib, 'blake2b'):
+                algorithm = hashlib.blake2b();
+            else:
+                algorithm = hashlib.sha1();
+
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ);
+            except (ValueError, EnvironmentError):
+                # e.g. an empty file
+                algorithm.update(f.read());
+            else:
+                try:
+                    algorithm.update(data);
+                finally:
+                    data.close();
+        except EnvironmentError:
+            return None;
+        finally:
+            f.close();
+
+        return algorithm.name+':'+algorithm.hexdigest();
+
+
+@interface
+class FilenameMatcherInterface(Object):
+    """FilenameMatcherInterface is the interface that must be implemented
+    by the patterns restricting the files monitored by a DirectoryResource.
+
+    """
+    def match(self, name):
+        """Returns whether a file name matches the pattern.
+
+        @param name: string The base name of the file
+
+        @return: Boolean
+
+        """
+        pass;
+
+    def getPattern(self):
+        """Returns the pattern.
+
+        @return: mixed
+
+        """
+        pass;
+
+    def getRegex(self):
+        """Returns a regular expression searching the same file names.
+
+        @return: string
+
+        """
+        pass;
+
+
+class RegexFilenameMatcher(FilenameMatcherInterface):
+    """Matches file names searched by a regular expression, compiled once.
+    """
+
+    def __init__(self, pattern):
+        """Constructor.
+
+        @param pattern: string The regular expression
+
+        """
+        self.__pattern = pattern;
+        self.__regex = re.compile(pattern);
+
+    def match(self, name):
+        return self.__regex.search(name) is not None;
+
+    def getPattern(self):
+        return self.__pattern;
+
+    def getRegex(self):
+        return self.__pattern;
+
+    def __eq__(self, other):
+        return type(self) is type(other) \
+            and self.getPattern() == other.getPattern();
+
+    def __ne__(self, other):
+        return not self == other;
+
+    def __hash__(self):
+        return hash((type(self), self.getPattern()));
+
+
+class GlobFilenameMatcher(RegexFilenameMatcher):
+    """Matches file names against a shell-style wildcard pattern, e.g.
+    "*.xml", case-sensitively.
+    """
+
+    def __init__(self, pattern):
+        """Constructor.
+
+        @param pattern: string The wildcard pattern
+
+        """
+        # the whole name must match, not only its end
+        RegexFilenameMatcher.__init__(self, '\\A'+fnmatch.translate(pattern));
+        self.__glob = pattern;
+
+    def getPattern(self):
+        return self.__glob;
+
+
+class ExtensionFilenameMatcher(FilenameMatcherInterface):
+    """Matches file names ending with one of a set of extensions, without
+    regular expression.
+    """
+
+    def __init__(self, extensions):
+        """Constructor.
+
+        @param extensions: string[] The extensions, e.g. [".xml", ".yml"]
+
+        """
+        self.__extensions = frozenset(extensions);
+        self.__suffixes = tuple(sorted(self.__extensions));
+
+    def match(self, name):
+        return name.endswith(self.__suffixes);
+
+    def getPattern(self):
+        return self.__extensions;
+
+    def getRegex(self):
+        if not self.__suffixes:
+            return '(?!)';
+
+        return '(?:{0})\\Z'.format('|'.join(map(re.escape, self.__suffixes)));
+
+    def __eq__(self, other):
+        return type(self) is type(other) \
+            and self.getPattern() == other.getPattern();
+
+    def __ne__(self, other):
+        return not self == other;
+
+    def __hash__(self):
+        return hash((type(self), self.getPattern()));
 
 
 class DirectoryResource(ResourceInterface, SerializableInterface):
     """DirectoryResource represents a resources stored in a subdirectory tree.
 
+    A snapshot of the tree is recorded when the resource is serialized.
+    The freshness of an unserialized resource is then checked against it
+    with one stat per recorded directory and file, without listing the
+    directories again: as long as the mtime of a directory is unchanged,
+    no entry was added to it or removed from it. The files are still
+    stated one by one, since modifying a file does not change the mtime
+    of its directory.
+
+    The monitored files can be restricted by a regular expression, compiled
+    once, or by any FilenameMatcherInterface instance, e.g. a
+    GlobFilenameMatcher or an ExtensionFilenameMatcher.
+
+    In digest mode, the snapshot also records the content digest of the
+    files. When the snapshot no longer matches, the tree is fresh as long
+    as its structure is unchanged and the files whose mtime changed still
+    have the same content.
+
     @author Fabien Potencier <fabien@symfony.com>
 
     """
 
 
-    def __init__(self, resource, pattern = None):
+    def __init__(self, resource, pattern = None, digest = False):
         """Constructor.
 
         @param string resource The file path to the resource
-        @param string pattern  A pattern to restrict monitored files
+        @param string|FilenameMatcherInterface pattern A pattern to
+            restrict monitored files, strings are regular expressions
+        @param Boolean digest Whether the freshness relies on the content
 
         """
         self.__resource = None;
         self.__pattern = None;
+        self.__matcher = None;
+        self.__snapshot = None;
+        self.__digests = None;
 
         self.__resource = resource;
-        self.__pattern = pattern;
+        self.__setPattern(pattern);
+        self.__digest = bool(digest);
 
 
     def __str__(self):
@@ -153,10 +416,66 @@ class DirectoryResource(ResourceInterface, SerializableInterface):
 
 
     def getPattern(self):
+        """Returns the regular expression searching the monitored file
+        names, whatever the kind of pattern given to the constructor.
+
+        @return string|None None when all files are monitored
+
+        """
 
         return self.__pattern;
 
 
+    def getMatcher(self):
+        """Returns the matcher of the monitored files.
+
+        @return FilenameMatcherInterface|None None when all files are
+            monitored
+
+        """
+
+        return self.__matcher;
+
+
+    def usesDigest(self):
+        """Returns whether the freshness relies on the content.
+
+        @return Boolean
+
+        """
+
+        return self.__digest;
+
+
+    def getSnapshot(self):
+        """Returns the recorded snapshot of the tree.
+
+        @return tuple|None A (newest mtime, directories, files) tuple where
+            directories is a sorted tuple of (relative path, mtime) and files
+            a sorted tuple of (relative path, mtime, size, inode), None when
+            no snapshot has been recorded
+
+        """
+
+        return self.__snapshot;
+
+
+    def snapshot(self):
+        """Records a snapshot of the tree.
+
+        Files not matching the pattern are not recorded.
+
+        """
+
+        self.__snapshot = self.__takeSnapshot();
+
+        if self.__digest and self.__snapshot is not None:
+            self.__digests = dict(
+                (path, ContentDigest.compute(self.__join(path)))
+                for path, mtime, size, inode in self.__snapshot[2]
+            );
+
+
     def isFresh(self, timestamp):
         """Returns True if the resource has not been updated since the given timestamp.:
 
@@ -166,6 +485,13 @@ class DirectoryResource(ResourceInterface, SerializableInterface):
 
         """
 
+        if self.__snapshot is not None and self.__digests is not None:
+            return self.matchesSnapshot() or self.__matchesDigests();
+
+        if self.__snapshot is not None:
+            return self.__snapshot[0] < timestamp and \
+                self.matchesSnapshot();
+
         if ( not os.path.isdir(self.__resource)) :
             return False;
 
@@ -174,8 +500,8 @@ class DirectoryResource(ResourceInterface, SerializableInterface):
         for root, dirs, files in os.walk(self.__resource, followlinks=True):
             for filename in files + dirs:
                 filename = '/'.join([root, filename]);
-                # if regex filtering is enabled only check matching files:
-                if (self.__pattern and os.path.isfile(filename) and  not re.search(self.__pattern, os.path.basename(filename))) :
+                # if filtering is enabled only check matching files:
+                if (self.__matcher and os.path.isfile(filename) and  not self.__matcher.match(os.path.basename(filename))) :
                     continue;
 
                 # always monitor directories for changes, except the .. entries
@@ -188,11 +514,774 @@ class DirectoryResource(ResourceInterface, SerializableInterface):
         return newestMTime < timestamp;
 
 
+    def matchesSnapshot(self, stat = None):
+        """Returns True if the tree still matches the recorded snapshot.
+
+        @param callable stat A function returning the status of a path or
+            None when it does not exist, defaults to os.stat
+
+        @return Boolean
+
+        """
+
+        if self.__snapshot is None:
+            return False;
+
+        if stat is None:
+            stat = self.__stat;
+
+        newestMTime, directories, files = self.__snapshot;
+
+        for path, mtime in directories:
+            status = stat(self.__join(path));
+            if status is None or not S_ISDIR(status.st_mode) \
+                or status.st_mtime != mtime:
+                return False;
+
+        for path, mtime, size, inode in files:
+            status = stat(self.__join(path));
+            if status is None or status.st_mtime != mtime \
+                or status.st_size != size or status.st_ino != inode:
+                return False;
+
+        return True;
+
+
     def serialize(self):
 
-        return serialize([self.__resource, self.__pattern]);
+        self.snapshot();
+
+        return serialize([
+            self.__resource, self.__matcher, self.__snapshot, self.__digests
+        ]);
 
 
     def unserialize(self, serialized):
 
-        self.__resource, self.__pattern = unserialize(serialized);
+        data = unserialize(serialized);
+        self.__resource = data[0];
+        self.__setPattern(data[1]);
+        self.__snapshot = data[2] if len(data) > 2 else None;
+        self.__digests = data[3] if len(data) > 3 else None;
+        self.__digest = self.__digests is not None;
+
+
+    def __matchesDigests(self):
+        """Compares the current tree with the snapshot, hashing the files
+        whose status changed.
+        """
+
+        snapshot = self.__takeSnapshot();
+        if snapshot is None:
+            return False;
+
+        newestMTime, directories, files = self.__snapshot;
+        if len(snapshot[2]) != len(files) \
+            or [d[0] for d in snapshot[1]] != [d[0] for d in directories]:
+            return False;
+
+        for current, recorded in zip(snapshot[2], files):
+            if current[0] != recorded[0] or current[2] != recorded[2]:
+                return False;
+
+            if current[1:] != recorded[1:] \
+                and ContentDigest.compute(self.__join(current[0])) \
+                != self.__digests.get(current[0]):
+                return False;
+
+        # do not hash the unchanged contents again
+        self.__snapshot = snapshot;
+
+        return True;
+
+
+    def __setPattern(self, pattern):
+
+        if isinstance(pattern, FilenameMatcherInterface):
+            self.__pattern = pattern.getRegex();
+            self.__matcher = pattern;
+        elif pattern:
+            self.__pattern = pattern;
+            self.__matcher = RegexFilenameMatcher(pattern);
+        else:
+            self.__pattern = pattern;
+            self.__matcher = None;
+
+
+    def __takeSnapshot(self):
+
+        status = self.__stat(self.__resource);
+        if status is None or not S_ISDIR(status.st_mode):
+            return None;
+
+        matcher = self.__matcher;
+
+        newestMTime = status.st_mtime;
+        directories = [('', status.st_mtime)];
+        files = list();
+
+        # symbolic links are followed, do not loop on cycles
+        visited = set([(status.st_dev, status.st_ino)]);
+        pending = [''];
+        while pending:
+            directory = pending.pop();
+            for name, status in self.__scan(self.__join(directory)):
+                path = '/'.join([directory, name]) if directory else name;
+                if status is None:
+                    # a dangling symbolic link
+                    continue;
+
+                if S_ISDIR(status.st_mode):
+                    inode = (status.st_dev, status.st_ino);
+                    if inode in visited:
+                        continue;
+                    visited.add(inode);
+                    pending.append(path);
+                    directories.append((path, status.st_mtime));
+                else:
+                    # if filtering is enabled only record matching files
+                    if matcher is not None and S_ISREG(status.st_mode) \
+                        and not matcher.match(name):
+                        continue;
+                    files.append((
+                        path, status.st_mtime, status.st_size, status.st_ino
+                    ));
+
+                newestMTime = max(newestMTime, status.st_mtime);
+
+        directories.sort();
+        files.sort();
+
+        return (newestMTime, tuple(directories), tuple(files));
+
+
+    def __scan(self, directory):
+        """Lists a directory with the status of its entries.
+
+        @return list A list of (name, stat_result|None) pairs
+
+        """
+
+        entries = list();
+        try:
+            if hasattr(os, 'scandir'):
+                for entry in os.scandir(directory):
+                    try:
+                        entries.append((entry.name, entry.stat()));
+                    except OSError:
+                        entries.append((entry.name, None));
+            else:
+                for name in os.listdir(directory):
+                    entries.append((name, self.__stat('/'.join([directory, name]))));
+        except OSError:
+            pass;
+
+        return entries;
+
+
+    def __stat(self, path):
+
+        try:
+            return os.stat(path);
+        except OSError:
+            return None;
+
+
+    def __join(self, path):
+
+        if not path:
+            return self.__resource;
+
+        return '/'.join([self.__resource, path]);
+
+
+class FreshnessChecker(Object):
+    """FreshnessChecker checks the freshness of a set of resources at once.
+
+    Every path is stated at most once, whatever the number of resources
+    referring to it, and the check stops at the first stale resource.
+    Resources other than FileResource and DirectoryResource instances are
+    checked through their own isFresh() method.
+
+    Resources are checked one after the other unless an executor is given,
+    e.g. a concurrent.futures.ThreadPoolExecutor, in which case they are
+    checked concurrently and the remaining checks are cancelled as soon as
+    a stale resource is found.
+
+    """
+    BINARY_CHUNK_SIZE = 256;
+
+    def __init__(self, executor=None):
+        """Constructor.
+
+        @param executor: Executor An executor running the checks
+
+        """
+        self.__executor = executor;
+        self.__stats = dict();
+        self.__statCount = 0;
+        self.__listCount = 0;
+        self.__lock = threading.Lock();
+        self.__stopped = False;
+
+    def stat(self, path):
+        """Returns the status of a path, following symbolic links.
+
+        @param path: string The path
+
+        @return: stat_result|None None when the path does not exist
+
+        """
+        if path in self.__stats:
+            return self.__stats[path];
+
+        with self.__lock:
+            self.__statCount += 1;
+        try:
+            result = os.stat(path);
+        except OSError:
+            result = None;
+
+        self.__stats[path] = result;
+
+        return result;
+
+    def getStats(self):
+        """Returns the number of system calls done so far.
+
+        @return: dict With the "stat", "listdir" and "paths" keys
+
+        """
+        return {
+            'stat': self.__statCount,
+            'listdir': self.__listCount,
+            'paths': len(self.__stats),
+        };
+
+    def isFresh(self, resources, timestamp):
+        """Returns true if none of the resources has been updated since the
+        given timestamp.
+
+        @param resources: ResourceInterface[] The resources to check
+        @param timestamp: int The last time the resources were loaded
+
+        @return: Boolean
+
+        """
+        return self.__run(self._getTasks(resources, timestamp));
+
+    def isBinaryFresh(self, metadata, timestamp):
+        """Returns true if none of the records of a BinaryMetadata changed
+        and all of them are older than the given timestamp.
+
+        With an executor, the records are checked by chunks of
+        BINARY_CHUNK_SIZE records.
+
+        @param metadata: BinaryMetadata The metadata to check
+        @param timestamp: int The last time the resources were loaded
+
+        @return: Boolean
+
+        """
+        count = metadata.getRecordCount();
+        if self.__executor is None:
+            size = max(count, 1);
+        else:
+            size = self.BINARY_CHUNK_SIZE;
+
+        return self.__run([
+            self.__bind(metadata.isFresh, timestamp, self.stat, start,
+                min(start + size, count))
+            for start in range(0, count, size)
+        ]);
+
+    def __run(self, tasks):
+        self.__stopped = False;
+
+        if self.__executor is None:
+            for task in tasks:
+                if not task():
+                    return False;
+
+            return True;
+
+        futures = [self.__executor.submit(task) for task in tasks];
+        try:
+            for future in as_completed(futures):
+                if not future.result():
+                    return False;
+
+            return True;
+        finally:
+            self.__stopped = True;
+            for future in futures:
+                future.cancel();
+
+    def _getTasks(self, resources, timestamp):
+        """Returns the checks of the resources, cheapest first.
+
+        @param resources: ResourceInterface[] The resources to check
+        @param timestamp: int The last time the resources were loaded
+
+        @return: list A list of callables returning whether a resource
+            is fresh
+
+        """
+        files = list();
+        directories = list();
+        others = list();
+        seen = set();
+        for resource in resources:
+            if type(resource) is FileResource and not resource.usesDigest():
+                key = resource.getResource();
+                if key not in seen:
+                    files.append(self.__bind(
+                        self._isFileFresh, key, timestamp
+                    ));
+            elif type(resource) is DirectoryResource \
+                and not resource.usesDigest():
+                key = (resource.getResource(), resource.getMatcher(),
+                    resource.getSnapshot());
+                if key not in seen:
+                    directories.append(self.__bind(
+                        self._isDirectoryResourceFresh, resource, timestamp
+                    ));
+            else:
+                others.append(self.__bind(resource.isFresh, timestamp));
+                continue;
+            seen.add(key);
+
+        return files + directories + others;
+
+    def __bind(self, function, *args):
+        return lambda: function(*args);
+
+    def _isDirectoryResourceFresh(self, resource, timestamp):
+        """Checks a DirectoryResource, through its snapshot when it has one.
+
+        @param resource: DirectoryResource The resource
+        @param timestamp: int The last time the resource was loaded
+
+        @return: Boolean
+
+        """
+        snapshot = resource.getSnapshot();
+        if snapshot is not None:
+            return snapshot[0] < timestamp \
+                and resource.matchesSnapshot(self.stat);
+
+        return self._isDirectoryFresh(
+            resource.getResource(), resource.getMatcher(), timestamp
+        );
+
+    def _isFileFresh(self, path, timestamp):
+        """Checks a path the way FileResource.isFresh() does.
+
+        @param path: string The path
+        @param timestamp: int The last time the resource was loaded
+
+        @return: Boolean
+
+        """
+        status = self.stat(path);
+        if status is None:
+            return False;
+
+        return status.st_mtime < timestamp;
+
+    def _isDirectoryFresh(self, directory, matcher, timestamp):
+        """Checks a tree the way DirectoryResource.isFresh() does.
+
+        @param directory: string The root directory
+        @param matcher: FilenameMatcherInterface|None The matcher of the
+            monitored files
+        @param timestamp: int The last time the resource was loaded
+
+        @return: Boolean
+
+        """
+        status = self.stat(directory);
+        if status is None or not S_ISDIR(status.st_mode):
+            return False;
+
+        if status.st_mtime >= timestamp:
+            return False;
+
+        # symbolic links are followed, do not loop on cycles
+        visited = set([(status.st_dev, status.st_ino)]);
+        pending = [directory];
+        while pending and not self.__stopped:
+            root = pending.pop();
+            for name, isFile in self._listDirectory(root):
+                filename = '/'.join([root, name]);
+
+                # if filtering is enabled only check matching files
+                if matcher is not None and isFile is not None and isFile() \
+                    and not matcher.match(name):
+                    continue;
+
+                status = self.stat(filename);
+                if status is None:
+                    # a dangling symbolic link
+                    return False;
+
+                if S_ISDIR(status.st_mode):
+                    inode = (status.st_dev, status.st_ino);
+                    if inode not in visited:
+                        visited.add(inode);
+                        pending.append(filename);
+                elif matcher is not None and isFile is None \
+                    and S_ISREG(status.st_mode) and not matcher.match(name):
+                    continue;
+
+                if status.st_mtime >= timestamp:
+                    return False;
+
+        return True;
+
+    def _listDirectory(self, directory):
+        """Lists the entries of a directory.
+
+        @param directory: string The directory
+
+        @return: list A list of (name, isFile) pairs, isFile is a callable
+            telling whether the entry is a file without stating it when
+            the platform allows it, None otherwise
+
+        """
+        with self.__lock:
+            self.__listCount += 1;
+        try:
+            if hasattr(os, 'scandir'):
+                return [(e.name, e.is_file) for e in os.scandir(directory)];
+            return [(name, None) for name in os.listdir(directory)];
+        except OSError:
+            return list();
+
+
+class BinaryMetadata(Object):
+    """BinaryMetadata reads and writes the compact binary format of the
+    ConfigCache metadata.
+
+    The format is made of a header, a table of interned paths and
+    fixed-width records, all little-endian:
+
+      * header: magic, version (uint16), path count and record count
+        (uint32 each);
+      * paths: offset and length (uint32 each) of every path in the
+        following blob of encoded paths;
+      * records: path index (uint32), kind (uint8), mtime (double),
+        size and inode (uint64 each), an inode of 0 is not compared.
+
+    Only FileResource and DirectoryResource instances not in digest mode
+    can be encoded, the latter through their snapshot. The freshness is checked straight from
+    the memory-mapped records, without creating resource objects.
+
+    """
+    MAGIC = b'PYMFMETA';
+    VERSION = 1;
+
+    KIND_MISSING = 0;
+    KIND_FILE = 1;
+    KIND_DIRECTORY = 2;
+
+    HEADER = struct.Struct('<8sHII');
+    PATH = struct.Struct('<II');
+    RECORD = struct.Struct('<IB3xdQQ');
+
+    def __init__(self, data):
+        """Constructor.
+
+        @param data: bytes|mmap The encoded metadata
+
+        @raise InvalidArgumentException: When the data is not valid
+
+        """
+        if len(data) < self.HEADER.size:
+            raise InvalidArgumentException('The metadata is truncated.');
+
+        magic, version, pathCount, recordCount = \
+            self.HEADER.unpack_from(data, 0);
+        if magic != self.MAGIC or version != self.VERSION:
+            raise InvalidArgumentException(
+                'Unsupported metadata format version {0}.'.format(version)
+            );
+
+        self.__data = data;
+        self.__pathCount = pathCount;
+        self.__recordCount = recordCount;
+        self.__pathsOffset = self.HEADER.size;
+        self.__blobOffset = self.__pathsOffset + pathCount * self.PATH.size;
+
+        if self.__blobOffset > len(data):
+            raise InvalidArgumentException('The metadata is truncated.');
+
+        if pathCount:
+            offset, length = self.PATH.unpack_from(
+                data, self.__blobOffset - self.PATH.size
+            );
+            self.__recordsOffset = self.__blobOffset + offset + length;
+        else:
+            self.__recordsOffset = self.__blobOffset;
+
+        if self.__recordsOffset + recordCount * self.RECORD.size > len(data):
+            raise InvalidArgumentException('The metadata is truncated.');
+
+        # a corrupted offset must not read out of its table
+        blobLength = self.__recordsOffset - self.__blobOffset;
+        offset = self.__pathsOffset;
+        for i in range(pathCount):
+            pathOffset, length = self.PATH.unpack_from(data, offset);
+            offset += self.PATH.size;
+            if pathOffset + length > blobLength:
+                raise InvalidArgumentException('The metadata is corrupted.');
+
+        for record in self.__iterRecords():
+            if record[0] >= pathCount:
+                raise InvalidArgumentException('The metadata is corrupted.');
+
+    @classmethod
+    def dump(cls, resources):
+        """Encodes resources.
+
+        @param resources: ResourceInterface[] The resources to encode
+
+        @return: bytes|None None when a resource can not be encoded
+
+        """
+        paths = list();
+        indexes = dict();
+        records = list();
+
+        def addRecord(path, kind, mtime=0.0, size=0, inode=0):
+            if path not in indexes:
+                indexes[path] = len(paths);
+                paths.append(cls._encodePath(path));
+            records.append((indexes[path], kind, mtime, size, inode));
+
+        for resource in resources:
+            if type(resource) in (FileResource, DirectoryResource) \
+                and resource.usesDigest():
+                return None;
+            elif type(resource) is FileResource:
+                path = resource.getResource();
+                try:
+                    status = os.stat(path);
+                except OSError:
+                    addRecord(path, cls.KIND_MISSING);
+                    continue;
+                addRecord(path, cls.KIND_FILE,
+                    status.st_mtime, status.st_size);
+            elif type(resource) is DirectoryResource:
+                root = resource.getResource();
+                resource.snapshot();
+                snapshot = resource.getSnapshot();
+                if snapshot is None:
+                    addRecord(root, cls.KIND_MISSING);
+                    continue;
+
+                newestMTime, directories, files = snapshot;
+                for path, mtime in directories:
+                    path = '/'.join([root, path]) if path else root;
+                    addRecord(path, cls.KIND_DIRECTORY, mtime);
+                for path, mtime, size, inode in files:
+                    addRecord('/'.join([root, path]), cls.KIND_FILE,
+                        mtime, size, inode);
+            else:
+                return None;
+
+        parts = [cls.HEADER.pack(
+            cls.MAGIC, cls.VERSION, len(paths), len(records)
+        )];
+        offset = 0;
+        for path in paths:
+            parts.append(cls.PATH.pack(offset, len(path)));
+            offset += len(path);
+        parts.extend(paths);
+        for record in records:
+            parts.append(cls.RECORD.pack(*record));
+
+        return b''.join(parts);
+
+    @classmethod
+    def isBinary(cls, data):
+        """Returns whether data is encoded in the binary format.
+
+        @param data: bytes|mmap
+
+        @return: Boolean
+
+        """
+        return data[:len(cls.MAGIC)] == cls.MAGIC;
+
+    @classmethod
+    def open(cls, filename):
+        """Maps a metadata file in memory.
+
+        @param filename: string The metadata file
+
+        @return: BinaryMetadata|None None when the file is not encoded
+            in the binary format
+
+        """
+        f = open(filename, 'rb');
+        try:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ);
+            except (ValueError, EnvironmentError):
+                # e.g. an empty file
+                return None;
+        finally:
+            f.close();
+
+        if not cls.isBinary(data):
+            data.close();
+            return None;
+
+        try:
+            return cls(data);
+        except InvalidArgumentException:
+            data.close();
+            raise;
+
+    def close(self):
+        """Releases the memory-mapped data.
+        """
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close();
+
+    def getPath(self, index):
+        """Returns a path of the table.
+
+        @param index: int The index of the path
+
+        @return: string
+
+        """
+        offset, length = self.PATH.unpack_from(
+            self.__data, self.__pathsOffset + index * self.PATH.size
+        );
+        offset += self.__blobOffset;
+
+        return self._decodePath(self.__data[offset:offset + length]);
+
+    def getRecords(self):
+        """Returns the decoded records.
+
+        @return: list A list of (path, kind, mtime, size, inode) tuples
+
+        """
+        return [(self.getPath(record[0]),) + record[1:]
+            for record in self.__iterRecords()];
+
+    def getResources(self):
+        """Creates resources covering the records, for consumers such as
+        resource watchers.
+
+        A directory snapshot is recorded with all its subdirectories, only
+        its root becomes a DirectoryResource, and the files within it are
+        left to that resource.
+
+        @return: ResourceInterface[]
+
+        """
+        records = self.getRecords();
+        directories = set([record[0] for record in records
+            if record[1] == self.KIND_DIRECTORY]);
+
+        def isNested(path):
+            parent = os.path.dirname(path);
+            while parent and parent != path:
+                if parent in directories:
+                    return True;
+                path, parent = parent, os.path.dirname(parent);
+
+            return False;
+
+        resources = list();
+        for path, kind, mtime, size, inode in records:
+            if isNested(path):
+                continue;
+            if kind == self.KIND_DIRECTORY:
+                resources.append(DirectoryResource(path));
+            else:
+                resources.append(FileResource(path));
+
+        return resources;
+
+    def getRecordCount(self):
+        """Returns the number of records.
+
+        @return: int
+
+        """
+        return self.__recordCount;
+
+    def isFresh(self, timestamp, stat=None, start=0, stop=None):
+        """Returns true if none of the recorded paths changed and all of
+        them are older than the given timestamp.
+
+        @param timestamp: int The last time the resources were loaded
+        @param stat: callable A function returning the status of a path
+            or None when it does not exist, e.g. FreshnessChecker.stat()
+        @param start: int The index of the first record to check
+        @param stop: int|None The index after the last record to check,
+            all the following records when None
+
+        @return: Boolean
+
+        """
+        if stat is None:
+            stat = self.__stat;
+
+        for index, kind, mtime, size, inode in self.__iterRecords(start, stop):
+            if kind == self.KIND_MISSING or mtime >= timestamp:
+                return False;
+
+            status = stat(self.getPath(index));
+            if status is None or status.st_mtime != mtime:
+                return False;
+
+            if kind == self.KIND_DIRECTORY:
+                if not S_ISDIR(status.st_mode):
+                    return False;
+            elif status.st_size != size \
+                or (inode and status.st_ino != inode):
+                return False;
+
+        return True;
+
+    def __iterRecords(self, start=0, stop=None):
+        if stop is None:
+            stop = self.__recordCount;
+
+        record = self.RECORD;
+        offset = self.__recordsOffset + start * record.size;
+        for i in range(start, stop):
+            yield record.unpack_from(self.__data, offset);
+            offset += record.size;
+
+    def __stat(self, path):
+        try:
+            return os.stat(path);
+        except OSError:
+            return None;
+
+    @classmethod
+    def _encodePath(cls, path):
+        if isinstance(path, bytes):
+            return path;
+
+        encoding = sys.getfilesystemencoding() or 'utf-8';
+        try:
+            return path.encode(encoding, 'surrogateescape');
+        except LookupError:
+            return path.encode(encoding);
+
+    @classmethod
+    def _decodePath(cls, path):
+        if bytes is str:
+            return path;
+
+        encoding = sys.getfilesystemencoding() or 'utf-8';
+        return path.decode(encoding, 'surrogateescape');
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import os;
+import threading;
+
+from pymfony.component.system.types import String;
+
+from pymfony.component.config.loader import Loader;
+from pymfony.component.config.loader import FileLoader;
+from pymfony.component.config.asyncloader import AsyncFileLoader;
+
+"""
+"""
+
+
+class AsyncTextFileLoader(AsyncFileLoader):
+
+    async def load(self, resource, resourceType = None):
+
+        self.setCurrentDir(os.path.dirname(resource));
+
+        f = open(resource);
+        imports = [line.strip() for line in f if line.strip()];
+        f.close();
+
+        return [
+            os.path.basename(resource),
+            await self.importMany(imports, None, False, resource)
+        ];
+
+
+    def supports(self, resource, resourceType = None):
+
+        return isinstance(resource, String) and resource.endswith('.txt');
+
+
+class SyncTextFileLoader(FileLoader):
+
+    def load(self, resource, resourceType = None):
+
+        self.setCurrentDir(os.path.dirname(resource));
+
+        f = open(resource);
+        imports = [line.strip() for line in f if line.strip()];
+        f.close();
+
+        return [
+            os.path.basename(resource),
+            [os.path.basename(path) for path in self._getImportChain()],
+            self.importMany(imports, None, False, resource)
+        ];
+
+
+    def supports(self, resource, resourceType = None):
+
+        return isinstance(resource, String) and resource.endswith('.stxt');
+
+
+class PausingTextFileLoader(SyncTextFileLoader):
+    """Waits for the other loads once it entered each directory, so that
+    concurrent loads all set their current directory before importing.
+
+    """
+
+    def __init__(self, locator, barrier):
+
+        SyncTextFileLoader.__init__(self, locator);
+        self.__barrier = barrier;
+        self.__directories = set();
+
+
+    def setCurrentDir(self, directory):
+
+        SyncTextFileLoader.setCurrentDir(self, directory);
+
+        if directory in self.__directories:
+            return;
+        self.__directories.add(directory);
+
+        try:
+            self.__barrier.wait(5);
+        except threading.BrokenBarrierError:
+            pass;
+
+
+class SyncLoader(Loader):
+
+    def load(self, resource, resourceType = None):
+
+        return 'sync';
+
+
+    def supports(self, resource, resourceType = None):
+
+        return isinstance(resource, String) and resource.endswith('.sync');
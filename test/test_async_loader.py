@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import unittest;
+import tempfile;
+import os;
+import shutil;
+import threading;
+
+try:
+    import asyncio;
+    import contextvars;
+except ImportError:
+    # the asynchronous loaders require Python 3.7+
+    asyncio = None;
+
+from pymfony.component.system import SourceFileLoader;
+
+from pymfony.component.config import FileLocator;
+from pymfony.component.config.loader import Loader;
+from pymfony.component.config.exception import FileLoaderLoadException;
+from pymfony.component.config.exception import FileLoaderImportCircularReferenceException;
+
+if asyncio is not None:
+    from pymfony.component.config.asyncloader import AsyncLoaderResolver;
+    from pymfony.component.config.asyncloader import AsyncDelegatingLoader;
+    from pymfony.component.config.asyncloader import ExecutorLoaderAdapter;
+
+"""
+"""
+
+__DIR__ = os.path.dirname(os.path.realpath(__file__));
+
+class AsyncFileLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+
+        if asyncio is None:
+            self.skipTest('The asynchronous loaders require Python 3.7+.');
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        for name, imports in [
+            ('a.txt', ['b.txt', 'c.txt', 'foo.sync']),
+            ('b.txt', ['d.txt']),
+            ('c.txt', ['d.txt']),
+            ('d.txt', []),
+            ('e.txt', ['f.txt']),
+            ('f.txt', ['e.txt']),
+            ('g.txt', ['h.stxt']),
+            ('h.stxt', ['i.stxt']),
+            ('i.stxt', []),
+        ]:
+            f = open(self._directory+'/'+name, 'w');
+            f.write('\n'.join(imports));
+            f.close();
+
+        self._loaders = SourceFileLoader.load(__DIR__+'/Fixtures/Loader/async_loaders.py');
+        self._loader = self._loaders.AsyncTextFileLoader(FileLocator(self._directory));
+        self._resolver = AsyncLoaderResolver([self._loader, self._loaders.SyncLoader(), self._loaders.SyncTextFileLoader(FileLocator(self._directory))]);
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def _run(self, coroutine):
+
+        loop = asyncio.new_event_loop();
+        try:
+            return loop.run_until_complete(coroutine);
+        finally:
+            loop.close();
+
+
+    def testResolverAdaptsSynchronousLoaders(self):
+        loaders = self._resolver.getLoaders();
+        self.assertEqual(self._loader, loaders[0]);
+        self.assertTrue(isinstance(loaders[1], ExecutorLoaderAdapter));
+        self.assertEqual(
+            'sync',
+            self._run(AsyncDelegatingLoader(self._resolver).load('foo.sync'))
+        );
+
+
+    def testImports(self):
+        self._loader.setCurrentDir(self._directory);
+
+        self.assertEqual(
+            ['a.txt', [['b.txt', [['d.txt', []]]], ['c.txt', [['d.txt', []]]], 'sync']],
+            self._run(self._loader.imports('a.txt')),
+            '->imports() loads the sibling resources concurrently'
+        );
+
+        self.assertRaises(
+            FileLoaderImportCircularReferenceException,
+            self._run, self._loader.imports('e.txt')
+        );
+
+
+    def testAdaptedFileLoadersContinueTheImportChain(self):
+
+        self._loader.setCurrentDir(self._directory);
+
+        self.assertEqual(
+            ['g.txt', [['h.stxt', ['g.txt', 'h.stxt'], [['i.stxt', ['g.txt', 'h.stxt', 'i.stxt'], []]]]]],
+            self._run(self._loader.imports('g.txt')),
+            '->load() runs the adapted loader with the import chain and the resolver of the adapter'
+        );
+
+
+    def testAdaptedFileLoadersKeepTheirCurrentDirPerCall(self):
+
+        for name, imports in [
+            ('j.txt', ['a/p.stxt', 'b/p.stxt']),
+            ('a/p.stxt', ['c.stxt']),
+            ('a/c.stxt', ['x.stxt']),
+            ('a/x.stxt', []),
+            ('b/p.stxt', ['c.stxt']),
+            ('b/c.stxt', []),
+        ]:
+            path = self._directory+'/'+name;
+            if not os.path.isdir(os.path.dirname(path)):
+                os.mkdir(os.path.dirname(path));
+            f = open(path, 'w');
+            f.write('\n'.join(imports));
+            f.close();
+
+        # both sibling loads set their directory before importing
+        loader = self._loaders.AsyncTextFileLoader(FileLocator(self._directory));
+        AsyncLoaderResolver([loader, self._loaders.PausingTextFileLoader(FileLocator(self._directory), threading.Barrier(2))]);
+        loader.setCurrentDir(self._directory);
+
+        self.assertEqual(
+            ['j.txt', [
+                ['p.stxt', ['j.txt', 'p.stxt'], [
+                    ['c.stxt', ['j.txt', 'p.stxt', 'c.stxt'], [
+                        ['x.stxt', ['j.txt', 'p.stxt', 'c.stxt', 'x.stxt'], []],
+                    ]],
+                ]],
+                ['p.stxt', ['j.txt', 'p.stxt'], [
+                    ['c.stxt', ['j.txt', 'p.stxt', 'c.stxt'], []],
+                ]],
+            ]],
+            self._run(loader.imports('j.txt')),
+            '->load() resolves the relative imports of each call from its own directory'
+        );
+
+
+    def testDelegatingLoaderImportsResolvesTheLoaderOnce(self):
+
+        loader1 = CountingLoader();
+        loader = AsyncDelegatingLoader(AsyncLoaderResolver([loader1]));
+
+        self.assertEqual('foo', self._run(loader.imports('foo')));
+        self.assertEqual(1, loader1.calls, '->imports() resolves the loader once');
+
+        loader = AsyncDelegatingLoader(AsyncLoaderResolver([]));
+        self.assertRaises(FileLoaderLoadException, self._run, loader.imports('foo'));
+
+
+class CountingLoader(Loader):
+
+    def __init__(self):
+
+        Loader.__init__(self);
+        self.calls = 0;
+
+
+    def load(self, resource, resourceType = None):
+
+        return resource;
+
+
+    def supports(self, resource, resourceType = None):
+
+        self.calls += 1;
+        return True;
+
+if __name__ == '__main__':
+    unittest.main();
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import unittest;
+import tempfile;
+import os;
+import shutil;
+import struct;
+from time import time;
+
+from pymfony.component.config.resource import FileResource;
+from pymfony.component.config.resource import DirectoryResource;
+from pymfony.component.config.resource import BinaryMetadata;
+from pymfony.component.config.resource import FreshnessChecker;
+from pymfony.component.config import ConfigCache;
+
+"""
+"""
+
+
+class BinaryMetadataTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        os.mkdir(self._directory+'/subdirectory');
+        self._touch(self._directory+'/foo.xml', time() - 100);
+        self._touch(self._directory+'/subdirectory/bar.xml', time() - 100);
+        self._touch(self._directory+'/subdirectory', time() - 100);
+        self._touch(self._directory, time() - 100);
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def _touch(self, path, mtime = None):
+        if mtime is None:
+            mtime = time();
+        if not os.path.isdir(path):
+            open(path, 'a').close();
+        os.utime(path, (mtime, mtime));
+
+
+    def _load(self, resources):
+
+        data = BinaryMetadata.dump(resources);
+        self.assertTrue(BinaryMetadata.isBinary(data));
+
+        return BinaryMetadata(data);
+
+
+    def testDump(self):
+
+        metadata = self._load([
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory, '\.xml$'),
+        ]);
+
+        self.assertEqual([
+            (self._directory+'/foo.xml', BinaryMetadata.KIND_FILE),
+            (self._directory, BinaryMetadata.KIND_DIRECTORY),
+            (self._directory+'/subdirectory', BinaryMetadata.KIND_DIRECTORY),
+            (self._directory+'/foo.xml', BinaryMetadata.KIND_FILE),
+            (self._directory+'/subdirectory/bar.xml', BinaryMetadata.KIND_FILE),
+        ], [record[:2] for record in metadata.getRecords()]);
+
+        self.assertEqual(None, BinaryMetadata.dump([object()]), '::dump() returns None for unsupported resources');
+
+
+    def testIsFresh(self):
+
+        metadata = self._load([
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory),
+        ]);
+
+        self.assertTrue(metadata.isFresh(time() + 10), '->isFresh() returns True if nothing changed');
+        self.assertFalse(metadata.isFresh(time() - 86400), '->isFresh() returns False if a path is newer than the timestamp');
+
+        self._touch(self._directory+'/subdirectory/bar.xml', time() - 200);
+        self.assertFalse(metadata.isFresh(time() + 10), '->isFresh() returns False if a file differs from its record');
+
+        metadata = self._load([FileResource(self._directory+'/missing.xml')]);
+        self.assertFalse(metadata.isFresh(time() + 10), '->isFresh() returns False if a file was missing');
+
+
+    def testIsFreshThroughAChecker(self):
+
+        metadata = self._load([
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory),
+        ]);
+
+        try:
+            from concurrent.futures import ThreadPoolExecutor;
+        except ImportError:
+            ThreadPoolExecutor = None;
+
+        executors = [None];
+        if ThreadPoolExecutor is not None:
+            executors.append(ThreadPoolExecutor(2));
+
+        for executor in executors:
+            checker = FreshnessChecker(executor);
+            checker.BINARY_CHUNK_SIZE = 2;
+            self.assertTrue(checker.isBinaryFresh(metadata, time() + 10), '->isBinaryFresh() returns True if nothing changed');
+            self.assertEqual(4, checker.getStats()['stat'], '->isBinaryFresh() stats the paths through the checker');
+            self.assertFalse(checker.isBinaryFresh(metadata, time() - 86400));
+
+            if executor is not None:
+                executor.shutdown();
+
+
+    def testGetResources(self):
+
+        metadata = self._load([
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory+'/subdirectory'),
+            FileResource(self._directory+'/subdirectory/bar.xml'),
+        ]);
+
+        self.assertEqual(
+            [(FileResource, self._directory+'/foo.xml'), (DirectoryResource, self._directory+'/subdirectory')],
+            [(type(r), r.getResource()) for r in metadata.getResources()],
+            '->getResources() only returns the root directories and the files out of them'
+        );
+
+
+    def testInvalidData(self):
+
+        data = BinaryMetadata.dump([FileResource(self._directory+'/foo.xml')]);
+
+        header = BinaryMetadata.HEADER.size;
+        badPath = bytearray(data);
+        struct.pack_into('<II', badPath, header, 1000, 5);
+        badRecord = bytearray(data);
+        struct.pack_into('<I', badRecord, len(data) - BinaryMetadata.RECORD.size, 99);
+
+        for invalid in [data[:-1], data[:8], data[:header + 1], bytes(badPath), bytes(badRecord)]:
+            try:
+                BinaryMetadata(invalid);
+                self.fail('The constructor throws an exception on truncated or corrupted data');
+            except Exception as e:
+                self.assertEqual('InvalidArgumentException', type(e).__name__);
+
+
+    def testConfigCache(self):
+
+        cacheFile = self._directory+'/cache/config.py';
+        cache = ConfigCache(cacheFile, True);
+        cache.write('foo = 1', [
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory+'/subdirectory'),
+        ]);
+
+        f = open(cacheFile+'.meta', 'rb');
+        self.assertTrue(BinaryMetadata.isBinary(f.read()), '->write() uses the binary format');
+        f.close();
+
+        self.assertTrue(cache.isFresh());
+
+        self._touch(self._directory+'/subdirectory/bar.xml', time() + 20);
+        self.assertFalse(cache.isFresh());
+
+    def testConfigCacheWithInvalidMetadata(self):
+
+        cacheFile = self._directory+'/cache/config.py';
+        cache = ConfigCache(cacheFile, True);
+        cache.write('foo = 1', [FileResource(self._directory+'/foo.xml')]);
+
+        f = open(cacheFile+'.meta', 'rb');
+        data = f.read();
+        f.close();
+
+        for invalid in [data[:-1], b'']:
+            f = open(cacheFile+'.meta', 'wb');
+            f.write(invalid);
+            f.close();
+            self.assertFalse(cache.isFresh(), '->isFresh() returns False if the metadata is truncated');
+
+
+if __name__ == '__main__':
+    unittest.main();
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import unittest;
+import tempfile;
+import os;
+import shutil;
+import struct;
+import threading;
+from time import time;
+from time import sleep;
+
+from pymfony.component.config import ConfigCache;
+from pymfony.component.config import ConfigCacheCoordinator;
+from pymfony.component.config import ConfigCacheRegistry;
+from pymfony.component.config import MappedConfig;
+from pymfony.component.config.resource import FileResource;
+from pymfony.component.config.watcher import PollingResourceWatcher;
+
+"""
+"""
+
+
+class ConfigCacheTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        self._cacheFile = self._directory+'/cache/config.py';
+        self._resourceFile = self._directory+'/config.xml';
+        open(self._resourceFile, 'a').close();
+        os.utime(self._resourceFile, (time() - 100, time() - 100));
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def testWrite(self):
+
+        for fsync in [False, True]:
+            cache = ConfigCache(self._cacheFile, True, fsync=fsync);
+            cache.write('foo = {0}'.format(fsync), [FileResource(self._resourceFile)]);
+
+            f = open(self._cacheFile);
+            self.assertEqual('foo = {0}'.format(fsync), f.read());
+            f.close();
+
+            self.assertTrue(cache.isFresh());
+            self.assertEqual(
+                ['config.py', 'config.py.meta'],
+                sorted(os.listdir(self._directory+'/cache')),
+                '->write() leaves no temporary file'
+            );
+
+
+    def testIsFreshReusesTheParsedMetadata(self):
+
+        registry = ConfigCacheRegistry();
+        cache = ConfigCache(self._cacheFile, True, registry=registry);
+        cache.write('foo = 1', [FileResource(self._resourceFile)]);
+        self.assertTrue(cache.isFresh());
+
+        metadata = self._cacheFile+'.meta';
+        parsed = registry.getMetadata(metadata, os.stat(metadata));
+        self.assertTrue(cache.isFresh());
+        self.assertTrue(parsed is registry.getMetadata(metadata, os.stat(metadata)), '->getMetadata() does not parse unchanged metadata again');
+
+        cache.write('foo = 1', [FileResource(self._resourceFile)]);
+        self.assertFalse(parsed is registry.getMetadata(metadata, os.stat(metadata)), '->getMetadata() parses replaced metadata again');
+        self.assertTrue(cache.isFresh());
+
+
+    def testRegistryKeepsTheDroppedMappingsReadable(self):
+
+        registry = ConfigCacheRegistry(1);
+        cache = ConfigCache(self._cacheFile, True, registry=registry);
+        cache.write('foo = 1', [FileResource(self._resourceFile)]);
+        self.assertTrue(cache.isFresh());
+
+        metadata = self._cacheFile+'.meta';
+        parsed = registry.getMetadata(metadata, os.stat(metadata));
+        other = ConfigCache(self._directory+'/cache/other.py', True, registry=registry);
+        other.write('bar = 1', [FileResource(self._resourceFile)]);
+        self.assertTrue(other.isFresh());
+        self.assertFalse(parsed is registry.getMetadata(metadata, os.stat(metadata)), '->getMetadata() drops the least recently checked metadata');
+        self.assertTrue(parsed.isFresh(time()), 'a dropped mapping stays readable by the checks still holding it');
+
+        cache.write('foo = 2', [FileResource(self._resourceFile)]);
+        self.assertTrue(parsed.isFresh(time()), 'a replaced mapping stays readable by the checks still holding it');
+        self.assertTrue(cache.isFresh());
+
+
+    def testIsFreshWithCorruptedMetadata(self):
+
+        cache = ConfigCache(self._cacheFile, True, registry=ConfigCacheRegistry());
+        cache.write('foo = 1', [FileResource(self._resourceFile)]);
+
+        f = open(self._cacheFile+'.meta', 'w');
+        f.write('corrupted');
+        f.close();
+        self.assertFalse(cache.isFresh());
+
+
+    def testFailedWriteKeepsThePreviousContentStale(self):
+
+        cache = ConfigCache(self._cacheFile, True, registry=ConfigCacheRegistry());
+        cache.write('foo = 1', [FileResource(self._resourceFile)]);
+        self.assertTrue(cache.isFresh());
+
+        try:
+            cache.write(1, [FileResource(self._resourceFile)]);
+            self.fail('->write() throws an exception if the content can not be written');
+        except Exception as e:
+            self.assertEqual('RuntimeException', type(e).__name__);
+
+        f = open(self._cacheFile);
+        self.assertEqual('foo = 1', f.read());
+        f.close();
+        self.assertFalse(os.path.exists(self._cacheFile+'.meta'), '->write() never pairs the new metadata with the previous content');
+        self.assertFalse(cache.isFresh());
+
+
+    def testIsFreshWithAnInterval(self):
+
+        registry = ConfigCacheRegistry();
+        cache = ConfigCache(self._cacheFile, True, registry=registry, interval=60);
+        cache.write('foo = 1', [FileResource(self._resourceFile)]);
+        self.assertTrue(cache.isFresh());
+
+        os.utime(self._resourceFile, (time() + 20, time() + 20));
+        self.assertTrue(cache.isFresh(), '->isFresh() is not checked again during the interval');
+        self.assertFalse(ConfigCache(self._cacheFile, True, registry=registry).isFresh());
+
+    def testIntervalDependsOnTheDebugMode(self):
+
+        registry = ConfigCacheRegistry();
+        ConfigCache(self._cacheFile, True).write('foo = 1', [FileResource(self._resourceFile)]);
+        os.utime(self._resourceFile, (time() + 20, time() + 20));
+
+        self.assertTrue(ConfigCache(self._cacheFile, False, registry=registry, interval=60).isFresh());
+        self.assertFalse(ConfigCache(self._cacheFile, True, registry=registry, interval=60).isFresh(), '->isFresh() checks the resources of a cache only found fresh without debug');
+
+
+    def testIsFreshWithAWatcher(self):
+
+        watcher = PollingResourceWatcher(0);
+        cache = ConfigCache(self._cacheFile, True, watcher, registry=ConfigCacheRegistry());
+        cache.write('foo = 1', [FileResource(self._resourceFile)]);
+        self.assertTrue(cache.isFresh());
+        self.assertTrue(watcher.isWatched(self._cacheFile), '->isFresh() watches the resources of a fresh cache');
+        self.assertFalse(watcher.isDirty(self._cacheFile));
+        self.assertTrue(cache.isFresh());
+
+        os.utime(self._resourceFile, (time() - 50, time() - 50));
+        self.assertTrue(watcher.isDirty(self._cacheFile), '->isDirty() notices the touched resource');
+        self.assertFalse(cache.isFresh(), '->isFresh() returns False once a watched resource changed');
+
+
+    def testMap(self):
+
+        cache = ConfigCache(self._cacheFile, False);
+        cache.write('foo = 1');
+
+        data = cache.map();
+        try:
+            self.assertEqual(b'foo = 1', data[:]);
+        finally:
+            data.close();
+
+
+    def testWriteConfig(self):
+
+        config = {'foo': {'bar': [1, 2]}, 'baz': None};
+
+        cache = ConfigCache(self._cacheFile, False);
+        cache.writeConfig(config);
+
+        loaded = cache.loadConfig();
+        try:
+            self.assertEqual(2, len(loaded));
+            self.assertTrue('foo' in loaded);
+            self.assertEqual({'bar': [1, 2]}, loaded['foo']);
+            self.assertEqual('default', loaded.get('qux', 'default'));
+            self.assertEqual(config, loaded.toDict());
+        finally:
+            loaded.close();
+
+        self.assertEqual({'bar': [1, 2]}, loaded['foo'], '->close() keeps the values already read');
+
+        with cache.loadConfig() as loaded:
+            self.assertEqual({'bar': [1, 2]}, loaded['foo']);
+        self.assertRaises(ValueError, loaded.__getitem__, 'baz');
+
+        data = bytearray(MappedConfig.dump(config));
+        struct.pack_into('<Q', data, MappedConfig.HEADER.size, 1 << 40);
+        try:
+            MappedConfig(bytes(data));
+            self.fail('The constructor throws an exception if an offset is out of the data');
+        except Exception as e:
+            self.assertEqual('InvalidArgumentException', type(e).__name__);
+
+        cache.write('foo = 1');
+        try:
+            cache.loadConfig();
+            self.fail('->loadConfig() throws an exception if the cache is not a dumped configuration');
+        except Exception as e:
+            self.assertEqual('InvalidArgumentException', type(e).__name__);
+
+
+    def testWriteAppliesTheUmask(self):
+
+        if not hasattr(os, 'chmod'):
+            self.skipTest('The os.chmod() function is not available.');
+
+        umask = os.umask(0o027);
+        try:
+            ConfigCache(self._cacheFile, False).write('foo = 1');
+        finally:
+            os.umask(umask);
+
+        self.assertEqual(0o640, os.stat(self._cacheFile).st_mode & 0o777);
+
+
+class ConfigCacheCoordinatorTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        self._resourceFile = self._directory+'/config.xml';
+        open(self._resourceFile, 'a').close();
+        os.utime(self._resourceFile, (time() - 100, time() - 100));
+
+        self._cache = ConfigCache(self._directory+'/cache/config.py', True);
+        self._builds = 0;
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def _build(self):
+
+        self._builds += 1;
+
+        return 'foo = 1', [FileResource(self._resourceFile)];
+
+
+    def testWarmup(self):
+
+        coordinator = ConfigCacheCoordinator(self._cache);
+        self.assertEqual(ConfigCacheCoordinator.BUILT, coordinator.warmup(self._build));
+        self.assertEqual(ConfigCacheCoordinator.FRESH, coordinator.warmup(self._build));
+        self.assertEqual(1, self._builds);
+
+
+    def testWarmupDuringAnotherRebuild(self):
+
+        self._cache.write('foo = 0', [FileResource(self._resourceFile)]);
+        os.utime(self._resourceFile, (time() + 20, time() + 20));
+
+        results = [];
+        def build():
+            for serveStale in [True, False]:
+                results.append(ConfigCacheCoordinator(
+                    self._cache, timeout=0.1, serveStale=serveStale
+                ).warmup(self._build));
+
+            return self._build();
+
+        self.assertEqual(ConfigCacheCoordinator.BUILT, ConfigCacheCoordinator(self._cache).warmup(build));
+        self.assertEqual(
+            [ConfigCacheCoordinator.STALE, ConfigCacheCoordinator.BUILT],
+            results,
+            '->warmup() serves the stale copy or rebuilds the cache after the timeout'
+        );
+
+
+    def testWarmupAfterTheTimeoutOfAnotherRebuild(self):
+
+        results = [];
+        def wait():
+            results.append(ConfigCacheCoordinator(
+                self._cache, timeout=0.2, serveStale=False
+            ).warmup(self._build));
+
+        def build():
+            thread = threading.Thread(target=wait);
+            thread.start();
+            sleep(0.05);
+
+            content, metadata = self._build();
+            self._cache.write(content, metadata);
+
+            # the lock is still held when the timeout is reached
+            thread.join();
+
+            return content, metadata;
+
+        self.assertEqual(ConfigCacheCoordinator.BUILT, ConfigCacheCoordinator(self._cache).warmup(build));
+        self.assertEqual([ConfigCacheCoordinator.FRESH], results, '->warmup() checks the cache again after the timeout');
+        self.assertEqual(1, self._builds, '->warmup() does not rebuild a cache rebuilt during the timeout');
+
+if __name__ == '__main__':
+    unittest.main();
@@ -8,9 +8,13 @@
 
 from __future__ import absolute_import;
 
+import copy;
+import threading;
 import unittest;
 
 from pymfony.component.system.exception import InvalidArgumentException;
+from pymfony.component.system.exception import RuntimeException;
+from pymfony.component.system.types import OrderedDict;
 
 from pymfony.component.config.definition import ScalarNode;
 from pymfony.component.config.definition import BooleanNode;
@@ -20,11 +24,16 @@ from pymfony.component.config.definition import EnumNode;
 from pymfony.component.config.definition import ArrayNode;
 from pymfony.component.config.definition import PrototypedArrayNode;
 from pymfony.component.config.definition import NodeInterface;
+from pymfony.component.config.definition import ConfigurationInterface;
 from pymfony.component.config.definition import Processor;
+from pymfony.component.config.definition import NodeCompiler;
+from pymfony.component.config.definition import CachingProcessor;
+from pymfony.component.config.definition import IncrementalProcessor;
 from pymfony.component.config.definition.builder import TreeBuilder;
 from pymfony.component.config.definition.exception import InvalidTypeException;
 from pymfony.component.config.definition.exception import InvalidConfigurationException;
 from pymfony.component.config.definition.exception import ForbiddenOverwriteException;
+from pymfony.component.config.definition.exception import DuplicateKeyException;
 
 """
 """
@@ -520,6 +529,112 @@ class PrototypedArrayNodeTest(unittest.TestCase):
         self.assertEqual({0: {'foo': 'bar'}}, node.getDefaultValue());
 
 
+    def testNormalizeItems(self):
+
+        node = PrototypedArrayNode('root');
+        node.setPrototype(ScalarNode("", node));
+
+        items = node.normalizeItems(iter(['foo', 'bar']));
+        self.assertFalse(isinstance(items, (dict, list)), '->normalizeItems() returns a generator');
+        self.assertEqual([(0, 'foo'), (1, 'bar')], list(items));
+
+        items = [('first-key', 'foo'), ('second', 'bar')];
+        self.assertEqual({'first_key': 'foo', 'second': 'bar'}, node.normalizeItemsInto(iter(items), dict(), True));
+        items = [(1, 'foo'), (0, 'bar')];
+        self.assertEqual(node.normalize(dict(items)), node.normalizeItemsInto(iter(items), dict(), True));
+
+        items = [('first_key', 'foo'), ('first-key', 'bar')];
+        self.assertEqual(
+            node.normalize(dict(items)),
+            node.normalizeItemsInto(iter(items), dict(), True),
+            '->normalizeItems() keeps a dashed key following its underscored twin, as ->normalize()'
+        );
+        self.assertEqual({'first_key': 'foo', 'first-key': 'bar'}, node.normalizeItemsInto(iter(items), dict(), True));
+
+        items = node.normalizeItems(iter([('first-key', 'foo'), ('first_key', 'bar')]), True);
+        self.assertEqual(('first_key', 'foo'), next(items));
+        self.assertRaises(DuplicateKeyException, next, items);
+        self.assertEqual(
+            {'first-key': 'foo', 'first_key': 'bar'},
+            node.normalize(OrderedDict([('first-key', 'foo'), ('first_key', 'bar')])),
+            '->normalize() keeps both keys where ->normalizeItems() can not'
+        );
+
+        node.setFinalValidationClosures([lambda v: v]);
+        self.assertRaises(RuntimeException, node.normalizeItems, []);
+
+        node.setFinalValidationClosures([]);
+        node.setNormalizationClosures([lambda v: v]);
+        self.assertRaises(RuntimeException, node.normalizeItems, []);
+
+
+    def testNormalizeItemsWithKeyAttribute(self):
+
+        node = PrototypedArrayNode('root');
+        node.setKeyAttribute('id', True);
+        prototype = ArrayNode("", node);
+        prototype.addChild(ScalarNode('foo'));
+        node.setPrototype(prototype);
+
+        def items():
+            yield {'id': 'first', 'foo': 'bar'};
+            yield {'id': 'second', 'foo': 'baz'};
+
+        self.assertEqual(
+            {'first': {'foo': 'bar'}, 'second': {'foo': 'baz'}},
+            node.normalizeItemsInto(items(), dict())
+        );
+
+        items = node.normalizeItems([{'id': 'first'}, {'id': 'first'}]);
+        self.assertEqual(('first', {}), next(items));
+        self.assertRaises(DuplicateKeyException, next, items);
+
+        self.assertRaises(InvalidConfigurationException, list, node.normalizeItems([{'foo': 'bar'}]));
+
+
+    def testNormalizeItemsFinalizesTheItems(self):
+
+        tb = TreeBuilder();
+        tree = tb
+        tree =     tree.root('servers', 'array')
+        tree =         tree.useAttributeAsKey('name')
+        tree =         tree.requiresAtLeastOneElement()
+        tree =         tree.prototype('array')
+        tree =             tree.children()
+        tree =                 tree.scalarNode('host').isRequired().end()
+        tree =                 tree.scalarNode('port').defaultValue(80).end()
+        tree =             tree.end()
+        tree =         tree.end()
+        tree =     tree.end()
+        tree =     tree.buildTree();
+
+        def items():
+            yield {'name': 'first', 'host': 'localhost'};
+            yield {'name': 'second', 'host': 'example.com', 'port': 8080};
+
+        self.assertEqual(
+            {'first': {'host': 'localhost', 'port': 80}, 'second': {'host': 'example.com', 'port': 8080}},
+            tree.normalizeItemsInto(items(), dict()),
+            '->normalizeItemsInto() finalizes the items of a built tree'
+        );
+
+        items = tree.normalizeItems([{'name': 'first', 'port': 'x'}]);
+        self.assertRaises(InvalidConfigurationException, list, items);
+
+        items = tree.normalizeItems([]);
+        self.assertRaises(InvalidConfigurationException, list, items);
+
+
+    def testMergeAppendsToTheFirstFreeIndexes(self):
+
+        node = PrototypedArrayNode('root');
+        node.setPrototype(ScalarNode("", node));
+
+        expected = {0: 'a', 1: 'x', 2: 'c', 3: 'y', 4: 'z'};
+        self.assertEqual(expected, node.merge({0: 'a', 2: 'c'}, ['x', 'y', 'z']));
+        self.assertEqual(expected, NodeCompiler().compile(node).merge({0: 'a', 2: 'c'}, ['x', 'y', 'z']));
+
+
     def _getPrototypeNodeWithDefaultChildren(self):
 
         node = PrototypedArrayNode('root');
@@ -1018,5 +1133,484 @@ class MergeTest(unittest.TestCase):
 
 
 
+class NodeCompilerTest(unittest.TestCase):
+
+    def testPlanMatchesTheNodeTree(self):
+
+        tree = self._getTree();
+        configs = [
+            {
+                'name': 'foo',
+                'enabled': True,
+                'connections': [
+                    {'id': 'default', 'host': 'localhost', 'port': 80},
+                    {'id': 'backup', 'host': 'example.com'},
+                ],
+                'hosts': ['a', 'b'],
+            },
+            {
+                'connections': {'backup': {'port': 8080}},
+                'hosts': ['c'],
+            },
+        ];
+
+        expected = dict();
+        for config in configs:
+            expected = tree.merge(expected, tree.normalize(self._copy(config)));
+        expected = tree.finalize(expected);
+
+        plan = NodeCompiler().compile(tree);
+        actual = dict();
+        for config in configs:
+            actual = plan.merge(actual, plan.normalize(self._copy(config)));
+
+        self.assertEqual(expected, plan.finalize(actual));
+        self.assertEqual({
+            'name': 'foo',
+            'enabled': True,
+            'connections': {
+                'default': {'host': 'localhost', 'port': 80},
+                'backup': {'host': 'example.com', 'port': 8080},
+            },
+            'hosts': {0: 'a', 1: 'b', 2: 'c'},
+        }, expected);
+
+    def testPlanRaisesTheNodeExceptions(self):
+
+        plan = NodeCompiler().compile(self._getTree());
+
+        self.assertRaises(InvalidTypeException, plan.normalize, {'enabled': 'yes'});
+        self.assertRaises(InvalidConfigurationException, plan.normalize, {'foo': 'bar'});
+        self.assertRaises(InvalidConfigurationException, plan.finalize, {});
+
+        try:
+            plan.normalize({'name': 'foo', 'connections': {'default': {'port': 'bar'}}});
+            self.fail();
+        except InvalidTypeException as e:
+            self.assertEqual('root.connections.default.port', e.getPath());
+
+    def testProcessorRunsTheCompiledPlan(self):
+
+        tree = self._getTree();
+        processor = Processor();
+
+        self.assertTrue(processor.compile(tree) is processor.compile(tree));
+        self.assertTrue(tree is processor.compile(tree).getNode());
+        self.assertEqual(
+            {'name': 'foo', 'enabled': False, 'connections': {}, 'hosts': {}},
+            processor.process(tree, [{'name': 'foo'}])
+        );
+
+    def testPlanDoesNotRunTheNodeMethods(self):
+
+        tree = self._getTree();
+        plan = NodeCompiler().compile(tree);
+
+        def fail(*args):
+            self.fail('The plan runs the node methods');
+        for node in [tree, tree.getChildren()['name'], tree.getChildren()['connections'].getPrototype()]:
+            for method in ['normalize', 'merge', 'finalize', '_normalizeValue', '_mergeValues', '_finalizeValue']:
+                setattr(node, method, fail);
+
+        actual = plan.normalize({'name': 'foo', 'connections': [{'id': 'a', 'host': 'h'}]});
+        actual = plan.finalize(plan.merge(actual, plan.normalize({'connections': {'a': {'port': 80}}})));
+        self.assertEqual({'name': 'foo', 'enabled': False, 'connections': {'a': {'host': 'h', 'port': 80}}, 'hosts': {}}, actual);
+
+    def testProcessorCompilesTheModifiedTreesAgain(self):
+
+        tree = self._getTree();
+        processor = Processor();
+
+        plan = processor.compile(tree);
+        self.assertFalse(hasattr(tree, '_nodePlan'), '->compile() keeps the plans on the processor');
+        self.assertTrue(plan.isFresh());
+
+        tree.getChildren()['name'].setFinalValidationClosures([lambda v: v.upper()]);
+        self.assertFalse(plan.isFresh());
+        self.assertEqual('FOO', processor.process(tree, [{'name': 'foo'}])['name'], '->process() runs the current settings of the nodes');
+        self.assertFalse(plan is processor.compile(tree));
+
+        child = ScalarNode('added', tree);
+        child.setDefaultValue('bar');
+        tree.addChild(child);
+        self.assertEqual('bar', processor.process(tree, [{'name': 'foo'}])['added'], '->process() runs the children added after the compilation');
+
+        plan = processor.compile(tree);
+        processor.process(tree, [{'name': 'foo', 'connections': {'a': {'host': 'h'}}, 'hosts': ['a']}]);
+        self.assertTrue(plan is processor.compile(tree), '->process() does not modify the node tree');
+
+    def testProcessConfigurationRunsProcess(self):
+
+        class Configuration(ConfigurationInterface):
+            def getConfigTreeBuilder(self):
+                tb = TreeBuilder();
+                tb.root('root', 'array').children().scalarNode('name').end();
+                return tb;
+
+        class RecordingProcessor(Processor):
+            def __init__(self):
+                Processor.__init__(self);
+                self.trees = list();
+            def process(self, configTree, configs):
+                self.trees.append(configTree);
+                return Processor.process(self, configTree, configs);
+
+        processor = RecordingProcessor();
+        self.assertEqual({'name': 'foo'}, processor.processConfiguration(Configuration(), [{'name': 'foo'}]));
+        self.assertEqual(1, len(processor.trees), '->processConfiguration() runs ->process()');
+        self.assertEqual('root', processor.trees[0].getName());
+
+    def testIncrementalProcessorStartsOverOnceTheTreeIsModified(self):
+
+        tree = self._getTree();
+        processor = IncrementalProcessor(tree);
+
+        self.assertEqual('foo', processor.process([{'name': 'foo'}])['name']);
+
+        tree.getChildren()['name'].setFinalValidationClosures([lambda v: v.upper()]);
+        self.assertRaises(RuntimeException, processor.update, 0, {'name': 'bar'});
+        self.assertEqual('FOO', processor.process([{'name': 'foo'}])['name']);
+        self.assertEqual('BAR', processor.update(0, {'name': 'bar'})['name']);
+
+    def _getTree(self):
+
+        tb = TreeBuilder();
+        tree = tb
+        tree =     tree.root('root', 'array')
+        tree =         tree.children()
+        tree =             tree.scalarNode('name').isRequired().end()
+        tree =             tree.booleanNode('enabled').defaultFalse().end()
+        tree =             tree.arrayNode('connections')
+        tree =                 tree.useAttributeAsKey('id')
+        tree =                 tree.prototype('array')
+        tree =                     tree.children()
+        tree =                         tree.scalarNode('host').end()
+        tree =                         tree.integerNode('port').end()
+        tree =                     tree.end()
+        tree =                 tree.end()
+        tree =             tree.end()
+        tree =             tree.arrayNode('hosts')
+        tree =                 tree.prototype('scalar').end()
+        tree =             tree.end()
+        tree =         tree.end()
+        tree =     tree.end()
+        tree =     tree.buildTree();
+
+        return tree;
+
+    def _copy(self, value):
+
+        if isinstance(value, dict):
+            return dict((k, self._copy(v)) for k, v in value.items());
+        if isinstance(value, list):
+            return [self._copy(v) for v in value];
+        return value;
+
+
+
+
+class CachingProcessorTest(unittest.TestCase):
+
+    def testProcessReturnsCachedResults(self):
+
+        tree = self._getTree();
+        processor = CachingProcessor(2);
+
+        self.assertEqual({'foo': 'bar'}, processor.process(tree, [{'foo': 'bar'}]));
+        result = processor.process(tree, [{'foo': 'bar'}]);
+        self.assertEqual({'foo': 'bar'}, result);
+
+        result['foo'] = 'baz';
+        self.assertEqual({'foo': 'bar'}, processor.process(tree, [{'foo': 'bar'}]));
+        self.assertEqual({'hits': 2, 'misses': 1, 'size': 1, 'maxSize': 2}, processor.getStats());
+
+        processor.process(self._getTree(), [{'foo': 'bar'}]);
+        self.assertEqual({'hits': 2, 'misses': 2, 'size': 2, 'maxSize': 2}, processor.getStats());
+
+    def testProcessEvictsTheLeastRecentlyUsedResult(self):
+
+        tree = self._getTree();
+        processor = CachingProcessor(2);
+
+        processor.process(tree, [{'foo': 'a'}]);
+        processor.process(tree, [{'foo': 'b'}]);
+        processor.process(tree, [{'foo': 'a'}]);
+        processor.process(tree, [{'foo': 'c'}]);
+        self.assertEqual(2, processor.getStats()['size']);
+
+        processor.process(tree, [{'foo': 'a'}]);
+        processor.process(tree, [{'foo': 'b'}]);
+        self.assertEqual({'hits': 2, 'misses': 4, 'size': 2, 'maxSize': 2}, processor.getStats());
+
+        processor.clear();
+        self.assertEqual({'hits': 0, 'misses': 0, 'size': 0, 'maxSize': 2}, processor.getStats());
+
+    def testProcessDoesNotMixUpEvictedPlans(self):
+
+        processor = CachingProcessor();
+
+        for i in range(50):
+            tb = TreeBuilder();
+            tree = tb
+            tree =     tree.root('root', 'array')
+            tree =         tree.children()
+            tree =             tree.scalarNode('foo').defaultValue(i).end()
+            tree =         tree.end()
+            tree =     tree.end()
+            tree =     tree.buildTree();
+
+            self.assertEqual({'foo': i}, processor.process(tree, [{}]), '->process() does not return the result of another tree');
+
+    def testProcessDependsOnTheOrderOfTheKeys(self):
+
+        tree = PrototypedArrayNode('root');
+        tree.setPrototype(ScalarNode('', tree));
+        processor = CachingProcessor();
+
+        for configs in [[['x'], {'a': 'b1', 'c': 'd1'}], [['x'], {'c': 'd1', 'a': 'b1'}]]:
+            self.assertEqual(
+                Processor().process(tree, [list(configs[0]), dict(configs[1])]),
+                processor.process(tree, configs)
+            );
+
+    def testProcessIsThreadSafe(self):
+
+        tree = self._getTree();
+        processor = CachingProcessor(4);
+        errors = list();
+
+        def run(i):
+            try:
+                for j in range(50):
+                    foo = 'foo{0}'.format((i + j) % 8);
+                    if {'foo': foo} != processor.process(tree, [{'foo': foo}]):
+                        errors.append(foo);
+            except Exception as e:
+                errors.append(e);
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(4)];
+        for thread in threads:
+            thread.start();
+        for thread in threads:
+            thread.join();
+
+        self.assertEqual([], errors);
+        stats = processor.getStats();
+        self.assertEqual(200, stats['hits'] + stats['misses']);
+        self.assertTrue(stats['size'] <= 4);
+
+    def testHashConfigs(self):
+
+        self.assertFalse(CachingProcessor.hashConfigs([{'a': set([1])}]) is None, '::hashConfigs() hashes the sets');
+        self.assertTrue(CachingProcessor.hashConfigs([{'a': object()}]) is None);
+
+        self.assertEqual(
+            CachingProcessor.hashConfigs([{'a': 1, 'b': [1, 2]}]),
+            CachingProcessor.hashConfigs([{'a': 1, 'b': [1, 2]}])
+        );
+        self.assertNotEqual(
+            CachingProcessor.hashConfigs([{'a': 1, 'b': [1, 2]}]),
+            CachingProcessor.hashConfigs([{'b': [1, 2], 'a': 1}]),
+            '::hashConfigs() depends on the order of the keys'
+        );
+        self.assertNotEqual(
+            CachingProcessor.hashConfigs([{'a': 1}]),
+            CachingProcessor.hashConfigs([{'a': True}])
+        );
+        self.assertNotEqual(
+            CachingProcessor.hashConfigs([{'a': '1'}]),
+            CachingProcessor.hashConfigs([{'a': 1}])
+        );
+        self.assertNotEqual(
+            CachingProcessor.hashConfigs([{'a': 1}]),
+            CachingProcessor.hashConfigs([{'a': 1.0}])
+        );
+        self.assertEqual(
+            CachingProcessor.hashConfigs([OrderedDict([('a', 1), ('b', 2)])]),
+            CachingProcessor.hashConfigs([OrderedDict([('a', 1), ('b', 2)])])
+        );
+        self.assertNotEqual(
+            CachingProcessor.hashConfigs([OrderedDict([('a', 1), ('b', 2)])]),
+            CachingProcessor.hashConfigs([OrderedDict([('b', 2), ('a', 1)])])
+        );
+        self.assertTrue(CachingProcessor.hashConfigs([{'a': object()}]) is None);
+
+    def _getTree(self):
+
+        tb = TreeBuilder();
+        tree = tb
+        tree =     tree.root('root', 'array')
+        tree =         tree.children()
+        tree =             tree.scalarNode('foo').end()
+        tree =         tree.end()
+        tree =     tree.end()
+        tree =     tree.buildTree();
+
+        return tree;
+
+
+
+
+class IncrementalProcessorTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._normalized = list();
+
+        def closure(value):
+            self._normalized.append(value);
+            return value;
+
+        self._tree = ArrayNode('root');
+        for name in ['foo', 'bar']:
+            child = ScalarNode(name, self._tree);
+            child.setNormalizationClosures([closure]);
+            self._tree.addChild(child);
+
+    def testProcessOnlyNormalizesChangedSources(self):
+
+        processor = IncrementalProcessor(self._tree);
+        configs = [{'foo': 'a'}, {'bar': 'b'}, {'foo': 'c'}];
+
+        self.assertEqual({'foo': 'c', 'bar': 'b'}, processor.process(configs));
+        self.assertEqual(['a', 'b', 'c'], self._normalized);
+
+        configs[1] = {'bar': 'd'};
+        self.assertEqual({'foo': 'c', 'bar': 'd'}, processor.process(configs));
+        self.assertEqual(['a', 'b', 'c', 'd'], self._normalized);
+
+        self.assertEqual({'foo': 'a', 'bar': 'd'}, processor.process(configs[:2]));
+        self.assertEqual(['a', 'b', 'c', 'd'], self._normalized);
+
+    def testUpdate(self):
+
+        processor = IncrementalProcessor(self._tree);
+        processor.process([{'foo': 'a'}, {'bar': 'b'}]);
+
+        self.assertEqual({'foo': 'c', 'bar': 'b'}, processor.update(0, {'foo': 'c'}));
+        self.assertEqual(['a', 'b', 'c'], self._normalized);
+        self.assertEqual(
+            Processor().process(self._tree, [{'foo': 'c'}, {'bar': 'b'}]),
+            processor.process([{'foo': 'c'}, {'bar': 'b'}])
+        );
+
+        self.assertRaises(InvalidArgumentException, processor.update, 2, {});
+
+    def testRebuildsMatchTheProcessor(self):
+
+        processor = IncrementalProcessor(self._tree);
+        configs = [{'foo': 'a'}, {'bar': 'b'}, {'foo': 'c'}, {'bar': 'd'}];
+        processor.process(configs);
+
+        for index, config in [(3, {'bar': 'e'}), (3, {'bar': 'f'}), (1, {'foo': 'g'}), (2, {}), (0, {'bar': 'h'})]:
+            configs[index] = config;
+            self.assertEqual(
+                Processor().process(self._tree, [dict(c) for c in configs]),
+                processor.process(configs),
+                '->process() resumes the merge from the kept merged values'
+            );
+            self.assertEqual(Processor().process(self._tree, [dict(c) for c in configs]), processor.update(index, config));
+
+    def testRebuildsKeepTheMergedValuesIntact(self):
+
+        tree = ArrayNode('root');
+        connections = PrototypedArrayNode('connections', tree);
+        connections.setKeyAttribute('id');
+        prototype = ArrayNode('', connections);
+        for name in ['host', 'port']:
+            prototype.addChild(ScalarNode(name, prototype));
+        connections.setPrototype(prototype);
+        tree.addChild(connections);
+
+        processor = IncrementalProcessor(tree);
+        configs = [
+            {'connections': {'a': {'host': 'x'}}},
+            {'connections': {'a': {'port': 1}, 'b': {'host': 'y'}}},
+            {'connections': {'b': {'port': 2}}},
+            {'connections': {'a': {'host': 'z'}}},
+        ];
+        processor.process(configs);
+
+        for index, config in [(3, {'connections': {'b': {'host': 'w'}}}), (2, {}), (1, {'connections': {'a': {'port': 3}}}), (3, {}), (2, {'connections': {'c': {'port': 4}}})]:
+            configs[index] = config;
+            self.assertEqual(
+                Processor().process(tree, copy.deepcopy(configs)),
+                processor.process(configs),
+                '->process() does not alter the kept merged values'
+            );
+
+    def testTrackDirtyOnlyFinalizesDirtySubtrees(self):
+
+        finalized = list();
+
+        def closure(value):
+            finalized.append(value);
+            return value;
+
+        tree = ArrayNode('root');
+        connections = PrototypedArrayNode('connections', tree);
+        connections.setKeyAttribute('id');
+        prototype = ArrayNode('', connections);
+        host = ScalarNode('host', prototype);
+        host.setFinalValidationClosures([closure]);
+        prototype.addChild(host);
+        connections.setPrototype(prototype);
+        tree.addChild(connections);
+
+        processor = IncrementalProcessor(tree, trackDirty=True);
+        configs = [
+            {'connections': {'a': {'host': 'x'}, 'b': {'host': 'y'}}},
+            {'connections': {'b': {'host': 'z'}}},
+        ];
+        self.assertEqual(
+            {'connections': {'a': {'host': 'x'}, 'b': {'host': 'z'}}},
+            processor.process(configs)
+        );
+        self.assertEqual(['x', 'z'], sorted(finalized));
+
+        configs[1] = {'connections': {'b': {'host': 'w'}}};
+        self.assertEqual(
+            {'connections': {'a': {'host': 'x'}, 'b': {'host': 'w'}}},
+            processor.process(configs)
+        );
+        self.assertEqual(['w', 'x', 'z'], sorted(finalized));
+
+        configs[1] = {'connections': {'c': {'host': 'v'}}};
+        self.assertEqual(
+            {'connections': {'a': {'host': 'x'}, 'b': {'host': 'y'}, 'c': {'host': 'v'}}},
+            processor.process(configs)
+        );
+        self.assertEqual(['v', 'w', 'x', 'y', 'z'], sorted(finalized));
+
+    def testResultsDoNotShareTheReusedSubtrees(self):
+
+        tree = ArrayNode('root');
+        connections = PrototypedArrayNode('connections', tree);
+        connections.setKeyAttribute('id');
+        prototype = ArrayNode('', connections);
+        prototype.addChild(ScalarNode('host', prototype));
+        connections.setPrototype(prototype);
+        tree.addChild(connections);
+
+        processor = IncrementalProcessor(tree, trackDirty=True);
+        configs = [
+            {'connections': {'a': {'host': 'x'}}},
+            {'connections': {'b': {'host': 'y'}}},
+        ];
+
+        result = processor.process(configs);
+        result['connections']['a']['host'] = 'altered';
+
+        configs[1] = {'connections': {'b': {'host': 'z'}}};
+        self.assertEqual(
+            {'connections': {'a': {'host': 'x'}, 'b': {'host': 'z'}}},
+            processor.process(configs),
+            '->process() returns results the caller may alter'
+        );
+        self.assertEqual('altered', result['connections']['a']['host']);
+
+
+
+
 if __name__ == '__main__':
     unittest.main();
@@ -93,6 +93,31 @@ class DelegatingLoaderTest(unittest.TestCase):
 
 
 
+    def testImportsResolvesTheLoaderOnce(self):
+
+        loader1 = CountingLoaderMock();
+        loader = DelegatingLoader(LoaderResolver([loader1]));
+
+        self.assertEqual('foo', loader.imports('foo'));
+        self.assertEqual(1, loader1.calls, '->imports() resolves the loader once');
+
+        loader = DelegatingLoader(LoaderResolver([LoaderInterfaceMock2()]));
+        self.assertRaises(FileLoaderLoadException, loader.imports, 'foo');
+
+
+class CountingLoaderMock(LoaderInterface):
+    def __init__(self):
+        self.calls = 0;
+    def getResolver(self):
+        pass;
+    def load(self, resource, resourceType=None):
+        return resource;
+    def setResolver(self, resolver):
+        pass;
+    def supports(self, resource, resourceType=None):
+        self.calls += 1;
+        return True;
+
 class LoaderInterfaceMock1(LoaderInterface):
     def getResolver(self):
         pass;
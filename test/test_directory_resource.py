@@ -11,11 +11,15 @@ from __future__ import absolute_import;
 import unittest;
 import tempfile;
 import os;
+import re;
 import shutil;
 from time import time;
 from random import randint as rand;
 
 from pymfony.component.config.resource import DirectoryResource;
+from pymfony.component.config.resource import RegexFilenameMatcher;
+from pymfony.component.config.resource import GlobFilenameMatcher;
+from pymfony.component.config.resource import ExtensionFilenameMatcher;
 
 """
 """
@@ -186,5 +190,121 @@ class DirectoryResourceTest(unittest.TestCase):
         self._touch(self._directory+'/new.xml', time() + 20);
         self.assertFalse(resource.isFresh(time() + 10), '->isFresh() returns False if an new file matching the filter regex is created ');
 
+    def testFilterMatchers(self):
+
+        for matcher in [
+            RegexFilenameMatcher('\\.(foo|xml)$'),
+            GlobFilenameMatcher('*.xml'),
+            ExtensionFilenameMatcher(['.foo', '.xml']),
+        ]:
+            self._touch(self._directory+'/new.bar', time() + 20);
+            resource = DirectoryResource(self._directory, matcher);
+            self.assertTrue(resource.isFresh(time() + 10), '->isFresh() returns True if a new file not matching the matcher is created');
+
+            resource = self._serializeAndUnserialize(resource);
+            self.assertEqual(matcher, resource.getMatcher(), '->unserialize() restores the matcher');
+            self.assertTrue(resource.isFresh(time() + 10));
+
+            self._touch(self._directory+'/new.xml', time() + 20);
+            self.assertFalse(resource.isFresh(time() + 10), '->isFresh() returns False if a new file matching the matcher is created');
+
+            os.unlink(self._directory+'/new.bar');
+            os.unlink(self._directory+'/new.xml');
+            self._touch(self._directory, time() - 100);
+
+
+    def testGlobMatcherMatchesTheWholeName(self):
+
+        self.assertTrue(GlobFilenameMatcher('config.yml').match('config.yml'));
+        self.assertFalse(GlobFilenameMatcher('config.yml').match('myconfig.yml'), '->match() does not match a name ending with the pattern');
+        self.assertTrue(GlobFilenameMatcher('foo*.xml').match('foo1.xml'));
+        self.assertFalse(GlobFilenameMatcher('foo*.xml').match('barfoo1.xml'), '->match() does not match a name containing the pattern');
+
+
+    def testGetPatternAlwaysReturnsARegularExpression(self):
+
+        for matcher in [
+            RegexFilenameMatcher('\\.(foo|xml)$'),
+            GlobFilenameMatcher('*.xml'),
+            ExtensionFilenameMatcher(['.foo', '.xml']),
+            ExtensionFilenameMatcher([]),
+        ]:
+            pattern = DirectoryResource(self._directory, matcher).getPattern();
+            self.assertTrue(isinstance(pattern, str), '->getPattern() returns a string whatever the matcher');
+            for name in ['new.xml', 'new.foo', 'new.bar', 'xml', 'new.xml.bak']:
+                self.assertEqual(matcher.match(name), re.search(pattern, name) is not None, '->getPattern() searches the names matched by the matcher');
+
+        self.assertEqual(None, DirectoryResource(self._directory).getPattern());
+
+
+    def testPatternIsCompiledOnce(self):
+
+        resource = DirectoryResource(self._directory, '\\.xml$');
+        self.assertEqual(RegexFilenameMatcher('\\.xml$'), resource.getMatcher());
+        self.assertEqual('\\.xml$', self._serializeAndUnserialize(resource).getPattern());
+
+
+    def testSnapshot(self):
+
+        resource = DirectoryResource(self._directory, '\.xml$');
+        self.assertTrue(resource.getSnapshot() is None);
+
+        os.mkdir(self._directory+'/subdirectory');
+        self._touch(self._directory+'/subdirectory/foo.xml', time() - 100);
+        self._touch(self._directory+'/subdirectory/foo.bar', time() - 100);
+
+        resource = self._serializeAndUnserialize(resource);
+        newestMTime, directories, files = resource.getSnapshot();
+        self.assertEqual(['', 'subdirectory'], [d[0] for d in directories]);
+        self.assertEqual(['subdirectory/foo.xml', 'tmp.xml'], [f[0] for f in files], '->serialize() records the files matching the pattern');
+
+        self.assertTrue(resource.isFresh(time() + 10), '->isFresh() returns True if the snapshot matches');
+        self.assertFalse(resource.isFresh(time() - 86400), '->isFresh() returns False if the resource has been updated');
+
+        self._touch(self._directory+'/subdirectory/foo.bar', time() - 200);
+        self.assertTrue(resource.isFresh(time() + 10), '->isFresh() ignores the files not matching the pattern');
+
+        self._touch(self._directory+'/subdirectory/foo.xml', time() - 200);
+        self.assertFalse(resource.isFresh(time() + 10), '->isFresh() returns False if a file differs from the snapshot');
+
+
+    def testSnapshotNewFileInSubdirectory(self):
+
+        os.mkdir(self._directory+'/subdirectory');
+        resource = self._serializeAndUnserialize(DirectoryResource(self._directory));
+
+        open(self._directory+'/subdirectory/new.xml', 'a').close();
+        self._touch(self._directory+'/subdirectory', time() - 100);
+        self.assertFalse(resource.isFresh(time() + 10), '->isFresh() returns False if a directory differs from the snapshot');
+
+
+    def testSnapshotWithDigest(self):
+
+        os.mkdir(self._directory+'/subdirectory');
+        f = open(self._directory+'/subdirectory/foo.xml', 'w');
+        f.write('foo');
+        f.close();
+
+        resource = self._serializeAndUnserialize(DirectoryResource(self._directory, None, True));
+        self.assertTrue(resource.usesDigest());
+
+        for path in ['/tmp.xml', '/subdirectory/foo.xml', '/subdirectory', '']:
+            self._touch(self._directory+path, time() + 20);
+        self.assertTrue(resource.isFresh(time() + 10), '->isFresh() returns True if only the mtimes have changed');
+
+        f = open(self._directory+'/subdirectory/foo.xml', 'w');
+        f.write('bar');
+        f.close();
+        self.assertFalse(resource.isFresh(time() + 10), '->isFresh() returns False if a content has changed');
+
+
+    def _serializeAndUnserialize(self, resource):
+
+        serialized = resource.serialize();
+        resource = DirectoryResource(None);
+        resource.unserialize(serialized);
+
+        return resource;
+
 if __name__ == '__main__':
     unittest.main();
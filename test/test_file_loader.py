@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import unittest;
+import tempfile;
+import os;
+import shutil;
+import threading;
+import json;
+
+from pymfony.component.system.types import String;
+
+from pymfony.component.config import FileLocator;
+from pymfony.component.config.loader import FileLoader;
+from pymfony.component.config.loader import LoaderResolver;
+from pymfony.component.config.loader import ImportGraph;
+from pymfony.component.config.loader import DocumentCache;
+from pymfony.component.config.exception import FileLoaderImportCircularReferenceException;
+from pymfony.component.config.definition import Processor;
+from pymfony.component.config.definition import CachingProcessor;
+from pymfony.component.config.definition import IncrementalProcessor;
+from pymfony.component.config.definition.builder import TreeBuilder;
+
+"""
+"""
+
+
+class FileLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        for name, imports in [
+            ('a.txt', ['b.txt', 'c.txt']),
+            ('b.txt', ['d.txt']),
+            ('c.txt', ['d.txt']),
+            ('d.txt', []),
+            ('e.txt', ['f.txt']),
+            ('f.txt', ['e.txt']),
+        ]:
+            f = open(self._directory+'/'+name, 'w');
+            f.write('\n'.join(imports));
+            f.close();
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def _createLoader(self, executor = None):
+
+        loader = TextFileLoader(FileLocator(self._directory), executor);
+        LoaderResolver([loader]);
+        loader.setCurrentDir(self._directory);
+
+        return loader;
+
+
+    def testImports(self):
+
+        loader = self._createLoader();
+
+        self.assertEqual(
+            ['a.txt', [['b.txt', [['d.txt', []]]], ['c.txt', [['d.txt', []]]]]],
+            loader.imports('a.txt'),
+            '->imports() loads a resource imported by several chains'
+        );
+
+        for i in range(2):
+            try:
+                loader.imports('e.txt');
+                self.fail('->imports() detects circular references');
+            except FileLoaderImportCircularReferenceException:
+                pass;
+
+        self.assertEqual((), loader._getImportChain(), '->imports() leaves the import chain once done');
+        self.assertEqual({}, loader._loading);
+
+
+    def testLoadingFollowsTheImportChain(self):
+
+        chains = [];
+
+        class ChainLoader(TextFileLoader):
+            def load(self, resource, resourceType = None):
+                chains.append(list(self._loading.keys()));
+                return TextFileLoader.load(self, resource, resourceType);
+
+        loader = ChainLoader(FileLocator(self._directory));
+        LoaderResolver([loader]);
+        loader.setCurrentDir(self._directory);
+        loader.imports('b.txt');
+
+        self.assertEqual([[self._directory+'/b.txt'], [self._directory+'/b.txt', self._directory+'/d.txt']], chains, '->_loading holds the resources of the current import chain');
+
+        if not isinstance(loader._loading, dict):
+            try:
+                loader._loading[self._directory+'/b.txt'] = True;
+                self.fail('->_loading is read-only');
+            except TypeError:
+                pass;
+
+
+    def testImportManyWithAnExecutor(self):
+
+        try:
+            from concurrent.futures import ThreadPoolExecutor;
+        except ImportError:
+            self.skipTest('The concurrent.futures module is not available.');
+
+        executor = ThreadPoolExecutor(2);
+        try:
+            loader = self._createLoader(executor);
+
+            self.assertEqual(
+                [
+                    ['a.txt', [['b.txt', [['d.txt', []]]], ['c.txt', [['d.txt', []]]]]],
+                    ['d.txt', []],
+                ],
+                loader.importMany(['a.txt', 'd.txt']),
+                '->importMany() returns the results in the order of the resources'
+            );
+
+            self.assertRaises(
+                FileLoaderImportCircularReferenceException,
+                loader.importMany, ['d.txt', 'e.txt']
+            );
+        finally:
+            executor.shutdown();
+
+
+    def testCurrentDirIsSharedByTheThreads(self):
+
+        loader = self._createLoader();
+        results = [];
+
+        thread = threading.Thread(target=lambda: results.append(loader.imports('d.txt')));
+        thread.start();
+        thread.join();
+
+        self.assertEqual([['d.txt', []]], results, '->setCurrentDir() applies to the imports of every thread');
+
+
+    def testImportGraph(self):
+
+        loader = self._createLoader();
+        loader.setImportGraph(ImportGraph(True));
+        result = loader.imports('a.txt');
+
+        graph = loader.getImportGraph();
+        self.assertEqual([self._directory+'/'+name for name in ['b.txt', 'c.txt']], graph.getChildren(self._directory+'/a.txt'));
+        self.assertEqual(__name__+'.TextFileLoader', graph.getLoaderClass(self._directory+'/a.txt'));
+
+        filename = ImportGraph.getFilename(self._directory+'/cache/config.py');
+        graph.save(filename);
+        self.assertTrue(ImportGraph.load(filename).isFresh());
+
+        f = open(self._directory+'/c.txt', 'a');
+        f.write('\n');
+        f.close();
+
+        graph = ImportGraph.load(filename, True);
+        self.assertEqual(
+            set([self._directory+'/a.txt', self._directory+'/c.txt']),
+            graph.invalidate(),
+            '->invalidate() finds the changed files and their importers'
+        );
+
+        loader = self._createLoader();
+        loader.setImportGraph(graph);
+        self.assertEqual(result, loader.imports('a.txt'));
+        self.assertEqual(['a.txt', 'c.txt'], loader.loaded, '->imports() only loads the stale files again');
+        self.assertTrue(graph.isFresh());
+
+
+    def testImportGraphRecordsTheRootFile(self):
+
+        loader = self._createLoader();
+        loader.setImportGraph(ImportGraph(True));
+        loader.load(self._directory+'/a.txt');
+
+        graph = loader.getImportGraph();
+        self.assertEqual([self._directory+'/'+name for name in ['b.txt', 'c.txt']], graph.getChildren(self._directory+'/a.txt'), '->load() records the root file on its first import');
+
+        filename = ImportGraph.getFilename(self._directory+'/cache/config.py');
+        graph.save(filename);
+
+        f = open(self._directory+'/a.txt', 'a');
+        f.write('\n');
+        f.close();
+
+        graph = ImportGraph.load(filename, True);
+        self.assertFalse(graph.isFresh());
+        self.assertTrue(graph.isStale(self._directory+'/a.txt'), '->invalidate() finds the changed root file');
+
+        loader = self._createLoader();
+        loader.setImportGraph(graph);
+        loader.load(self._directory+'/a.txt');
+        self.assertEqual(['a.txt'], loader.loaded, '->imports() only loads the stale files again');
+        self.assertTrue(graph.isFresh());
+        self.assertEqual([self._directory+'/'+name for name in ['b.txt', 'c.txt']], graph.getChildren(self._directory+'/a.txt'));
+
+
+    def testDocumentCache(self):
+
+        for immutable in [False, True]:
+            loader = self._createLoader();
+            loader.setDocumentCache(DocumentCache(2, immutable));
+
+            self.assertEqual(
+                ['a.txt', [['b.txt', [['d.txt', []]]], ['c.txt', [['d.txt', []]]]]],
+                loader.imports('a.txt')
+            );
+            self.assertEqual(
+                {'hits': 1, 'misses': 4, 'size': 2, 'maxSize': 2},
+                loader.getDocumentCache().getStats(),
+                '->imports() parses a file imported several times once'
+            );
+
+            document = loader._getDocument(self._directory+'/c.txt', loader.parse);
+            if immutable:
+                self.assertEqual(('d.txt',), document);
+            else:
+                document.append('foo');
+                self.assertEqual(['d.txt'], loader._getDocument(self._directory+'/c.txt', loader.parse), '->_getDocument() returns a copy of the document');
+
+
+    def testFreeze(self):
+
+        document = DocumentCache.freeze({'foo': [1, {'bar': set([2])}]});
+        self.assertEqual((1, {'bar': frozenset([2])}), document['foo']);
+
+        try:
+            from types import MappingProxyType;
+        except ImportError:
+            self.skipTest('The types.MappingProxyType class is not available.');
+
+        try:
+            document['foo'] = 'bar';
+            self.fail('::freeze() returns read-only mappings');
+        except TypeError:
+            pass;
+
+
+    def testFrozenDocumentsAreProcessed(self):
+
+        tree = self.__createTree();
+        documents = DocumentCache(2, True);
+
+        self.assertEqual(
+            {'name': 'foo', 'connections': {'default': {'host_name': 'localhost'}}, 'hosts': {0: 'a', 1: 'b', 2: 'a', 3: 'b'}, 'options': {'tags': ['x', 'y'], 'retry': {'count': 2}}},
+            Processor().process(tree, [self.__getDocument(documents), self.__getDocument(documents)]),
+            '->process() accepts the frozen documents'
+        );
+        self.assertEqual(
+            DocumentCache.freeze(self.__parse(self._directory+'/config.json')),
+            self.__getDocument(documents),
+            '->process() does not alter the frozen documents'
+        );
+
+        options = Processor().process(tree, [self.__getDocument(documents)])['options'];
+        self.assertTrue(type(options) is dict, '->process() thaws the values of the variable nodes');
+        self.assertTrue(type(options['tags']) is list, '->process() thaws the values of the variable nodes');
+        self.assertTrue(type(options['retry']) is dict, '->process() thaws the values of the variable nodes');
+
+    def testFrozenDocumentsAreProcessedByTheCachingProcessor(self):
+
+        tree = self.__createTree();
+        documents = DocumentCache(2, True);
+        processor = CachingProcessor();
+
+        expected = {'name': 'foo', 'connections': {'default': {'host_name': 'localhost'}}, 'hosts': {0: 'a', 1: 'b'}, 'options': {'tags': ['x', 'y'], 'retry': {'count': 2}}};
+        self.assertEqual(expected, processor.process(tree, [self.__getDocument(documents)]));
+        self.assertEqual(expected, processor.process(tree, [self.__getDocument(documents)]));
+        self.assertTrue(
+            CachingProcessor.hashConfigs([self.__getDocument(documents)]) is not None,
+            '::hashConfigs() hashes the frozen documents'
+        );
+        self.assertEqual(1, processor.getStats()['hits'], '->process() caches the frozen documents');
+
+        options = processor.process(tree, [self.__getDocument(documents)])['options'];
+        self.assertTrue(type(options['tags']) is list, '->process() thaws the values of the variable nodes');
+
+    def testFrozenDocumentsAreProcessedByTheIncrementalProcessor(self):
+
+        documents = DocumentCache(2, True);
+        expected = {'name': 'foo', 'connections': {'default': {'host_name': 'localhost'}}, 'hosts': {0: 'a', 1: 'b'}, 'options': {'tags': ['x', 'y'], 'retry': {'count': 2}}};
+
+        for trackDirty in (False, True):
+            processor = IncrementalProcessor(self.__createTree(), trackDirty=trackDirty);
+            self.assertEqual(expected, processor.process([self.__getDocument(documents)]));
+
+            config = self.__parse(self._directory+'/config.json');
+            config['name'] = 'bar';
+            result = processor.update(0, DocumentCache.freeze(config));
+            self.assertEqual('bar', result['name'], '->update() accepts the frozen documents');
+            self.assertTrue(type(result['options']['tags']) is list, '->update() thaws the values of the variable nodes');
+
+    def __createTree(self):
+
+        f = open(self._directory+'/config.json', 'w');
+        f.write(json.dumps({
+            'name': 'foo',
+            'connections': [{'id': 'default', 'host_name': 'localhost'}],
+            'hosts': ['a', 'b'],
+            'options': {'tags': ['x', 'y'], 'retry': {'count': 2}},
+        }));
+        f.close();
+
+        tb = TreeBuilder();
+        tree = tb
+        tree =     tree.root('root', 'array')
+        tree =         tree.children()
+        tree =             tree.scalarNode('name').end()
+        tree =             tree.arrayNode('connections')
+        tree =                 tree.useAttributeAsKey('id')
+        tree =                 tree.prototype('array')
+        tree =                     tree.children()
+        tree =                         tree.scalarNode('host_name').end()
+        tree =                     tree.end()
+        tree =                 tree.end()
+        tree =             tree.end()
+        tree =             tree.arrayNode('hosts')
+        tree =                 tree.prototype('scalar').end()
+        tree =             tree.end()
+        tree =             tree.variableNode('options').end()
+        tree =         tree.end()
+        tree =     tree.end()
+        tree =     tree.buildTree();
+
+        return tree;
+
+    def __getDocument(self, documents):
+
+        return documents.get(self._directory+'/config.json', self.__parse);
+
+    def __parse(self, path):
+
+        f = open(path);
+        try:
+            return json.load(f);
+        finally:
+            f.close();
+
+
+class TextFileLoader(FileLoader):
+
+    def __init__(self, locator, executor = None):
+
+        FileLoader.__init__(self, locator, executor);
+        self.loaded = [];
+
+
+    def load(self, resource, resourceType = None):
+
+        self.loaded.append(os.path.basename(resource));
+        self.setCurrentDir(os.path.dirname(resource));
+
+        imports = self._getDocument(resource, self.parse);
+
+        return [
+            os.path.basename(resource),
+            self.importMany(imports, None, False, resource)
+        ];
+
+
+    def supports(self, resource, resourceType = None):
+
+        return isinstance(resource, String) and resource.endswith('.txt');
+
+
+    def parse(self, path):
+
+        f = open(path);
+        imports = [line.strip() for line in f if line.strip()];
+        f.close();
+
+        return imports;
+
+if __name__ == '__main__':
+    unittest.main();
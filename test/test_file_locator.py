@@ -10,8 +10,13 @@ from __future__ import absolute_import;
 
 import unittest;
 import os;
+import shutil;
+import tempfile;
 
 from pymfony.component.config import FileLocator;
+from pymfony.component.config import CachedFileLocator;
+from pymfony.component.config import DirectoryIndex;
+from pymfony.component.config.watcher import PollingResourceWatcher;
 from pymfony.component.system.exception import InvalidArgumentException
 
 """
@@ -91,6 +96,102 @@ class FileLocatorTest(unittest.TestCase):
         );
 
 
+    def testLocateWithAnIndex(self):
+
+        loader = FileLocator([__DIR__+'/Fixtures', __DIR__+'/Fixtures/Again'], True);
+
+        self.assertEqual(
+            __DIR__+'/Fixtures'+os.path.sep+'foo.xml',
+            loader.locate('foo.xml', __DIR__)
+        );
+        self.assertEqual(
+            [__DIR__+'/Fixtures'+os.path.sep+'foo.xml', __DIR__+'/Fixtures/Again'+os.path.sep+'foo.xml'],
+            loader.locate('foo.xml', __DIR__, False)
+        );
+        self.assertRaises(InvalidArgumentException, loader.locate, 'foobar.xml', __DIR__);
+
+
+    def testLocateMany(self):
+
+        for index in [False, True]:
+            loader = FileLocator([__DIR__+'/Fixtures', __DIR__+'/Fixtures/Again'], index);
+
+            located, errors = loader.locateMany(
+                ['foobar.xml', 'foo.xml', __DIR__+'/Fixtures/foo.xml', 'foo.xml', __DIR__+'/foobar.xml'],
+                __DIR__
+            );
+            self.assertEqual(
+                [('foo.xml', loader.locate('foo.xml', __DIR__)), (__DIR__+'/Fixtures/foo.xml', __DIR__+'/Fixtures/foo.xml')],
+                list(located.items()),
+                '->locateMany() returns the located files in the order of the names'
+            );
+            self.assertEqual(['foobar.xml', __DIR__+'/foobar.xml'], list(errors.keys()));
+            for error in errors.values():
+                self.assertTrue(isinstance(error, InvalidArgumentException));
+
+            located, errors = loader.locateMany(['foo.xml'], __DIR__, False);
+            self.assertEqual(loader.locate('foo.xml', __DIR__, False), located['foo.xml']);
+
+
+    def testDirectoryIndexRefreshesChangedDirectories(self):
+
+        directory = os.path.realpath(tempfile.mkdtemp());
+        try:
+            index = DirectoryIndex(0);
+            self.assertFalse(index.contains(directory, 'foo.xml'));
+
+            open(directory+'/foo.xml', 'a').close();
+            os.utime(directory, (0, 0));
+            self.assertTrue(index.contains(directory, 'foo.xml'), '->contains() lists a directory again once its mtime changed');
+            self.assertFalse(index.contains(directory+'/missing', 'foo.xml'));
+        finally:
+            shutil.rmtree(directory, ignore_errors=True);
+
+
+    def testDirectoryIndexRelistsRecentlyChangedDirectories(self):
+
+        directory = os.path.realpath(tempfile.mkdtemp());
+        try:
+            index = DirectoryIndex(0);
+            mtime = os.stat(directory).st_mtime;
+            self.assertFalse(index.contains(directory, 'foo.xml'));
+
+            open(directory+'/foo.xml', 'a').close();
+            os.utime(directory, (mtime, mtime));
+            self.assertTrue(index.contains(directory, 'foo.xml'), '->contains() lists a directory again when its mtime is close to the last listing');
+        finally:
+            shutil.rmtree(directory, ignore_errors=True);
+
+
+    def testDirectoryIndexChecksTheOtherNames(self):
+
+        directory = os.path.realpath(tempfile.mkdtemp());
+        try:
+            index = DirectoryIndex();
+            self.assertTrue(index.contains(directory, '.'));
+            self.assertTrue(index.contains(directory, '..'));
+            self.assertFalse(index.contains(directory, 'missing/..'));
+        finally:
+            shutil.rmtree(directory, ignore_errors=True);
+
+
+    def testDirectoryIndexDropsTheLeastRecentlyCheckedListings(self):
+
+        directory = os.path.realpath(tempfile.mkdtemp());
+        try:
+            os.mkdir(directory+'/a');
+            os.mkdir(directory+'/b');
+            index = DirectoryIndex(float('inf'), 0, 1);
+            self.assertFalse(index.contains(directory+'/a', 'foo.xml'));
+
+            open(directory+'/a/foo.xml', 'a').close();
+            self.assertFalse(index.contains(directory+'/a', 'foo.xml'));
+            self.assertFalse(index.contains(directory+'/b', 'foo.xml'));
+            self.assertTrue(index.contains(directory+'/a', 'foo.xml'), '->contains() lists a dropped directory again');
+        finally:
+            shutil.rmtree(directory, ignore_errors=True);
+
+
     def testLocateThrowsAnExceptionIfTheFileDoesNotExists(self):
         """@expectedException InvalidArgumentException
 
@@ -122,5 +223,102 @@ class FileLocatorTest(unittest.TestCase):
             self.assertTrue(isinstance(e, InvalidArgumentException));
 
 
+
+class CachedFileLocatorTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def testLocate(self):
+
+        loader = CachedFileLocator([__DIR__+'/Fixtures', __DIR__+'/Fixtures/Again']);
+
+        for i in range(2):
+            self.assertEqual(
+                __DIR__+'/Fixtures'+os.path.sep+'foo.xml',
+                loader.locate('foo.xml', __DIR__)
+            );
+            self.assertEqual(
+                [__DIR__+'/Fixtures'+os.path.sep+'foo.xml', __DIR__+'/Fixtures/Again'+os.path.sep+'foo.xml'],
+                loader.locate('foo.xml', __DIR__, False)
+            );
+
+        self.assertEqual({'hits': 2, 'misses': 2, 'size': 2, 'maxSize': 1024}, loader.getStats());
+
+
+    def testLocateRemembersMissingFiles(self):
+
+        loader = CachedFileLocator(self._directory);
+
+        for i in range(2):
+            try:
+                loader.locate('foo.xml');
+                self.fail('->locate() throws an exception if the file does not exist');
+            except Exception as e:
+                self.assertTrue(isinstance(e, InvalidArgumentException));
+
+        self.assertEqual(1, loader.getStats()['hits']);
+
+        open(self._directory+'/foo.xml', 'a').close();
+        self.assertRaises(InvalidArgumentException, loader.locate, 'foo.xml');
+
+        loader.clear();
+        self.assertEqual(self._directory+os.path.sep+'foo.xml', loader.locate('foo.xml'));
+
+
+    def testLocateMany(self):
+
+        loader = CachedFileLocator([__DIR__+'/Fixtures']);
+        loader.locate('foo.xml');
+
+        located, errors = loader.locateMany(['foo.xml', 'foobar.xml', 'foo.xml']);
+        self.assertEqual([__DIR__+'/Fixtures'+os.path.sep+'foo.xml'], list(located.values()));
+        self.assertEqual(['foobar.xml'], list(errors.keys()));
+        self.assertEqual({'hits': 1, 'misses': 2, 'size': 2, 'maxSize': 1024}, loader.getStats());
+
+        self.assertRaises(InvalidArgumentException, loader.locate, 'foobar.xml');
+        self.assertEqual(2, loader.getStats()['hits'], '->locateMany() remembers the located files');
+
+
+    def testLocateWithATimeToLive(self):
+
+        loader = CachedFileLocator(self._directory, ttl=0);
+        self.assertRaises(InvalidArgumentException, loader.locate, 'foo.xml');
+
+        open(self._directory+'/foo.xml', 'a').close();
+        self.assertEqual(self._directory+os.path.sep+'foo.xml', loader.locate('foo.xml'), '->locate() locates the file again once the entry expired');
+
+
+    def testLocateWithAWatcher(self):
+
+        loader = CachedFileLocator(self._directory, watcher=PollingResourceWatcher(0));
+        self.assertRaises(InvalidArgumentException, loader.locate, 'foo.xml');
+
+        open(self._directory+'/foo.xml', 'a').close();
+        self.assertEqual(self._directory+os.path.sep+'foo.xml', loader.locate('foo.xml'), '->locate() locates the file again once the watcher reports a change');
+
+
+    def testLocateEvictsTheLeastRecentlyUsedEntries(self):
+
+        watcher = PollingResourceWatcher(0);
+        loader = CachedFileLocator(self._directory, watcher=watcher, maxSize=2);
+        for name in ['a.xml', 'b.xml', 'a.xml', 'c.xml']:
+            self.assertRaises(InvalidArgumentException, loader.locate, name);
+
+        self.assertEqual({'hits': 1, 'misses': 3, 'size': 2, 'maxSize': 2}, loader.getStats());
+
+        keys = [('CachedFileLocator', id(loader), name, None, True) for name in ['a.xml', 'b.xml', 'c.xml']];
+        self.assertEqual([True, False, True], [watcher.isWatched(key) for key in keys], '->locate() stops watching the candidates of the evicted entries');
+
+        self.assertRaises(InvalidArgumentException, loader.locate, 'a.xml');
+        self.assertEqual(2, loader.getStats()['hits']);
+
 if __name__ == '__main__':
     unittest.main();
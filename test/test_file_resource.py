@@ -57,5 +57,26 @@ class FileResourceTest(unittest.TestCase):
         resource = FileResource('/____foo/foobar'+str(rand(1, 999999)));
         self.assertFalse(resource.isFresh(time()), '->isFresh() returns False if the resource does not exist');
 
+
+    def testIsFreshWithDigest(self):
+
+        f = open(self._file, 'w');
+        f.write('foo');
+        f.close();
+        os.utime(self._file, (time() - 100, time() - 100));
+
+        resource = FileResource(None);
+        resource.unserialize(FileResource(self._file, True).serialize());
+        self.assertTrue(resource.usesDigest());
+
+        os.utime(self._file, (time() + 20, time() + 20));
+        self.assertTrue(resource.isFresh(time() + 10), '->isFresh() returns True if only the mtime has changed');
+
+        f = open(self._file, 'w');
+        f.write('bar');
+        f.close();
+        os.utime(self._file, (time() - 50, time() - 50));
+        self.assertFalse(resource.isFresh(time() + 10), '->isFresh() returns False if the content has changed');
+
 if __name__ == '__main__':
     unittest.main();
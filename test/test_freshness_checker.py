@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import unittest;
+import tempfile;
+import os;
+import shutil;
+from time import time;
+
+from pymfony.component.config.resource import FileResource;
+from pymfony.component.config.resource import DirectoryResource;
+from pymfony.component.config.resource import FreshnessChecker;
+
+"""
+"""
+
+
+class FreshnessCheckerTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        os.mkdir(self._directory+'/subdirectory');
+        self._touch(self._directory+'/foo.xml');
+        self._touch(self._directory+'/subdirectory/bar.xml');
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def _touch(self, path, mtime = None):
+        if mtime is None:
+            mtime = time();
+        open(path, 'a').close();
+        os.utime(path, (mtime, mtime));
+
+
+    def testIsFresh(self):
+
+        resources = [
+            FileResource(self._directory+'/foo.xml'),
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory),
+            DirectoryResource(self._directory+'/subdirectory'),
+        ];
+
+        checker = FreshnessChecker();
+        self.assertTrue(checker.isFresh(resources, time() + 10));
+        self.assertEqual(
+            {'stat': 4, 'listdir': 3, 'paths': 4},
+            checker.getStats(),
+            '->isFresh() stats every path once'
+        );
+
+        self.assertFalse(FreshnessChecker().isFresh(resources, time() - 86400));
+
+
+    def testIsFreshStopsOnFirstStaleResource(self):
+
+        self._touch(self._directory+'/foo.xml', time() + 20);
+
+        resources = [
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory),
+        ];
+
+        checker = FreshnessChecker();
+        self.assertFalse(checker.isFresh(resources, time() + 10));
+        self.assertEqual({'stat': 1, 'listdir': 0, 'paths': 1}, checker.getStats());
+
+
+    def testIsFreshMatchesResources(self):
+
+        timestamp = time() + 10;
+        for path, mtime in [
+            ('/subdirectory/bar.xml', time() + 20),
+            ('/subdirectory/new.bar', time() + 20),
+            ('/new.xml', time() + 20),
+        ]:
+            self._touch(self._directory+path, mtime);
+
+            for resource in [
+                FileResource(self._directory+'/foo.xml'),
+                FileResource(self._directory+'/missing.xml'),
+                DirectoryResource(self._directory),
+                DirectoryResource(self._directory, r'\.xml$'),
+            ]:
+                self.assertEqual(
+                    resource.isFresh(timestamp),
+                    FreshnessChecker().isFresh([resource], timestamp)
+                );
+
+    def testIsFreshWithAnExecutor(self):
+
+        try:
+            from concurrent.futures import ThreadPoolExecutor;
+        except ImportError:
+            self.skipTest('The concurrent.futures module is not available.');
+
+        resources = [
+            FileResource(self._directory+'/foo.xml'),
+            DirectoryResource(self._directory),
+            DirectoryResource(self._directory+'/subdirectory'),
+        ];
+
+        executor = ThreadPoolExecutor(2);
+        try:
+            self.assertTrue(FreshnessChecker(executor).isFresh(resources, time() + 10));
+            self.assertFalse(FreshnessChecker(executor).isFresh(resources, time() - 86400));
+
+            self._touch(self._directory+'/subdirectory/bar.xml', time() + 20);
+            self.assertFalse(FreshnessChecker(executor).isFresh(resources, time() + 10));
+        finally:
+            executor.shutdown();
+
+if __name__ == '__main__':
+    unittest.main();
@@ -12,6 +12,7 @@ import unittest;
 
 from pymfony.component.config.loader import LoaderResolver;
 from pymfony.component.config.loader import LoaderInterface
+from pymfony.component.config.loader import LoaderCapabilitiesInterface;
 
 """
 """
@@ -61,6 +62,52 @@ class LoaderResolverTest(unittest.TestCase):
 
         self.assertEqual([loader], resolver.getLoaders(), 'addLoader() adds a loader');
 
+    def testResolveIndexesLoaderCapabilities(self):
+
+        yaml = CapableLoaderMock(['yml'], ['yaml']);
+        xml = CapableLoaderMock(['xml'], []);
+        dynamic = LoaderInterfaceMock1();
+        resolver = LoaderResolver([yaml, xml, dynamic]);
+
+        self.assertEqual(xml, resolver.resolve('foo.xml'));
+        self.assertEqual(yaml, resolver.resolve('foo.yml'));
+        self.assertEqual(yaml, resolver.resolve('foo', 'yaml'));
+        self.assertEqual(xml, resolver.resolve('bar.xml'));
+        self.assertFalse(resolver.resolve('foo.ini'));
+        self.assertEqual((2, 2), (xml.calls, yaml.calls), '->resolve() only calls supports() on the loaders declaring the extension or the type');
+
+        other = LoaderInterfaceMock2();
+        resolver.addLoader(other);
+        self.assertEqual(other, resolver.resolve('foo.ini'), '->addLoader() resets the index');
+
+    def testResolveComparesTheExtensionsCaseInsensitively(self):
+
+        yaml = CapableLoaderMock(['yml'], []);
+        xml = CapableLoaderMock(['XML'], []);
+        resolver = LoaderResolver([yaml, xml]);
+
+        self.assertEqual(yaml, resolver.resolve('FOO.YML'));
+        self.assertEqual(xml, resolver.resolve('foo.xml'));
+
+class CapableLoaderMock(LoaderInterface, LoaderCapabilitiesInterface):
+    def __init__(self, extensions, types):
+        self.extensions = extensions;
+        self.types = types;
+        self.calls = 0;
+    def getSupportedExtensions(self):
+        return self.extensions;
+    def getSupportedTypes(self):
+        return self.types;
+    def getResolver(self):
+        pass;
+    def load(self, resource, resourceType=None):
+        pass;
+    def setResolver(self, resolver):
+        pass;
+    def supports(self, resource, resourceType=None):
+        self.calls += 1;
+        return resourceType in self.types or resource.split('.')[-1].lower() in [e.lower() for e in self.extensions];
+
 class LoaderInterfaceMock1(LoaderInterface):
     def getResolver(self):
         pass;
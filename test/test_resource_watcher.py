@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import unittest;
+import tempfile;
+import os;
+import shutil;
+import threading;
+from time import time;
+
+from pymfony.component.config.resource import FileResource;
+from pymfony.component.config.resource import DirectoryResource;
+from pymfony.component.config.watcher import PollingResourceWatcher;
+from pymfony.component.config.watcher import InotifyResourceWatcher;
+from pymfony.component.config.watcher import ResourceWatcherFactory;
+from pymfony.component.config.watcher import ResourceWatcherInterface;
+
+"""
+"""
+
+
+class PollingResourceWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        os.mkdir(self._directory+'/subdirectory');
+        open(self._directory+'/foo.xml', 'w').close();
+        self._touch(self._directory+'/foo.xml', time() - 100);
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def _touch(self, path, mtime):
+
+        if not os.path.isdir(path):
+            open(path, 'a').close();
+        os.utime(path, (mtime, mtime));
+
+
+    def testIsDirty(self):
+
+        watcher = PollingResourceWatcher(3600);
+        self.assertFalse(watcher.isWatched('foo'));
+        self.assertTrue(watcher.isDirty('foo'), '->isDirty() returns True for unknown keys');
+
+        watcher.watch('foo', [FileResource(self._directory+'/foo.xml')]);
+        self.assertTrue(watcher.isWatched('foo'));
+        self._touch(self._directory+'/foo.xml', time() - 50);
+        self.assertFalse(watcher.isDirty('foo'), '->isDirty() does not poll the resources during the interval');
+
+        watcher = PollingResourceWatcher(0);
+        watcher.watch('foo', [FileResource(self._directory+'/foo.xml')]);
+        self.assertFalse(watcher.isDirty('foo'), '->isDirty() returns False if the resources did not change');
+
+        self._touch(self._directory+'/foo.xml', time() - 10);
+        self.assertTrue(watcher.isDirty('foo'), '->isDirty() returns True once a resource changed');
+
+        watcher.unwatch('foo');
+        self.assertFalse(watcher.isWatched('foo'));
+
+
+    def testDirectoryResource(self):
+
+        watcher = PollingResourceWatcher(0);
+        watcher.watch('foo', [DirectoryResource(self._directory)]);
+        self.assertFalse(watcher.isDirty('foo'));
+
+        self._touch(self._directory+'/subdirectory/new.xml', time() - 100);
+        self._touch(self._directory+'/subdirectory', time() - 100);
+        self.assertTrue(watcher.isDirty('foo'), '->isDirty() returns True once a file is added to the tree');
+
+
+    def testResourcesArePolledOutsideOfTheLock(self):
+
+        watcher = PollingResourceWatcher(0);
+        polls = [];
+
+        class UnwatchingResource(object):
+            def isFresh(self, timestamp):
+                polls.append(timestamp);
+                if len(polls) > 1:
+                    watcher.unwatch('foo');
+                return True;
+
+        watcher.watch('foo', [UnwatchingResource()]);
+        self.assertTrue(watcher.isDirty('foo'), '->isDirty() returns True once the key has been unwatched during the poll');
+        self.assertEqual(2, len(polls));
+        self.assertFalse(watcher.isWatched('foo'));
+
+
+    def testConcurrentAccess(self):
+
+        watcher = PollingResourceWatcher(0);
+        errors = [];
+
+        def run(index):
+            try:
+                for i in range(50):
+                    key = 'key{0}'.format((index + i) % 4);
+                    watcher.watch(key, [FileResource(self._directory+'/foo.xml'), DirectoryResource(self._directory)]);
+                    watcher.isDirty(key);
+                    watcher.isWatched(key);
+                    open(self._directory+'/bar.xml', 'w').close();
+                    watcher.unwatch(key);
+            except Exception as e:
+                errors.append(e);
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(4)];
+        for thread in threads:
+            thread.start();
+        for thread in threads:
+            thread.join();
+
+        self.assertEqual([], errors, '->watch(), ->isDirty() and ->unwatch() may be called from several threads');
+
+
+class InotifyResourceWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self._directory = os.path.realpath(tempfile.mkdtemp());
+        os.mkdir(self._directory+'/subdirectory');
+        open(self._directory+'/foo.xml', 'w').close();
+        open(self._directory+'/bar.xml', 'w').close();
+
+        self._watcher = None;
+        if InotifyResourceWatcher.isSupported():
+            self._watcher = InotifyResourceWatcher();
+
+
+    def tearDown(self):
+
+        if self._watcher is not None:
+            self._watcher.close();
+        shutil.rmtree(self._directory, ignore_errors=True);
+
+
+    def testFileResource(self):
+
+        if self._watcher is None:
+            self.skipTest('The inotify API is not available.');
+
+        self._watcher.watch('foo', [FileResource(self._directory+'/foo.xml')]);
+        self.assertFalse(self._watcher.isDirty('foo'));
+
+        open(self._directory+'/bar.xml', 'w').close();
+        self.assertFalse(self._watcher.isDirty('foo'), '->isDirty() ignores other files of the directory');
+
+        open(self._directory+'/foo.xml', 'w').close();
+        self.assertTrue(self._watcher.isDirty('foo'), '->isDirty() returns True when the file is modified');
+
+        self._watcher.watch('foo', [FileResource(self._directory+'/foo.xml')]);
+        self.assertFalse(self._watcher.isDirty('foo'), '->watch() cleans the key');
+
+        os.rename(self._directory+'/bar.xml', self._directory+'/foo.xml');
+        self.assertTrue(self._watcher.isDirty('foo'), '->isDirty() returns True when the file is replaced');
+
+
+    def testDirectoryResource(self):
+
+        if self._watcher is None:
+            self.skipTest('The inotify API is not available.');
+
+        self._watcher.watch('foo', [DirectoryResource(self._directory)]);
+        self.assertFalse(self._watcher.isDirty('foo'));
+
+        open(self._directory+'/subdirectory/new.xml', 'w').close();
+        self.assertTrue(self._watcher.isDirty('foo'), '->isDirty() returns True when a file is added in a subdirectory');
+
+        self._watcher.unwatch('foo');
+        self.assertFalse(self._watcher.isWatched('foo'));
+        self.assertTrue(self._watcher.isDirty('foo'));
+
+
+    def testContextManagerClosesTheWatcher(self):
+
+        if self._watcher is None:
+            self.skipTest('The inotify API is not available.');
+
+        with InotifyResourceWatcher() as watcher:
+            watcher.watch('foo', [FileResource(self._directory+'/foo.xml')]);
+            self.assertFalse(watcher.isDirty('foo'));
+
+        self.assertEqual(None, watcher._InotifyResourceWatcher__fd, '->__exit__() releases the file descriptor');
+
+
+    def testConcurrentAccess(self):
+
+        if self._watcher is None:
+            self.skipTest('The inotify API is not available.');
+
+        errors = [];
+
+        def run(index):
+            try:
+                for i in range(50):
+                    key = 'key{0}'.format((index + i) % 4);
+                    self._watcher.watch(key, [FileResource(self._directory+'/foo.xml'), DirectoryResource(self._directory)]);
+                    self._watcher.isDirty(key);
+                    open(self._directory+'/bar.xml', 'w').close();
+                    self._watcher.unwatch(key);
+            except Exception as e:
+                errors.append(e);
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(4)];
+        for thread in threads:
+            thread.start();
+        for thread in threads:
+            thread.join();
+
+        self.assertEqual([], errors, '->watch(), ->isDirty() and ->unwatch() may be called from several threads');
+
+
+class ResourceWatcherFactoryTest(unittest.TestCase):
+
+    def testCreate(self):
+
+        watcher = ResourceWatcherFactory.create();
+        self.assertTrue(isinstance(watcher, ResourceWatcherInterface));
+        if isinstance(watcher, InotifyResourceWatcher):
+            watcher.close();
+
+if __name__ == '__main__':
+    unittest.main();
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pymfony package.
+#
+# (c) Alexandre Quercia <alquerci@email.com>
+#
+# For the full copyright and license information, please view the LICENSE
+# file that was distributed with this source code.
+
+from __future__ import absolute_import;
+
+import os;
+import sys;
+import errno;
+import struct;
+import threading;
+from time import time;
+
+try:
+    import ctypes;
+    import ctypes.util;
+except ImportError:
+    ctypes = None;
+
+from pymfony.component.system import Object;
+from pymfony.component.system.oop import interface;
+from pymfony.component.system.exception import RuntimeException;
+
+from pymfony.component.config.resource import FileResource;
+from pymfony.component.config.resource import DirectoryResource;
+
+"""
+"""
+
+@interface
+class ResourceWatcherInterface(Object):
+    """ResourceWatcherInterface is the interface implemented by resource
+    watchers.
+
+    A watcher keeps track of the resources subscribed under a key and
+    tells whether one of them may have changed since the subscription.
+
+    """
+    def watch(self, key, resources):
+        """Subscribes resources under a key.
+
+        The key is clean until one of the resources may have changed.
+
+        @param key: string The subscription key
+        @param resources: ResourceInterface[] The resources to watch
+
+        """
+        pass;
+
+    def unwatch(self, key):
+        """Removes the subscription of a key.
+
+        @param key: string The subscription key
+
+        """
+        pass;
+
+    def isWatched(self, key):
+        """Returns whether resources are subscribed under a key.
+
+        @param key: string The subscription key
+
+        @return: Boolean
+
+        """
+        pass;
+
+    def isDirty(self, key):
+        """Returns whether one of the resources of a key may have changed.
+
+        @param key: string The subscription key
+
+        @return: Boolean True when the resources must be checked again
+
+        """
+        pass;
+
+
+class PollingResourceWatcher(ResourceWatcherInterface):
+    """PollingResourceWatcher stats the resources of a key at most once
+    per interval, and compares them with their state at the subscription.
+
+    Files are compared by modification time, size and inode, directory
+    resources by the same status of every entry of their tree. Resources
+    of any other type are checked through their isFresh() method. Changes
+    may go unnoticed for up to the interval.
+
+    The watcher may be shared between threads, the resources are polled
+    outside of its lock.
+
+    """
+    def __init__(self, interval=1.0):
+        """Constructor.
+
+        @param interval: float The number of seconds between two polls
+            of the resources of a key
+
+        """
+        self.__interval = float(interval);
+        # key => [last poll, subscription time, resources, states, dirty]
+        self.__watched = dict();
+        self.__lock = threading.Lock();
+
+    def watch(self, key, resources):
+        resources = list(resources);
+        now = time();
+        entry = [
+            now, now, resources, self.__getStates(resources, now), False
+        ];
+        with self.__lock:
+            self.__watched[key] = entry;
+
+    def unwatch(self, key):
+        with self.__lock:
+            self.__watched.pop(key, None);
+
+    def isWatched(self, key):
+        with self.__lock:
+            return key in self.__watched;
+
+    def isDirty(self, key):
+        now = time();
+        with self.__lock:
+            entry = self.__watched.get(key);
+            if entry is None:
+                return True;
+            if entry[4] or now - entry[0] < self.__interval:
+                return entry[4];
+
+            # the other threads skip the poll until the next interval
+            entry[0] = now;
+
+        dirty = self.__getStates(entry[2], entry[1]) != entry[3];
+
+        with self.__lock:
+            if dirty:
+                entry[4] = True;
+
+            # the key may have been unwatched or watched again meanwhile
+            entry = self.__watched.get(key);
+            if entry is None:
+                return True;
+            return entry[4];
+
+    def __getStates(self, resources, timestamp):
+        states = list();
+        for resource in resources:
+            if isinstance(resource, FileResource):
+                states.append(self.__stat(resource.getResource()));
+            elif isinstance(resource, DirectoryResource):
+                states.append(self.__getTreeState(resource.getResource()));
+            else:
+                states.append(resource.isFresh(timestamp));
+
+        return states;
+
+    def __getTreeState(self, directory):
+        if not os.path.isdir(directory):
+            return None;
+
+        state = list();
+        for root, dirs, files in os.walk(directory, followlinks=True):
+            state.append((root, self.__stat(root)));
+            for name in files:
+                filename = os.path.join(root, name);
+                state.append((filename, self.__stat(filename)));
+
+        state.sort();
+
+        return state;
+
+    def __stat(self, path):
+        try:
+            status = os.stat(path);
+        except OSError:
+            return None;
+
+        return (status.st_mtime, status.st_size, status.st_ino);
+
+
+class InotifyResourceWatcher(ResourceWatcherInterface):
+    """InotifyResourceWatcher relies on the Linux inotify API.
+
+    Files are watched through their parent directory, so they are still
+    tracked when replaced by a rename, and directory resources watch every
+    directory of their tree. Events are read without blocking each time
+    isDirty() is called. Resources of any other type are always dirty.
+
+    The watcher may be shared between threads. Close it, or use it as a
+    context manager, to release its file descriptor.
+
+    """
+    IN_MODIFY = 0x00000002;
+    IN_ATTRIB = 0x00000004;
+    IN_MOVED_FROM = 0x00000040;
+    IN_MOVED_TO = 0x00000080;
+    IN_CREATE = 0x00000100;
+    IN_DELETE = 0x00000200;
+    IN_DELETE_SELF = 0x00000400;
+    IN_MOVE_SELF = 0x00000800;
+    IN_Q_OVERFLOW = 0x00004000;
+    IN_IGNORED = 0x00008000;
+    IN_ONLYDIR = 0x01000000;
+    IN_NONBLOCK = 0o4000;
+    IN_CLOEXEC = 0o2000000;
+
+    EVENT_HEADER = struct.Struct('iIII');
+
+    __libc = None;
+
+    def __init__(self):
+        """Constructor.
+
+        @raise RuntimeException: When inotify is not available
+
+        """
+        libc = self._getLibrary();
+        if libc is None:
+            raise RuntimeException(
+                'The inotify API is not available on this platform.'
+            );
+
+        fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC);
+        if fd < 0:
+            raise RuntimeException('Unable to initialize inotify: {0}'.format(
+                os.strerror(ctypes.get_errno())
+            ));
+
+        self.__fd = fd;
+        self.__lock = threading.Lock();
+        # wd => [keys watching the whole directory, {name: keys}]
+        self.__watches = dict();
+        self.__keys = dict();
+        self.__dirty = set();
+
+    @classmethod
+    def isSupported(cls):
+        """Returns whether the inotify API is available.
+
+        @return: Boolean
+
+        """
+        return cls._getLibrary() is not None;
+
+    @classmethod
+    def _getLibrary(cls):
+        """Loads the C library exposing the inotify functions.
+
+        @return: CDLL|None
+
+        """
+        if cls.__libc is not None:
+            return None if cls.__libc is False else cls.__libc;
+
+        cls.__libc = False;
+        if ctypes is None or not sys.platform.startswith('linux'):
+            return None;
+
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library('c') or 'libc.so.6',
+                use_errno=True
+            );
+            libc.inotify_init1.argtypes = [ctypes.c_int];
+            libc.inotify_add_watch.argtypes = [
+                ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32
+            ];
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int];
+        except (OSError, AttributeError):
+            return None;
+
+        cls.__libc = libc;
+
+        return libc;
+
+    def close(self):
+        """Releases the inotify file descriptor.
+        """
+        with self.__lock:
+            if self.__fd is not None:
+                os.close(self.__fd);
+                self.__fd = None;
+
+    def __enter__(self):
+        return self;
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close();
+
+    def __del__(self):
+        # the constructor may have failed before opening the descriptor
+        if getattr(self, '_InotifyResourceWatcher__fd', None) is not None:
+            self.close();
+
+    def watch(self, key, resources):
+        with self.__lock:
+            self.__watch(key, resources);
+
+    def unwatch(self, key):
+        with self.__lock:
+            self.__unwatch(key);
+
+    def isWatched(self, key):
+        with self.__lock:
+            return key in self.__keys;
+
+    def isDirty(self, key):
+        with self.__lock:
+            if key not in self.__keys:
+                return True;
+
+            self.__readEvents();
+
+            return key in self.__dirty;
+
+    def __watch(self, key, resources):
+        self.__unwatch(key);
+        self.__keys[key] = set();
+
+        for resource in resources:
+            if isinstance(resource, FileResource):
+                path = resource.getResource();
+                if not path or not self.__addWatch(key,
+                    os.path.dirname(path), os.path.basename(path)):
+                    self.__dirty.add(key);
+            elif isinstance(resource, DirectoryResource):
+                self.__watchTree(key, resource.getResource());
+            else:
+                self.__dirty.add(key);
+
+    def __unwatch(self, key):
+        for wd in self.__keys.pop(key, ()):
+            if wd not in self.__watches:
+                continue;
+
+            whole, names = self.__watches[wd];
+            whole.discard(key);
+            for name in list(names.keys()):
+                names[name].discard(key);
+                if not names[name]:
+                    del names[name];
+
+            if not whole and not names:
+                del self.__watches[wd];
+                self._getLibrary().inotify_rm_watch(self.__fd, wd);
+
+        self.__dirty.discard(key);
+
+    def __watchTree(self, key, directory):
+        if not os.path.isdir(directory):
+            self.__dirty.add(key);
+            return;
+
+        for root, dirs, files in os.walk(directory, followlinks=True):
+            if not self.__addWatch(key, root, None):
+                self.__dirty.add(key);
+
+    def __addWatch(self, key, directory, name):
+        """Watches a whole directory when the name is None, or one of its
+        entries otherwise.
+
+        @return: Boolean Whether the watch has been added
+
+        """
+        wd = self._getLibrary().inotify_add_watch(
+            self.__fd,
+            self.__encode(directory or '.'),
+            self.IN_MODIFY | self.IN_ATTRIB | self.IN_MOVED_FROM
+            | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+            | self.IN_DELETE_SELF | self.IN_MOVE_SELF | self.IN_ONLYDIR
+        );
+        if wd < 0:
+            return False;
+
+        if wd not in self.__watches:
+            self.__watches[wd] = [set(), dict()];
+        whole, names = self.__watches[wd];
+        if name is None:
+            whole.add(key);
+        else:
+            names.setdefault(self.__encode(name), set()).add(key);
+        self.__keys[key].add(wd);
+
+        return True;
+
+    def __readEvents(self):
+        header = self.EVENT_HEADER;
+        while self.__fd is not None:
+            try:
+                data = os.read(self.__fd, 65536);
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return;
+                raise;
+
+            if not data:
+                return;
+
+            offset = 0;
+            while offset + header.size <= len(data):
+                wd, mask, cookie, length = header.unpack_from(data, offset);
+                offset += header.size;
+                name = data[offset:offset + length].rstrip(b'\0');
+                offset += length;
+
+                self.__handleEvent(wd, mask, name);
+
+    def __handleEvent(self, wd, mask, name):
+        if mask & self.IN_Q_OVERFLOW:
+            # events have been lost
+            self.__dirty.update(self.__keys.keys());
+            return;
+
+        if wd not in self.__watches:
+            return;
+
+        whole, names = self.__watches[wd];
+        self.__dirty.update(whole);
+        if name in names:
+            self.__dirty.update(names[name]);
+
+        if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF | self.IN_IGNORED):
+            for keys in names.values():
+                self.__dirty.update(keys);
+
+        if mask & self.IN_IGNORED:
+            # the kernel removed the watch
+            del self.__watches[wd];
+            for wds in self.__keys.values():
+                wds.discard(wd);
+
+    def __encode(self, path):
+        if isinstance(path, bytes):
+            return path;
+
+        return path.encode(sys.getfilesystemencoding() or 'utf-8');
+
+
+class ResourceWatcherFactory(Object):
+    """ResourceWatcherFactory creates the best watcher for the platform.
+
+    """
+    @classmethod
+    def create(cls, interval=1.0):
+        """Creates an InotifyResourceWatcher when inotify is available, a
+        PollingResourceWatcher otherwise.
+
+        @param interval: float The interval of the polling fallback
+
+        @return: ResourceWatcherInterface
+
+        """
+        if InotifyResourceWatcher.isSupported():
+            try:
+                return InotifyResourceWatcher();
+            except RuntimeException:
+                pass;
+
+        return PollingResourceWatcher(interval);